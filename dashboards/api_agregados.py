@@ -0,0 +1,156 @@
+import hashlib
+import json
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+from cache_lru import CacheLRU
+from indices import rango_fechas
+from metricas import medir_callback, metricas
+from vistas import clave_vista, obtener_vista
+
+# API HTTP de solo lectura con los mismos números que el dashboard: KPIs y totales por hora,
+# día de la semana, estación y mes para cualquier filtro de estaciones, mes y rango de fechas,
+# en JSON o Arrow IPC. La ETag se deriva de la versión del dataset y de los filtros, así que se
+# conoce antes de calcular: una consulta repetida con If-None-Match recibe un 304 sin tocar los
+# datos, y las respuestas ya serializadas se guardan en una caché LRU por ETag.
+#
+#   GET /api/version
+#   GET /api/kpis?estacion=A,B&mes=3&desde=2025-03-01&hasta=2025-03-31&formato=arrow
+#   GET /api/series/<hora|dia_semana|estacion|mes>?...
+#
+# Sin `version` se responde con la versión vigente; una versión explícita no cambia, así que
+# esas respuestas se pueden cachear sin volver a validar.
+
+AGRUPACIONES = {'hora': 'hora', 'dia_semana': 'dia_semana', 'estacion': 'evse_uid', 'mes': 'mes'}
+TIPO_JSON = 'application/json'
+TIPO_ARROW = 'application/vnd.apache.arrow.stream'
+# Cambia cuando cambia la forma de las respuestas (invalida las ETag anteriores)
+FORMATO = 1
+CACHE_VERSION_EXPLICITA = 'max-age=86400'
+
+cache_respuestas = CacheLRU(max_entradas=256)
+
+
+# Filtros de la consulta con los valores que usan el cubo y los índices. `estacion` se puede
+# repetir o separar por comas; 'TODAS' y 'TODOS' equivalen a no filtrar, como en el dashboard.
+def filtros_consulta(args):
+    estaciones = [est for valor in args.getlist('estacion') for est in valor.split(',')
+                  if est and est != 'TODAS']
+    mes = args.get('mes', 'TODOS')
+    try:
+        mes = None if mes in ('', 'TODOS') else int(mes)
+    except ValueError:
+        raise ValueError(f"mes inválido: {mes}")
+    try:
+        desde, hasta = rango_fechas(args.get('desde'), args.get('hasta'))
+    except ValueError:
+        raise ValueError("desde/hasta deben ser fechas (AAAA-MM-DD)")
+    return sorted(estaciones) or None, mes, desde, hasta
+
+
+# `formato` en la consulta o, si no está, el tipo preferido en Accept (JSON por omisión)
+def formato_consulta(request):
+    formato = request.args.get('formato')
+    if formato is None:
+        preferido = request.accept_mimetypes.best_match([TIPO_JSON, TIPO_ARROW])
+        formato = 'arrow' if preferido == TIPO_ARROW else 'json'
+    if formato not in ('json', 'arrow'):
+        raise ValueError(f"formato inválido: {formato} (json o arrow)")
+    return formato
+
+
+def tabla_kpis(kpis):
+    energia = kpis['energia']
+    return pd.DataFrame([{
+        'transacciones': kpis['transacciones'],
+        'energia': energia,
+        'ingresos': kpis['ingresos'],
+        'usuarios': kpis['usuarios'],
+        'precio_kwh': kpis['ingresos'] / energia if energia else float('nan'),
+        'duracion_promedio': kpis['duracion_promedio'],
+    }])
+
+
+def _texto_filtros(filtros):
+    estaciones, mes, desde, hasta = filtros
+    return {'estaciones': estaciones, 'mes': mes,
+            'desde': desde.date().isoformat() if desde is not None else None,
+            'hasta': (hasta - pd.Timedelta(days=1)).date().isoformat() if hasta is not None else None}
+
+
+# Cuerpo de la respuesta: en JSON un objeto con la versión, los filtros y los datos (un objeto
+# para los KPIs, una lista de filas para las series); en Arrow la tabla, con la versión y los
+# filtros en los metadatos del esquema.
+def serializar(tabla, version, filtros, formato, una_fila=False):
+    if formato == 'arrow':
+        tabla = pa.Table.from_pandas(tabla, preserve_index=False).replace_schema_metadata(
+            {'version': version, 'filtros': json.dumps(_texto_filtros(filtros))})
+        salida = pa.BufferOutputStream()
+        with pa.ipc.new_stream(salida, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+        return salida.getvalue().to_pybytes()
+    datos = json.loads(tabla.to_json(orient='records'))
+    return json.dumps({'version': version, 'filtros': _texto_filtros(filtros),
+                       'datos': datos[0] if una_fila else datos}, ensure_ascii=False).encode()
+
+
+# Registra las rutas /api en el servidor Flask. `obtener_dataset(version)` devuelve el dataset
+# de una versión (None si no existe) y `version_actual()` la versión vigente.
+def instalar(server, obtener_dataset, version_actual):
+    from flask import Response, jsonify, request
+
+    def consultar(ruta, construir, una_fila=False):
+        try:
+            filtros = filtros_consulta(request.args)
+            formato = formato_consulta(request)
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        if formato == 'arrow' and pa is None:
+            return jsonify(error="el formato arrow requiere pyarrow"), 406
+        explicita = request.args.get('version')
+        version = explicita or version_actual()
+        dataset = obtener_dataset(version) if version else None
+        if dataset is None:
+            return jsonify(error=f"versión desconocida: {version}" if version else "no hay datos cargados"), 404
+
+        etag = hashlib.blake2b(repr((FORMATO, ruta, formato, clave_vista(dataset, *filtros))).encode(),
+                               digest_size=16).hexdigest()
+        if request.if_none_match.contains(etag):
+            respuesta = Response(status=304)
+            resultado = 'no_modificado'
+        else:
+            cuerpo = cache_respuestas.obtener(etag)
+            resultado = 'cache'
+            if cuerpo is None:
+                tabla = construir(obtener_vista(dataset, *filtros))
+                cuerpo = serializar(tabla, dataset.version, filtros, formato, una_fila)
+                cache_respuestas.guardar(etag, cuerpo)
+                resultado = 'calculado'
+            respuesta = Response(cuerpo, mimetype=TIPO_ARROW if formato == 'arrow' else TIPO_JSON)
+        metricas.sumar('oasis_api_respuestas_total', ruta=ruta, resultado=resultado)
+        respuesta.set_etag(etag)
+        respuesta.headers['Cache-Control'] = CACHE_VERSION_EXPLICITA if explicita else 'no-cache'
+        respuesta.vary.add('Accept')
+        return respuesta
+
+    @server.route('/api/version')
+    @medir_callback
+    def api_version():
+        return jsonify(version=version_actual())
+
+    @server.route('/api/kpis')
+    @medir_callback
+    def api_kpis():
+        return consultar('kpis', lambda vista: tabla_kpis(vista.kpis), una_fila=True)
+
+    @server.route('/api/series/<agrupacion>')
+    @medir_callback
+    def api_series(agrupacion):
+        if agrupacion not in AGRUPACIONES:
+            return jsonify(error=f"agrupación desconocida: {agrupacion} ({', '.join(AGRUPACIONES)})"), 404
+        return consultar(agrupacion, lambda vista: vista.cubo.agrupar(AGRUPACIONES[agrupacion]))
@@ -1,33 +1,125 @@
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from dash import Dash, dcc, html, Input, Output, State
+import plotly.io as pio
+from dash import Dash, dcc, html, ClientsideFunction, Input, Output, State, no_update
 import base64
-import io
+import os
+import tempfile
+from carga_datos import (EXTENSIONES_FEATHER, EXTENSIONES_PARQUET, compactar_datos, concatenar_bloques,
+                         leer_archivo, leer_bloques, leer_contenido, memoria_df, preparar_datos)
+from registro_datos import Dataset, RegistroDatos
+from cubo_agregados import combinar_cubos, construir_cubo
+from indices import rango_fechas
+from cache_lru import CacheLRU
+from cohortes import ETIQUETAS_SESIONES, UMBRAL_FIEL
+from vistas import cache_vistas, obtener_vista
+from simulador_tarifas import ELASTICIDAD
+from series_diarias import DIAS_AJUSTE, DIAS_VALIDACION
+from validacion import resumen_cuarentena, sumar_conteos, unir_cuarentenas, validar
+from instantanea import cargar_o_construir
+from modo_vivo import FuenteViva
+from publicacion import DatasetCompartido, cargar_publicado, publicar_dataset, versiones_vigentes
+import api_agregados
+import metricas
+from metricas import contar_filas, etapa, medicion, medir_callback
+from trabajos import CANCELADO, ERROR, PERDIDO, GestorTrabajos, TrabajoCancelado, informar_progreso
+
+# Modo con varios workers: OASIS_DATOS_COMPARTIDOS es el directorio de versiones publicadas
+# (ver publicacion.py). Los workers mapean la versión vigente en lugar de leer el archivo.
+DIRECTORIO_COMPARTIDO = os.environ.get('OASIS_DATOS_COMPARTIDOS')
+compartido = DatasetCompartido(DIRECTORIO_COMPARTIDO) if DIRECTORIO_COMPARTIDO else None
+INTERVALO_PUBLICACION_MS = 10_000
+
+# Registro de datasets en el servidor (el navegador solo guarda la versión)
+registro = RegistroDatos(max_datasets=4, max_memoria_mb=1024)
+
+# Modo compacto en memoria (categorías, enteros pequeños, float32); OASIS_COMPACTO=0 lo desactiva
+MODO_COMPACTO = os.environ.get('OASIS_COMPACTO', '1') != '0'
+
+# Crea el dataset con sus agregados precalculados
+def crear_dataset(df):
+    if MODO_COMPACTO:
+        memoria_antes = memoria_df(df)
+        with etapa('compactacion'):
+            df = compactar_datos(df)
+        memoria_despues = memoria_df(df)
+        print(f"✓ Modo compacto: {memoria_antes/1024**2:,.1f} MB -> {memoria_despues/1024**2:,.1f} MB "
+              f"(ahorro {(1 - memoria_despues/memoria_antes)*100:.0f}%)")
+    with etapa('cubo'):
+        cubo = construir_cubo(df)
+    with etapa('indices'):
+        return Dataset(df, cubo)
+
+# Agrega un lote nuevo al dataset actual, omitiendo los ids ya cargados.
+# Solo se calculan los agregados del lote y se suman al cubo y a las series diarias existentes;
+# el cubo del lote queda como delta del dataset nuevo (el modo cliente recibe solo ese cubo).
+def agregar_lote(dataset, lote):
+    nuevos = lote.df.drop_duplicates('id')
+    nuevos = nuevos[~nuevos['id'].isin(dataset.df['id'])]
+    if nuevos.empty:
+        resultado = Dataset(dataset.df, dataset.cubo, dataset.series)
+        resultado.delta = (dataset.version, None)
+        return resultado, 0
+    with etapa('cubo'):
+        cubo_lote = lote.cubo if len(nuevos) == len(lote.df) else construir_cubo(nuevos)
+        cubo = combinar_cubos(dataset.cubo, cubo_lote)
+    with etapa('series'):
+        series = dataset.series.agregar(nuevos)
+    with etapa('concatenacion'):
+        df = concatenar_bloques([dataset.df, nuevos])
+    with etapa('indices'):
+        resultado = Dataset(df, cubo, series)
+    resultado.delta = (dataset.version, cubo_lote)
+    return resultado, len(nuevos)
+
+# Dataset de una versión: el registro del worker y, en modo compartido, las versiones
+# publicadas en disco (por ejemplo, un archivo subido a través de otro worker)
+def obtener_dataset(version):
+    dataset = registro.obtener(version)
+    if dataset is None and compartido is not None and version is not None:
+        dataset = cargar_publicado(DIRECTORIO_COMPARTIDO, version)
+        if dataset is not None:
+            registro.registrar(dataset, version=version)
+    return dataset
+
+# Versión publicada vigente; al cambiar se fija en el registro y las anteriores se liberan
+def version_vigente():
+    dataset = compartido.actual()
+    if dataset is not None and dataset.version not in registro:
+        registro.registrar(dataset, fijo=True, version=dataset.version)
+        for version in compartido.historial - {dataset.version}:
+            registro.liberar(version)
+    return compartido.version
+
+# Cargar datos iniciales. Con la instantánea de arranque (ver instantanea.py) el dataset ya
+# preparado se mapea desde disco y el archivo solo se vuelve a procesar si cambió;
+# OASIS_INSTANTANEA=0 la desactiva.
+USAR_INSTANTANEA = os.environ.get('OASIS_INSTANTANEA', '1') != '0'
+dataset_inicial = None
+
+def leer_dataset(ruta):
+    return crear_dataset(preparar_datos(leer_archivo(ruta)))
 
-# Cargar datos iniciales
-df = None
 rutas_posibles = [
+    '../datos/df_oasis_clean.parquet',  # Formato columnar (ver carga_datos.py)
+    'datos/df_oasis_clean.parquet',
     '../datos/df_oasis_clean.csv',      # Subir a proyecto_computacion/datos/
     'datos/df_oasis_clean.csv',         # Si se ejecuta desde la raíz
     'df_oasis_clean.csv',               # Si está en la misma carpeta
     '../../datos/df_oasis_clean.csv',   # Por si acaso
 ]
 
-for ruta in rutas_posibles:
+for ruta in (rutas_posibles if compartido is None or compartido.actual() is None else []):
     try:
-        df = pd.read_csv(ruta)
-        df['amount_transaction'] = df['amount_transaction'] / 100
-        df['amount_third'] = df['amount_third'] / 100
-        df['start_date_time'] = pd.to_datetime(df['start_date_time'], format='mixed')
-        df['end_date_time'] = pd.to_datetime(df['end_date_time'], format='mixed')
-        df['mes'] = df['start_date_time'].dt.month
-        df['mes_nombre'] = df['start_date_time'].dt.strftime('%B')
-        df['dia_semana'] = df['start_date_time'].dt.day_name()
-        df['hora'] = df['start_date_time'].dt.hour
-        df['fecha'] = df['start_date_time'].dt.date
-        print(f"✓ Datos cargados exitosamente desde: {ruta}")
-        print(f"✓ Total de registros: {len(df):,}")
+        if USAR_INSTANTANEA:
+            dataset_inicial, desde_instantanea = cargar_o_construir(ruta, leer_dataset, MODO_COMPACTO)
+        else:
+            dataset_inicial, desde_instantanea = leer_dataset(ruta), False
+        origen = " (instantánea de arranque)" if desde_instantanea else ""
+        print(f"✓ Datos cargados exitosamente desde: {ruta}{origen}")
+        print(f"✓ Total de registros: {len(dataset_inicial.df):,}")
         break
     except FileNotFoundError:
         continue
@@ -35,9 +127,9 @@ for ruta in rutas_posibles:
         print(f"Error al intentar cargar desde {ruta}: {e}")
         continue
 
-if df is None:
+if dataset_inicial is None and (compartido is None or compartido.dataset is None):
     print("\n" + "="*60)
-    print("ADVERTENCIA: No se encontró el archivo df_oasis_clean.csv")
+    print("ADVERTENCIA: No se encontró el archivo df_oasis_clean (.parquet o .csv)")
     print("="*60)
     print("\nBusque el archivo en estas ubicaciones:")
     for ruta in rutas_posibles:
@@ -47,8 +139,124 @@ if df is None:
     print("2. O cárgalo manualmente desde el dashboard")
     print("="*60 + "\n")
 
-# Crear la app
+if compartido is not None:
+    if compartido.dataset is None and dataset_inicial is not None:
+        # Primera publicación: el archivo leído se publica para que los demás workers lo mapeen
+        publicar_dataset(dataset_inicial, DIRECTORIO_COMPARTIDO)
+        compartido.actual(forzar=True)
+    version_inicial = version_vigente()
+elif dataset_inicial is not None:
+    # La versión de la instantánea se mantiene entre reinicios: las sesiones abiertas la siguen usando
+    version_inicial = registro.registrar(dataset_inicial, fijo=True, version=dataset_inicial.version)
+else:
+    version_inicial = None
+
+# Modo vivo (ver modo_vivo.py): OASIS_DIRECTORIO_VIVO es la carpeta vigilada y OASIS_INTERVALO_VIVO
+# los segundos entre revisiones. Cada archivo nuevo se agrega a la versión vigente y las sesiones
+# abiertas pasan a la nueva en su próxima consulta (ver revisar_publicacion).
+DIRECTORIO_VIVO = os.environ.get('OASIS_DIRECTORIO_VIVO')
+INTERVALO_VIVO = float(os.environ.get('OASIS_INTERVALO_VIVO', '5'))
+
+# Agrega un archivo de la carpeta vigilada a la versión vigente y devuelve la versión nueva.
+# En modo compartido la versión nueva se publica y los demás workers la mapean.
+def ingerir_archivo_vivo(ruta):
+    with medicion('ingesta_viva'):
+        with etapa('lectura'):
+            lote = leer_archivo(ruta)
+        contar_filas(len(lote))
+        with etapa('validacion'):
+            lote, cuarentena, conteos = validar(lote)
+        if len(cuarentena):
+            print(f"Modo vivo: {resumen_cuarentena(cuarentena, conteos)} en '{os.path.basename(ruta)}'")
+        if lote.empty:
+            raise ValueError("ninguna fila pasó la validación")
+        dataset_lote = crear_dataset(preparar_datos(lote))
+        actual = compartido.actual(forzar=True) if compartido is not None else registro.obtener(fuente_viva.version)
+        if actual is None:
+            nuevo = dataset_lote
+            nuevo.cuarentena = unir_cuarentenas([cuarentena])
+        else:
+            nuevo, _ = agregar_lote(actual, dataset_lote)
+            nuevo.cuarentena = unir_cuarentenas([actual.cuarentena, cuarentena])
+        if compartido is not None:
+            publicar_dataset(nuevo, DIRECTORIO_COMPARTIDO)
+            compartido.actual(forzar=True)
+            return version_vigente()
+        version = registro.registrar(nuevo, fijo=True)
+        if actual is not None:
+            registro.liberar(actual.version)
+        return version
+
+fuente_viva = None
+if DIRECTORIO_VIVO:
+    os.makedirs(DIRECTORIO_VIVO, exist_ok=True)
+    fuente_viva = FuenteViva(DIRECTORIO_VIVO, ingerir_archivo_vivo, version_inicial, INTERVALO_VIVO).iniciar()
+
+# Caché de figuras y paneles de análisis por (dataset, filtros, pestaña); OASIS_CACHE_FIGURAS fija su tamaño
+cache_contenido = CacheLRU(max_entradas=int(os.environ.get('OASIS_CACHE_FIGURAS', '128')))
+
+# Trabajos en segundo plano para cargas de archivos y pestañas costosas; OASIS_HILOS_TRABAJOS fija los hilos.
+# Su estado se guarda en OASIS_DIRECTORIO_TRABAJOS para que cualquier worker responda la consulta
+# de avance; por omisión, en modo compartido, en <directorio compartido>/.trabajos (el punto evita
+# que purgar_versiones la tome por una versión) y, si no, en una carpeta temporal del equipo.
+# OASIS_DIRECTORIO_TRABAJOS=0 deja el estado solo en memoria (sin archivos ni latido).
+DIRECTORIO_TRABAJOS = os.environ.get('OASIS_DIRECTORIO_TRABAJOS') or \
+    os.path.join(DIRECTORIO_COMPARTIDO or tempfile.gettempdir(),
+                 '.trabajos' if DIRECTORIO_COMPARTIDO else 'oasis_trabajos')
+if DIRECTORIO_TRABAJOS == '0':
+    DIRECTORIO_TRABAJOS = None
+gestor_trabajos = GestorTrabajos(max_hilos=int(os.environ.get('OASIS_HILOS_TRABAJOS', '2')),
+                                 directorio=DIRECTORIO_TRABAJOS)
+PESTAÑAS_PESADAS = {'tab-ocupacion', 'tab-cohortes', 'tab-tarifas'}
+INTERVALO_TRABAJOS_MS = 500
+
+# Modo cliente (OASIS_CLIENTE=1): los KPIs y las pestañas que solo usan el cubo se recalculan
+# en el navegador (assets/oasis_cliente.js) y los filtros no generan peticiones al servidor
+MODO_CLIENTE = os.environ.get('OASIS_CLIENTE', '0') == '1'
+# Máximo de lotes que se envían como deltas antes de volver a enviar el cubo completo
+MAX_DELTAS_CLIENTE = 16
+
+# Crear la app (`server` es la aplicación WSGI para gunicorn: app_dashboard:server)
 app = Dash(__name__)
+server = app.server
+
+# Métricas de los callbacks en /metrics (formato Prometheus); OASIS_METRICAS=0 desactiva las rutas
+if os.environ.get('OASIS_METRICAS', '1') != '0':
+    metricas.instalar(server)
+
+# Estado de cachés y registro que se informa en cada lectura de /metrics
+def estado_servidor():
+    caches = [('contenido', cache_contenido.estadisticas()), ('vistas', cache_vistas.estadisticas()),
+              ('api', api_agregados.cache_respuestas.estadisticas())]
+    filas = []
+    for nombre, tipo, campo in [('oasis_cache_aciertos_total', 'counter', 'aciertos'),
+                                ('oasis_cache_fallos_total', 'counter', 'fallos'),
+                                ('oasis_cache_desalojos_total', 'counter', 'desalojos'),
+                                ('oasis_cache_entradas', 'gauge', 'entradas')]:
+        filas += [(nombre, tipo, {'cache': cache}, estadisticas[campo]) for cache, estadisticas in caches]
+    filas.append(('oasis_registro_memoria_bytes', 'gauge', {}, registro.memoria_usada()))
+    return filas
+
+metricas.metricas.registrar_colector(estado_servidor)
+
+# Versión vigente para quien no elige una: la publicada, la última del modo vivo o la inicial
+def version_actual():
+    if compartido is not None:
+        return version_vigente()
+    if fuente_viva is not None:
+        return fuente_viva.version
+    return version_inicial
+
+# API de solo lectura en /api con KPIs y series agrupadas (ver api_agregados.py); OASIS_API=0 la desactiva
+if os.environ.get('OASIS_API', '1') != '0':
+    api_agregados.instalar(server, obtener_dataset, version_actual)
+
+# Callbacks que dependen de los filtros; en modo cliente se registran más abajo con los
+# pedidos del navegador como entrada, en lugar de los filtros
+def callback_filtros(*args, **kwargs):
+    if MODO_CLIENTE:
+        return lambda funcion: funcion
+    return app.callback(*args, **kwargs)
 
 # Colores
 colors = {
@@ -107,23 +315,130 @@ analysis_style = {
 # Función para procesar archivo
 def procesar_datos(contents, filename):
     try:
-        content_type, content_string = contents.split(',')
-        decoded = base64.b64decode(content_string)
-        df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-        
-        df['amount_transaction'] = df['amount_transaction'] / 100
-        df['amount_third'] = df['amount_third'] / 100
-        df['start_date_time'] = pd.to_datetime(df['start_date_time'], format='mixed')
-        df['end_date_time'] = pd.to_datetime(df['end_date_time'], format='mixed')
-        df['mes'] = df['start_date_time'].dt.month
-        df['mes_nombre'] = df['start_date_time'].dt.strftime('%B')
-        df['dia_semana'] = df['start_date_time'].dt.day_name()
-        df['hora'] = df['start_date_time'].dt.hour
-        df['fecha'] = df['start_date_time'].dt.date
-        
-        return df, None
+        extension = os.path.splitext(filename or '')[1].lower()
+        if extension in EXTENSIONES_PARQUET + EXTENSIONES_FEATHER:
+            with etapa('lectura'):
+                content_type, content_string = contents.split(',')
+                decoded = base64.b64decode(content_string)
+                df = leer_contenido(decoded, filename)
+            contar_filas(len(df))
+            with etapa('validacion'):
+                df, cuarentena, conteos = validar(df)
+            if df.empty:
+                raise ValueError(f"ninguna fila pasó la validación: {resumen_cuarentena(cuarentena, conteos)}")
+            dataset = crear_dataset(preparar_datos(df))
+            dataset.cuarentena = unir_cuarentenas([cuarentena])
+            return dataset, conteos, None
+        
+        # CSV (plano, .gz o .zip): se lee por bloques y cada bloque se pliega en los agregados
+        bloques = []
+        cuarentenas = []
+        conteos = {}
+        cubo = None
+        registros = 0
+        for bloque in leer_bloques(contents):
+            primera_fila = registros
+            registros += len(bloque)
+            contar_filas(len(bloque))
+            informar_progreso(mensaje=f"Leyendo '{filename}': {registros:,} registros procesados")
+            with etapa('validacion'):
+                bloque, cuarentena, conteos_bloque = validar(bloque, primera_fila)
+            cuarentenas.append(cuarentena)
+            sumar_conteos(conteos, conteos_bloque)
+            if bloque.empty:
+                continue
+            bloque = preparar_datos(bloque)
+            if MODO_COMPACTO:
+                with etapa('compactacion'):
+                    bloque = compactar_datos(bloque)
+            bloques.append(bloque)
+            with etapa('cubo'):
+                cubo_bloque = construir_cubo(bloque)
+                cubo = cubo_bloque if cubo is None else combinar_cubos(cubo, cubo_bloque)
+        cuarentena = unir_cuarentenas(cuarentenas)
+        if not bloques:
+            if cuarentena is not None:
+                raise ValueError(f"ninguna fila pasó la validación: {resumen_cuarentena(cuarentena, conteos)}")
+            raise ValueError("el archivo no contiene registros")
+        
+        with etapa('concatenacion'):
+            df = concatenar_bloques(bloques)
+        with etapa('indices'):
+            return Dataset(df, cubo, cuarentena=cuarentena), conteos, None
+    except TrabajoCancelado:
+        raise
     except Exception as e:
-        return None, f"Error: {str(e)}"
+        return None, None, f"Error: {str(e)}"
+
+# Carga completa de un archivo subido; se ejecuta como trabajo en segundo plano.
+# En modo 'agregar' el lote se suma al dataset actual sin duplicar ids.
+def procesar_carga(contents, filename, modo_carga, current_data):
+    dataset_actual = obtener_dataset(current_data)
+    dataset_nuevo, conteos, error = procesar_datos(contents, filename)
+    if error:
+        return {'version': None, 'mensaje': error}
+    
+    # Un archivo nuevo invalida las figuras y paneles ya construidos
+    cache_contenido.limpiar()
+    
+    cuarentena_lote = dataset_nuevo.cuarentena
+    if modo_carga == 'agregar' and dataset_actual is not None:
+        informar_progreso(mensaje="Agregando el lote a los datos actuales")
+        registros_lote = len(dataset_nuevo.df)
+        dataset_nuevo, agregados = agregar_lote(dataset_actual, dataset_nuevo)
+        # La cuarentena acumula la de los lotes anteriores
+        dataset_nuevo.cuarentena = unir_cuarentenas([dataset_actual.cuarentena, cuarentena_lote])
+        mensaje = (f"Lote '{filename}' agregado: {agregados:,} registros nuevos "
+                   f"({registros_lote - agregados:,} duplicados omitidos). Total: {len(dataset_nuevo.df):,} registros")
+    else:
+        mensaje = f"Archivo '{filename}' cargado: {len(dataset_nuevo.df):,} registros"
+    if cuarentena_lote is not None:
+        mensaje += f". {resumen_cuarentena(cuarentena_lote, conteos)}"
+
+    version = registro.registrar(dataset_nuevo)
+    if compartido is not None:
+        # Los demás workers abren el archivo subido desde el directorio compartido
+        informar_progreso(mensaje="Publicando los datos para los demás workers")
+        publicar_dataset(dataset_nuevo, DIRECTORIO_COMPARTIDO, actual=False)
+    return {'version': version, 'mensaje': mensaje, 'cuarentena': dataset_nuevo.cuarentena is not None}
+
+# Mensaje y barra de avance de un trabajo en curso (sin porcentaje si el avance no se conoce)
+def indicador_progreso(trabajo):
+    barra = {'max': '100', 'style': {'width': '300px', 'marginLeft': '10px', 'verticalAlign': 'middle'}}
+    if trabajo.progreso is not None:
+        barra['value'] = f"{trabajo.progreso * 100:.0f}"
+    return html.Span([trabajo.mensaje or "Procesando...", html.Progress(**barra)])
+
+# Opciones de los filtros de estación y mes (se leen del cubo, no de las filas)
+def opciones_filtros(cubo):
+    estaciones = [{'label': 'Todas las estaciones', 'value': 'TODAS'}] + \
+                [{'label': est, 'value': est} for est in sorted(cubo.celdas['evse_uid'].unique())]
+    meses = [{'label': 'Todos los meses', 'value': 'TODOS'}] + \
+            [{'label': mes, 'value': num} for num, mes in sorted(cubo.nombres_mes.items())]
+    return estaciones, meses
+
+# Traduce los valores de los filtros del layout a los que usan el cubo y los índices
+def normalizar_filtros(estacion, mes, fecha_inicio=None, fecha_fin=None):
+    if isinstance(estacion, str):
+        estacion = [estacion]
+    estaciones = [est for est in (estacion or []) if est != 'TODAS'] or None
+    mes = None if mes in (None, 'TODOS') else mes
+    desde, hasta = rango_fechas(fecha_inicio, fecha_fin)
+    return estaciones, mes, desde, hasta
+
+if version_inicial is not None:
+    opciones_estaciones, opciones_meses = opciones_filtros(obtener_dataset(version_inicial).cubo)
+else:
+    opciones_estaciones = [{'label': 'Todas las estaciones', 'value': 'TODAS'}]
+    opciones_meses = [{'label': 'Todos los meses', 'value': 'TODOS'}]
+
+# Plantilla y escalas de color de plotly.express para las figuras armadas en el navegador
+def estilo_cliente():
+    return {
+        'plantilla': pio.templates[pio.templates.default].to_plotly_json(),
+        'escalas': {nombre: getattr(px.colors.sequential, nombre) for nombre in ('Blues', 'Greens', 'Oranges')},
+        'analisis': analysis_style,
+    }
 
 # Layout
 app.layout = html.Div(style=container_style, children=[
@@ -136,11 +451,29 @@ app.layout = html.Div(style=container_style, children=[
     ]),
     
     # Store para datos
-    dcc.Store(id='stored-data', data=df.to_json(date_format='iso', orient='split') if df is not None else None),
+    dcc.Store(id='stored-data', data=version_inicial),
+    
+    # Trabajos en segundo plano: id del trabajo en curso e intervalo para consultar su avance
+    dcc.Store(id='trabajo-carga'),
+    dcc.Interval(id='intervalo-carga', interval=INTERVALO_TRABAJOS_MS, disabled=True),
+    dcc.Store(id='trabajo-contenido'),
+    dcc.Interval(id='intervalo-contenido', interval=INTERVALO_TRABAJOS_MS, disabled=True),
+    
+    # Modo compartido y modo vivo: consulta periódica de la versión vigente
+    dcc.Interval(id='intervalo-publicacion', interval=INTERVALO_PUBLICACION_MS,
+                 disabled=compartido is None and fuente_viva is None),
+    
+    # Modo cliente: cubo compacto, cubos de los lotes agregados desde la versión del navegador,
+    # estilo de las figuras y pedidos que el navegador hace al servidor
+    *([dcc.Store(id='cubo-cliente'),
+       dcc.Store(id='delta-cliente'),
+       dcc.Store(id='estilo-cliente', data=estilo_cliente()),
+       dcc.Store(id='solicitud-kpis'),
+       dcc.Store(id='solicitud-contenido')] if MODO_CLIENTE else []),
     
     # Sección de carga de archivo
     html.Details([
-        html.Summary("Cargar Nuevo Archivo CSV", 
+        html.Summary("Cargar Nuevo Archivo (CSV, Parquet o Feather)", 
                     style={'fontSize': '16px', 'fontWeight': 'bold', 'cursor': 'pointer', 
                            'padding': '15px', 'backgroundColor': 'white', 'borderRadius': '5px'}),
         html.Div(style={'backgroundColor': '#e8f4f8', 'padding': '20px', 'borderRadius': '5px', 'marginTop': '10px'}, children=[
@@ -148,7 +481,7 @@ app.layout = html.Div(style=container_style, children=[
                 id='upload-data',
                 children=html.Div([
                     'Arrastra y suelta o ',
-                    html.A('selecciona un archivo CSV', style={'color': colors['secondary'], 'fontWeight': 'bold'})
+                    html.A('selecciona un archivo CSV (también .gz o .zip), Parquet o Feather', style={'color': colors['secondary'], 'fontWeight': 'bold'})
                 ]),
                 style={
                     'width': '100%',
@@ -163,34 +496,58 @@ app.layout = html.Div(style=container_style, children=[
                 },
                 multiple=False
             ),
-            html.Div(id='upload-status', style={'marginTop': '10px', 'fontWeight': 'bold'})
+            dcc.RadioItems(
+                id='modo-carga',
+                options=[
+                    {'label': ' Reemplazar datos actuales', 'value': 'reemplazar'},
+                    {'label': ' Agregar lote a los datos actuales (sin duplicar ids)', 'value': 'agregar'}
+                ],
+                value='reemplazar',
+                inline=True,
+                style={'marginTop': '10px'},
+                inputStyle={'marginLeft': '15px'}
+            ),
+            html.Div(id='upload-status', style={'marginTop': '10px', 'fontWeight': 'bold'}),
+            # Filas que no pasaron la validación del último archivo (visible solo si las hay)
+            html.Button("Descargar filas en cuarentena (CSV)", id='boton-cuarentena',
+                        style={'marginTop': '10px', 'display': 'none'}),
+            dcc.Download(id='descarga-cuarentena')
         ])
     ], style={'marginBottom': '30px'}),
     
     # Filtros
     html.Div(style={'display': 'flex', 'justifyContent': 'space-around', 'marginBottom': '30px'}, children=[
-        html.Div(style={'width': '45%'}, children=[
-            html.Label("Seleccionar Estación:", style={'fontWeight': 'bold', 'marginBottom': '5px'}),
+        html.Div(style={'width': '35%'}, children=[
+            html.Label("Seleccionar Estaciones:", style={'fontWeight': 'bold', 'marginBottom': '5px'}),
             dcc.Dropdown(
                 id='filtro-estacion',
-                options=[{'label': 'Todas las estaciones', 'value': 'TODAS'}] + 
-                        ([{'label': est, 'value': est} for est in sorted(df['evse_uid'].unique())] if df is not None else []),
-                value='TODAS',
+                options=opciones_estaciones,
+                value=['TODAS'],
+                multi=True,
                 clearable=False,
                 style={'marginTop': '5px'}
             )
         ]),
-        html.Div(style={'width': '45%'}, children=[
+        html.Div(style={'width': '25%'}, children=[
             html.Label("Seleccionar Mes:", style={'fontWeight': 'bold', 'marginBottom': '5px'}),
             dcc.Dropdown(
                 id='filtro-mes',
-                options=[{'label': 'Todos los meses', 'value': 'TODOS'}] + 
-                        ([{'label': mes, 'value': num} for num, mes in 
-                         sorted(df.groupby('mes')['mes_nombre'].first().items())] if df is not None else []),
+                options=opciones_meses,
                 value='TODOS',
                 clearable=False,
                 style={'marginTop': '5px'}
             )
+        ]),
+        html.Div(style={'width': '30%'}, children=[
+            html.Label("Rango de Fechas:", style={'fontWeight': 'bold', 'marginBottom': '5px'}),
+            dcc.DatePickerRange(
+                id='filtro-fechas',
+                display_format='YYYY-MM-DD',
+                start_date_placeholder_text='Desde',
+                end_date_placeholder_text='Hasta',
+                clearable=True,
+                style={'marginTop': '5px'}
+            )
         ])
     ]),
     
@@ -229,64 +586,129 @@ app.layout = html.Div(style=container_style, children=[
     html.Div(style={'marginTop': '30px'}, children=[
         dcc.Tabs(id='tabs', value='tab-horario', children=[
             dcc.Tab(label='Análisis Horario', value='tab-horario'),
+            dcc.Tab(label='Ocupación', value='tab-ocupacion'),
             dcc.Tab(label='Análisis Semanal', value='tab-semanal'),
             dcc.Tab(label='Top Estaciones', value='tab-estaciones'),
             dcc.Tab(label='Distribución Energía', value='tab-energia'),
             dcc.Tab(label='Ingresos Mensuales', value='tab-ingresos'),
+            dcc.Tab(label='Pronóstico Demanda', value='tab-pronostico'),
+            dcc.Tab(label='Cohortes Usuarios', value='tab-cohortes'),
             dcc.Tab(label='Duración Sesiones', value='tab-duracion'),
+            dcc.Tab(label='Simulador Tarifas', value='tab-tarifas'),
         ]),
     ]),
     
-    html.Div(id='tabs-content', style={'marginTop': '20px'})
+    html.Div(id='tabs-content', style={'marginTop': '20px'}),
+    *([html.Div(id='contenido-cliente', style={'marginTop': '20px', 'display': 'none'})] if MODO_CLIENTE else [])
 ])
 
-# Callback carga archivo
+# Callback carga archivo: inicia la carga en segundo plano y activa la consulta de su avance
 @app.callback(
-    [Output('stored-data', 'data'),
+    [Output('trabajo-carga', 'data'),
      Output('upload-status', 'children'),
-     Output('filtro-estacion', 'options'),
-     Output('filtro-mes', 'options')],
+     Output('intervalo-carga', 'disabled')],
     [Input('upload-data', 'contents')],
     [State('upload-data', 'filename'),
-     State('stored-data', 'data')]
+     State('modo-carga', 'value'),
+     State('stored-data', 'data')],
+    prevent_initial_call=True
 )
-def cargar_archivo(contents, filename, current_data):
+@medir_callback
+def cargar_archivo(contents, filename, modo_carga, current_data):
     if contents is None:
-        if current_data:
-            df_current = pd.read_json(io.StringIO(current_data), orient='split')
-            estaciones = [{'label': 'Todas las estaciones', 'value': 'TODAS'}] + \
-                        [{'label': est, 'value': est} for est in sorted(df_current['evse_uid'].unique())]
-            meses = [{'label': 'Todos los meses', 'value': 'TODOS'}] + \
-                    [{'label': mes, 'value': num} for num, mes in 
-                     sorted(df_current.groupby('mes')['mes_nombre'].first().items())]
-            return current_data, "", estaciones, meses
-        return current_data, "", [], []
-    
-    df_new, error = procesar_datos(contents, filename)
+        return None, "", True
     
-    if error:
-        if current_data:
-            df_current = pd.read_json(io.StringIO(current_data), orient='split')
-            estaciones = [{'label': 'Todas las estaciones', 'value': 'TODAS'}] + \
-                        [{'label': est, 'value': est} for est in sorted(df_current['evse_uid'].unique())]
-            meses = [{'label': 'Todos los meses', 'value': 'TODOS'}] + \
-                    [{'label': mes, 'value': num} for num, mes in 
-                     sorted(df_current.groupby('mes')['mes_nombre'].first().items())]
-            return current_data, f"Error: {error}", estaciones, meses
-        return None, f"Error: {error}", [], []
+    def cargar():
+        with medicion('procesar_carga'):
+            return procesar_carga(contents, filename, modo_carga, current_data)
     
-    estaciones = [{'label': 'Todas las estaciones', 'value': 'TODAS'}] + \
-                [{'label': est, 'value': est} for est in sorted(df_new['evse_uid'].unique())]
-    meses = [{'label': 'Todos los meses', 'value': 'TODOS'}] + \
-            [{'label': mes, 'value': num} for num, mes in 
-             sorted(df_new.groupby('mes')['mes_nombre'].first().items())]
+    trabajo = gestor_trabajos.enviar(cargar, mensaje=f"Procesando '{filename}'...")
+    return trabajo.id, indicador_progreso(trabajo), False
+
+# Callback avance de la carga: al terminar publica la nueva versión y las opciones de los filtros,
+# que se leen del cubo de la versión (el resultado del trabajo solo guarda la versión y el mensaje)
+@app.callback(
+    [Output('stored-data', 'data'),
+     Output('upload-status', 'children', allow_duplicate=True),
+     Output('filtro-estacion', 'options'),
+     Output('filtro-mes', 'options'),
+     Output('intervalo-carga', 'disabled', allow_duplicate=True),
+     Output('boton-cuarentena', 'style')],
+    [Input('intervalo-carga', 'n_intervals')],
+    [State('trabajo-carga', 'data')],
+    prevent_initial_call=True
+)
+@medir_callback
+def revisar_carga(n_intervals, id_trabajo):
+    trabajo = gestor_trabajos.obtener(id_trabajo)
+    if trabajo is None or trabajo.estado == PERDIDO:
+        return no_update, "Error: se perdió el procesamiento del archivo; vuelva a subirlo", \
+            no_update, no_update, True, no_update
+    if trabajo.estado == CANCELADO:
+        return no_update, "", no_update, no_update, True, no_update
+    if trabajo.activo:
+        return no_update, indicador_progreso(trabajo), no_update, no_update, False, no_update
+    if trabajo.estado == ERROR:
+        return no_update, f"Error: {trabajo.error}", no_update, no_update, True, no_update
     
-    return df_new.to_json(date_format='iso', orient='split'), \
-           f"Archivo '{filename}' cargado: {len(df_new):,} registros", \
-           estaciones, meses
+    resultado = trabajo.resultado
+    if resultado['version'] is None:
+        return no_update, resultado['mensaje'], no_update, no_update, True, no_update
+    # Con varios workers el archivo lo procesó cualquiera; sin modo compartido los demás no lo tienen
+    dataset = obtener_dataset(resultado['version'])
+    if dataset is None:
+        return no_update, "Error: el archivo se procesó en otro worker; con varios workers use " \
+            "OASIS_DATOS_COMPARTIDOS", no_update, no_update, True, no_update
+    estaciones, meses = opciones_filtros(dataset.cubo)
+    estilo_boton = {'marginTop': '10px', 'display': 'inline-block' if resultado['cuarentena'] else 'none'}
+    return resultado['version'], resultado['mensaje'], estaciones, meses, True, estilo_boton
 
-# Callback KPIs
+# Callback descarga de la cuarentena del dataset actual
+@app.callback(
+    Output('descarga-cuarentena', 'data'),
+    [Input('boton-cuarentena', 'n_clicks')],
+    [State('stored-data', 'data')],
+    prevent_initial_call=True
+)
+@medir_callback
+def descargar_cuarentena(n_clicks, data):
+    dataset = obtener_dataset(data)
+    if dataset is None or dataset.cuarentena is None:
+        return no_update
+    return dcc.send_data_frame(dataset.cuarentena.to_csv, 'cuarentena.csv', index=False)
+
+# Callback modo compartido y modo vivo: las sesiones que usan una versión vigente pasan a la
+# nueva cuando se publica o se ingiere otra; las que trabajan con un archivo subido lo conservan
 @app.callback(
+    [Output('stored-data', 'data', allow_duplicate=True),
+     Output('filtro-estacion', 'options', allow_duplicate=True),
+     Output('filtro-mes', 'options', allow_duplicate=True)],
+    [Input('intervalo-publicacion', 'n_intervals')],
+    [State('stored-data', 'data')],
+    prevent_initial_call='initial_duplicate'
+)
+@medir_callback
+def revisar_publicacion(n_intervals, data):
+    if compartido is not None:
+        version = version_vigente()
+        vigentes = versiones_vigentes(DIRECTORIO_COMPARTIDO)
+    elif fuente_viva is not None:
+        version = fuente_viva.version
+        vigentes = fuente_viva.versiones
+    else:
+        return no_update, no_update, no_update
+    if version is None or version == data:
+        return no_update, no_update, no_update
+    if data is not None and data not in vigentes:
+        return no_update, no_update, no_update
+    dataset = obtener_dataset(version)
+    if dataset is None:
+        return no_update, no_update, no_update
+    estaciones, meses = opciones_filtros(dataset.cubo)
+    return version, estaciones, meses
+
+# Callback KPIs
+@callback_filtros(
     [Output('kpi-transacciones', 'children'),
      Output('kpi-energia', 'children'),
      Output('kpi-ingresos', 'children'),
@@ -295,30 +717,27 @@ def cargar_archivo(contents, filename, current_data):
      Output('kpi-duracion', 'children')],
     [Input('stored-data', 'data'),
      Input('filtro-estacion', 'value'),
-     Input('filtro-mes', 'value')]
+     Input('filtro-mes', 'value'),
+     Input('filtro-fechas', 'start_date'),
+     Input('filtro-fechas', 'end_date')]
 )
-def actualizar_kpis(data, estacion, mes):
-    if data is None:
+@medir_callback
+def actualizar_kpis(data, estacion, mes, fecha_inicio=None, fecha_fin=None):
+    dataset = obtener_dataset(data)
+    if dataset is None:
         return "0", "0", "$0", "0", "$0", "0min"
     
-    df = pd.read_json(io.StringIO(data), orient='split')
-    df['start_date_time'] = pd.to_datetime(df['start_date_time'])
-    df['end_date_time'] = pd.to_datetime(df['end_date_time'])
-    
-    df_filtrado = df.copy()
-    if estacion != 'TODAS':
-        df_filtrado = df_filtrado[df_filtrado['evse_uid'] == estacion]
-    if mes != 'TODOS':
-        df_filtrado = df_filtrado[df_filtrado['mes'] == mes]
+    kpis = obtener_vista(dataset, *normalizar_filtros(estacion, mes, fecha_inicio, fecha_fin)).kpis
+    if kpis['transacciones'] == 0:
+        return "0", "0", "$0", "0", "$0", "0min"
     
-    total_transacciones = f"{len(df_filtrado):,}"
-    total_energia = f"{df_filtrado['energy_kwh'].sum():,.0f}"
-    total_ingresos = f"${df_filtrado['amount_transaction'].sum():,.0f}"
-    usuarios_unicos = f"{df_filtrado['user_id'].nunique():,}"
-    precio_kwh = f"${(df_filtrado['amount_transaction'].sum() / df_filtrado['energy_kwh'].sum()):,.0f}"
+    total_transacciones = f"{kpis['transacciones']:,}"
+    total_energia = f"{kpis['energia']:,.0f}"
+    total_ingresos = f"${kpis['ingresos']:,.0f}"
+    usuarios_unicos = f"{kpis['usuarios']:,}"
+    precio_kwh = f"${(kpis['ingresos'] / kpis['energia']):,.0f}"
     
-    df_filtrado['duracion_minutos'] = (df_filtrado['end_date_time'] - df_filtrado['start_date_time']).dt.total_seconds() / 60
-    duracion_promedio = df_filtrado['duracion_minutos'].mean()
+    duracion_promedio = kpis['duracion_promedio']
     if duracion_promedio >= 60:
         duracion_text = f"{duracion_promedio/60:.1f}h"
     else:
@@ -326,33 +745,227 @@ def actualizar_kpis(data, estacion, mes):
     
     return total_transacciones, total_energia, total_ingresos, usuarios_unicos, precio_kwh, duracion_text
 
-# Callback contenido pestañas
-@app.callback(
-    Output('tabs-content', 'children'),
+# Callback contenido pestañas. Las pestañas pesadas se calculan en segundo plano: se muestra
+# el avance y el cálculo anterior se cancela si los filtros cambian antes de que termine.
+@callback_filtros(
+    [Output('tabs-content', 'children'),
+     Output('trabajo-contenido', 'data'),
+     Output('intervalo-contenido', 'disabled')],
     [Input('tabs', 'value'),
      Input('stored-data', 'data'),
      Input('filtro-estacion', 'value'),
-     Input('filtro-mes', 'value')]
+     Input('filtro-mes', 'value'),
+     Input('filtro-fechas', 'start_date'),
+     Input('filtro-fechas', 'end_date')],
+    [State('trabajo-contenido', 'data')]
 )
-def actualizar_contenido(tab, data, estacion, mes):
-    if data is None:
+@medir_callback
+def actualizar_contenido(tab, data, estacion, mes, fecha_inicio=None, fecha_fin=None, id_trabajo=None):
+    dataset = obtener_dataset(data)
+    if dataset is None:
+        gestor_trabajos.cancelar(id_trabajo)
         return html.Div([
             html.H3("No hay datos disponibles", style={'textAlign': 'center', 'marginTop': '50px'}),
-        ])
+        ]), None, True
+    
+    # Vista compartida con el callback de KPIs; el contenido ya construido se reutiliza
+    vista = obtener_vista(dataset, *normalizar_filtros(estacion, mes, fecha_inicio, fecha_fin))
+    clave = (vista.clave, tab)
+    
+    trabajo = gestor_trabajos.obtener(id_trabajo)
+    if trabajo is not None and trabajo.activo:
+        if trabajo.clave == repr(clave):
+            return contenido_en_progreso(trabajo), trabajo.id, False
+        gestor_trabajos.cancelar(trabajo.id)
+    
+    if tab not in PESTAÑAS_PESADAS:
+        return contenido_pestaña(tab, vista), None, True
+    
+    contenido = cache_contenido.obtener(clave)
+    if contenido is not None:
+        return contenido, None, True
+    
+    # El contenido queda en la caché; el trabajo solo informa el avance
+    def calcular_en_segundo_plano():
+        with medicion('contenido_segundo_plano'):
+            contenido_pestaña(tab, vista)
+    
+    trabajo = gestor_trabajos.enviar(calcular_en_segundo_plano, clave=repr(clave), mensaje="Calculando...")
+    return contenido_en_progreso(trabajo), trabajo.id, False
+
+# Contenido de una pestaña desde la caché o construido y guardado en ella
+def contenido_pestaña(tab, vista):
+    def construir():
+        with etapa('contenido'):
+            return construir_contenido(tab, vista)
+    return cache_contenido.obtener_o_calcular((vista.clave, tab), construir)
+
+# Callback avance de la pestaña en cálculo: cuando el trabajo termina muestra el contenido, que
+# se lee de la caché con la pestaña y los filtros actuales. Si el trabajo es de otro worker, o se
+# perdió, el contenido se toma de la caché de este worker o se calcula aquí.
+@app.callback(
+    [Output('tabs-content', 'children', allow_duplicate=True),
+     Output('intervalo-contenido', 'disabled', allow_duplicate=True)],
+    [Input('intervalo-contenido', 'n_intervals')],
+    [State('trabajo-contenido', 'data'),
+     State('tabs', 'value'),
+     State('stored-data', 'data'),
+     State('filtro-estacion', 'value'),
+     State('filtro-mes', 'value'),
+     State('filtro-fechas', 'start_date'),
+     State('filtro-fechas', 'end_date')],
+    prevent_initial_call=True
+)
+@medir_callback
+def revisar_contenido(n_intervals, id_trabajo, tab, data, estacion, mes, fecha_inicio=None, fecha_fin=None):
+    trabajo = gestor_trabajos.obtener(id_trabajo)
+    if trabajo is not None and trabajo.estado == CANCELADO:
+        return no_update, True
+    if trabajo is not None and trabajo.activo:
+        return contenido_en_progreso(trabajo), False
+    if trabajo is not None and trabajo.estado == ERROR:
+        return html.Div([
+            html.H3(f"Error al calcular la pestaña: {trabajo.error}", style={'textAlign': 'center', 'marginTop': '50px'}),
+        ]), True
+    dataset = obtener_dataset(data)
+    if dataset is None:
+        return no_update, True
+    vista = obtener_vista(dataset, *normalizar_filtros(estacion, mes, fecha_inicio, fecha_fin))
+    return contenido_pestaña(tab, vista), True
+
+def contenido_en_progreso(trabajo):
+    return html.Div(style={'textAlign': 'center', 'marginTop': '50px', 'fontSize': '16px'},
+                    children=[indicador_progreso(trabajo)])
+
+# Modo cliente: el navegador recibe el cubo una vez por versión y calcula los KPIs y las pestañas
+# de agregados (horario, semanal, estaciones, ingresos). Con rango de fechas (el cubo no tiene
+# fechas) o en las demás pestañas deja un pedido en solicitud-kpis o solicitud-contenido y
+# responde el servidor como siempre.
+if MODO_CLIENTE:
+    # Cubos de los lotes agregados desde la versión `desde` hasta `hasta`, en orden. None si la
+    # cadena de deltas no llega a `desde` (un archivo completo, una versión ya desalojada o más
+    # de `maximo` lotes): entonces se envía el cubo completo.
+    def cadena_deltas(desde, hasta, maximo=MAX_DELTAS_CLIENTE):
+        cubos = []
+        version = hasta
+        while version != desde:
+            if desde is None or len(cubos) >= maximo:
+                return None
+            dataset = obtener_dataset(version)
+            if dataset is None or dataset.delta is None:
+                return None
+            version, cubo = dataset.delta
+            cubos.append(cubo)
+        return cubos[::-1]
+    
+    @app.callback(
+        [Output('cubo-cliente', 'data'),
+         Output('delta-cliente', 'data')],
+        [Input('stored-data', 'data')],
+        [State('cubo-cliente', 'data')]
+    )
+    @medir_callback
+    def enviar_cubo(data, cubo_actual):
+        dataset = obtener_dataset(data)
+        if dataset is None:
+            return {'version': None, 'celdas': None}, no_update
+        version_cliente = (cubo_actual or {}).get('version')
+        if version_cliente == data:
+            return no_update, no_update
+        cubos = cadena_deltas(version_cliente, data) if (cubo_actual or {}).get('celdas') else None
+        if cubos is not None:
+            return no_update, {'version': data,
+                               'deltas': [cubo.para_cliente(max_usuarios=None) if cubo is not None else None
+                                          for cubo in cubos]}
+        return {'version': data, **dataset.cubo.para_cliente()}, no_update
+    
+    app.clientside_callback(
+        ClientsideFunction(namespace='oasis', function_name='aplicarDeltas'),
+        Output('cubo-cliente', 'data', allow_duplicate=True),
+        [Input('delta-cliente', 'data')],
+        [State('cubo-cliente', 'data')],
+        prevent_initial_call=True
+    )
+    
+    app.clientside_callback(
+        ClientsideFunction(namespace='oasis', function_name='kpis'),
+        [Output('kpi-transacciones', 'children'),
+         Output('kpi-energia', 'children'),
+         Output('kpi-ingresos', 'children'),
+         Output('kpi-usuarios', 'children'),
+         Output('kpi-precio-kwh', 'children'),
+         Output('kpi-duracion', 'children'),
+         Output('solicitud-kpis', 'data')],
+        [Input('cubo-cliente', 'data'),
+         Input('filtro-estacion', 'value'),
+         Input('filtro-mes', 'value'),
+         Input('filtro-fechas', 'start_date'),
+         Input('filtro-fechas', 'end_date')]
+    )
     
-    df = pd.read_json(io.StringIO(data), orient='split')
-    df['start_date_time'] = pd.to_datetime(df['start_date_time'])
-    df['end_date_time'] = pd.to_datetime(df['end_date_time'])
+    app.clientside_callback(
+        ClientsideFunction(namespace='oasis', function_name='contenido'),
+        [Output('contenido-cliente', 'children'),
+         Output('contenido-cliente', 'style'),
+         Output('tabs-content', 'style'),
+         Output('solicitud-contenido', 'data')],
+        [Input('tabs', 'value'),
+         Input('cubo-cliente', 'data'),
+         Input('filtro-estacion', 'value'),
+         Input('filtro-mes', 'value'),
+         Input('filtro-fechas', 'start_date'),
+         Input('filtro-fechas', 'end_date')],
+        [State('estilo-cliente', 'data')]
+    )
     
-    df_filtrado = df.copy()
-    if estacion != 'TODAS':
-        df_filtrado = df_filtrado[df_filtrado['evse_uid'] == estacion]
-    if mes != 'TODOS':
-        df_filtrado = df_filtrado[df_filtrado['mes'] == mes]
+    @app.callback(
+        [Output('kpi-transacciones', 'children', allow_duplicate=True),
+         Output('kpi-energia', 'children', allow_duplicate=True),
+         Output('kpi-ingresos', 'children', allow_duplicate=True),
+         Output('kpi-usuarios', 'children', allow_duplicate=True),
+         Output('kpi-precio-kwh', 'children', allow_duplicate=True),
+         Output('kpi-duracion', 'children', allow_duplicate=True)],
+        [Input('solicitud-kpis', 'data')],
+        [State('stored-data', 'data'),
+         State('filtro-estacion', 'value'),
+         State('filtro-mes', 'value'),
+         State('filtro-fechas', 'start_date'),
+         State('filtro-fechas', 'end_date')],
+        prevent_initial_call=True
+    )
+    def kpis_solicitados(solicitud, data, estacion, mes, fecha_inicio, fecha_fin):
+        return actualizar_kpis(data, estacion, mes, fecha_inicio, fecha_fin)
+    
+    @app.callback(
+        [Output('tabs-content', 'children', allow_duplicate=True),
+         Output('trabajo-contenido', 'data'),
+         Output('intervalo-contenido', 'disabled', allow_duplicate=True)],
+        [Input('solicitud-contenido', 'data')],
+        [State('tabs', 'value'),
+         State('stored-data', 'data'),
+         State('filtro-estacion', 'value'),
+         State('filtro-mes', 'value'),
+         State('filtro-fechas', 'start_date'),
+         State('filtro-fechas', 'end_date'),
+         State('trabajo-contenido', 'data')],
+        prevent_initial_call=True
+    )
+    def contenido_solicitado(solicitud, tab, data, estacion, mes, fecha_inicio, fecha_fin, id_trabajo):
+        return actualizar_contenido(tab, data, estacion, mes, fecha_inicio, fecha_fin, id_trabajo)
+
+# Construye la figura y el panel de análisis de una pestaña para una vista filtrada
+def construir_contenido(tab, vista):
+    # Las pestañas de conteos y sumas se responden desde los agregados de la vista
+    cubo = vista.cubo
+    total = vista.kpis['transacciones']
+    if total == 0:
+        return html.Div([
+            html.H3("No hay transacciones para los filtros seleccionados", style={'textAlign': 'center', 'marginTop': '50px'}),
+        ])
     
     # TAB 1: Uso Horario
     if tab == 'tab-horario':
-        uso_horario = df_filtrado.groupby('hora').size().reset_index(name='transacciones')
+        uso_horario = cubo.por_hora()
         fig = px.bar(uso_horario, x='hora', y='transacciones',
                      title='Transacciones por Hora del Día',
                      labels={'hora': 'Hora', 'transacciones': 'Número de Transacciones'},
@@ -372,7 +985,7 @@ def actualizar_contenido(tab, data, estacion, mes):
                 html.P([
                     html.Strong("Hora pico: "), 
                     f"Las {hora_pico:02d}:00 horas registran el mayor número de transacciones ({trans_pico:,}), "
-                    f"lo que representa un {(trans_pico/len(df_filtrado)*100):.1f}% del total de cargas."
+                    f"lo que representa un {(trans_pico/total*100):.1f}% del total de cargas."
                 ]),
                 html.P([
                     html.Strong("Hora de menor actividad: "),
@@ -393,13 +1006,74 @@ def actualizar_contenido(tab, data, estacion, mes):
             ])
         ])
     
+    # TAB 1b: Ocupación de cargadores
+    elif tab == 'tab-ocupacion':
+        ocupacion = vista.ocupacion
+        if ocupacion is None:
+            return html.Div([
+                html.H3("No hay sesiones con fecha de finalización para calcular la ocupación",
+                        style={'textAlign': 'center', 'marginTop': '50px'}),
+            ])
+        orden_dias = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        dias_esp = {'Monday': 'Lunes', 'Tuesday': 'Martes', 'Wednesday': 'Miércoles', 
+                    'Thursday': 'Jueves', 'Friday': 'Viernes', 'Saturday': 'Sábado', 'Sunday': 'Domingo'}
+        
+        por_hora_dia = ocupacion['por_hora_dia']
+        matriz = por_hora_dia.pivot(index='dia_semana', columns='hora', values='utilizacion_pct') \
+                             .reindex(index=orden_dias, columns=range(24)).fillna(0)
+        fig = go.Figure(go.Heatmap(z=matriz.values, x=list(range(24)), y=[dias_esp[d] for d in orden_dias],
+                                   colorscale='Reds', colorbar=dict(title='Utilización (%)')))
+        fig.update_layout(title='Utilización de Cargadores por Día y Hora (% del tiempo con sesión activa)',
+                          xaxis_title='Hora', yaxis_title='Día')
+        
+        franja = por_hora_dia.loc[por_hora_dia['utilizacion_pct'].idxmax()]
+        dia_franja = dias_esp[franja['dia_semana']]
+        hora_franja = int(franja['hora'])
+        cargador_top = ocupacion['por_cargador'].iloc[0]
+        cargadores_solapados = int((ocupacion['por_cargador']['pico'] > 1).sum())
+        
+        return html.Div([
+            dcc.Graph(figure=fig),
+            html.Div(style=analysis_style, children=[
+                html.H4("Análisis de Ocupación de Cargadores"),
+                html.P([
+                    html.Strong("Utilización global: "),
+                    f"Considerando {ocupacion['n_cargadores']} cargador(es), hubo al menos una sesión activa el "
+                    f"{ocupacion['utilizacion_pct']:.1f}% del tiempo en un periodo de {ocupacion['periodo_horas']:,} horas."
+                ]),
+                html.P([
+                    html.Strong("Franja más ocupada: "),
+                    f"{dia_franja} a las {hora_franja:02d}:00 horas, con {franja['utilizacion_pct']:.1f}% de utilización "
+                    f"y hasta {int(franja['pico'])} sesiones simultáneas en un mismo cargador."
+                ]),
+                html.P([
+                    html.Strong("Cargador más utilizado: "),
+                    f"{cargador_top['evse_uid']} (conector {cargador_top['connector_id']}) con {cargador_top['utilizacion_pct']:.1f}% "
+                    f"del tiempo ocupado ({cargador_top['horas_ocupado']:,.0f} horas en {int(cargador_top['sesiones']):,} sesiones)."
+                ]),
+                html.P([
+                    html.Strong("Interpretación: "),
+                    "A diferencia del conteo por hora de inicio, la ocupación mide cuánto tiempo permanece realmente "
+                    "ocupado cada cargador, incluyendo sesiones que se extienden durante varias horas. "
+                    f"{cargadores_solapados} cargador(es) registran más de una sesión simultánea en el mismo conector "
+                    f"(pico de {ocupacion['pico']}), lo que indica registros solapados que conviene revisar."
+                ]),
+                html.P([
+                    html.Strong("Recomendaciones: "),
+                    f"Priorizar la ampliación de capacidad en las franjas cercanas a {dia_franja} {hora_franja:02d}:00 "
+                    "y en los cargadores con mayor utilización. En las franjas de baja ocupación, evaluar tarifas "
+                    "dinámicas o ventanas de mantenimiento que no afecten la disponibilidad para los usuarios."
+                ])
+            ])
+        ])
+    
     # TAB 2: Uso Semanal
     elif tab == 'tab-semanal':
         orden_dias = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
         dias_esp = {'Monday': 'Lunes', 'Tuesday': 'Martes', 'Wednesday': 'Miércoles', 
                     'Thursday': 'Jueves', 'Friday': 'Viernes', 'Saturday': 'Sábado', 'Sunday': 'Domingo'}
         
-        uso_diario = df_filtrado.groupby('dia_semana').size().reset_index(name='transacciones')
+        uso_diario = cubo.por_dia()
         uso_diario['dia_semana'] = pd.Categorical(uso_diario['dia_semana'], categories=orden_dias, ordered=True)
         uso_diario = uso_diario.sort_values('dia_semana')
         uso_diario['dia_esp'] = uso_diario['dia_semana'].map(dias_esp)
@@ -422,11 +1096,11 @@ def actualizar_contenido(tab, data, estacion, mes):
                 html.H4("Análisis del Comportamiento Semanal"),
                 html.P([
                     html.Strong("Día de mayor demanda: "),
-                    f"{dia_mayor} con {trans_mayor:,} transacciones ({(trans_mayor/len(df_filtrado)*100):.1f}% del total semanal)."
+                    f"{dia_mayor} con {trans_mayor:,} transacciones ({(trans_mayor/total*100):.1f}% del total semanal)."
                 ]),
                 html.P([
                     html.Strong("Día de menor demanda: "),
-                    f"{dia_menor} con {trans_menor:,} transacciones ({(trans_menor/len(df_filtrado)*100):.1f}% del total)."
+                    f"{dia_menor} con {trans_menor:,} transacciones ({(trans_menor/total*100):.1f}% del total)."
                 ]),
                 html.P([
                     html.Strong("Interpretación: "),
@@ -446,10 +1120,7 @@ def actualizar_contenido(tab, data, estacion, mes):
     
     # TAB 3: Top Estaciones
     elif tab == 'tab-estaciones':
-        top_estaciones = df_filtrado.groupby('evse_uid').agg({
-            'id': 'count',
-            'amount_transaction': 'sum'
-        }).reset_index()
+        top_estaciones = cubo.por_estacion()
         top_estaciones.columns = ['estacion', 'transacciones', 'ingresos']
         top_estaciones = top_estaciones.sort_values('transacciones', ascending=False).head(10)
         
@@ -472,13 +1143,13 @@ def actualizar_contenido(tab, data, estacion, mes):
                 html.H4("Análisis de Estaciones de Mayor Rendimiento"),
                 html.P([
                     html.Strong("Estación líder: "),
-                    f"{estacion_top} con {trans_top:,} transacciones ({(trans_top/len(df_filtrado)*100):.1f}% del total) "
+                    f"{estacion_top} con {trans_top:,} transacciones ({(trans_top/total*100):.1f}% del total) "
                     f"y ${ingresos_top:,.0f} en ingresos."
                 ]),
                 html.P([
                     html.Strong("Concentración top 5: "),
                     f"Las cinco estaciones principales concentran {top5_trans:,} transacciones, "
-                    f"representando el {(top5_trans/len(df_filtrado)*100):.1f}% del volumen total."
+                    f"representando el {(top5_trans/total*100):.1f}% del volumen total."
                 ]),
                 html.P([
                     html.Strong("Interpretación: "),
@@ -499,16 +1170,20 @@ def actualizar_contenido(tab, data, estacion, mes):
     
     # TAB 4: Distribución Energía
     elif tab == 'tab-energia':
-        fig = px.histogram(df_filtrado, x='energy_kwh',
-                          title='Distribución de Energía por Transacción',
-                          labels={'energy_kwh': 'Energía (kWh)', 'count': 'Frecuencia'},
-                          nbins=30,
-                          color_discrete_sequence=['#3498db'])
+        # Histograma con bins calculados en el servidor
+        bins = vista.histograma_energia
+        fig = go.Figure(go.Bar(x=bins['centros'], y=bins['conteos'], width=bins['anchos'],
+                               marker_color='#3498db'))
+        fig.update_layout(title='Distribución de Energía por Transacción',
+                          xaxis_title='Energía (kWh)',
+                          yaxis_title='Frecuencia',
+                          bargap=0)
         
-        energia_prom = df_filtrado['energy_kwh'].mean()
-        energia_med = df_filtrado['energy_kwh'].median()
-        energia_max = df_filtrado['energy_kwh'].max()
-        energia_min = df_filtrado['energy_kwh'].min()
+        stats_energia = vista.estadisticas_energia
+        energia_prom = stats_energia['promedio']
+        energia_med = stats_energia['mediana']
+        energia_max = stats_energia['maximo']
+        energia_min = stats_energia['minimo']
         
         return html.Div([
             dcc.Graph(figure=fig),
@@ -538,10 +1213,7 @@ def actualizar_contenido(tab, data, estacion, mes):
     
     # TAB 5: Ingresos Mensuales
     elif tab == 'tab-ingresos':
-        ingresos_mes = df_filtrado.groupby('mes').agg({
-            'amount_transaction': 'sum',
-            'mes_nombre': 'first'
-        }).reset_index()
+        ingresos_mes = cubo.por_mes().rename(columns={'ingresos': 'amount_transaction'})
         ingresos_mes = ingresos_mes.sort_values('mes')
         
         fig = go.Figure()
@@ -602,20 +1274,211 @@ def actualizar_contenido(tab, data, estacion, mes):
             ])
         ])
     
+    # TAB 5b: Pronóstico de demanda (series diarias por estación)
+    elif tab == 'tab-pronostico':
+        pronostico = vista.pronostico
+        if pronostico is None:
+            return html.Div([
+                html.H3("No hay fechas de inicio para construir las series diarias", style={'textAlign': 'center', 'marginTop': '50px'}),
+            ])
+        fechas_futuras = pronostico['fechas_pronostico']
+        proyeccion = pronostico['pronostico']
+        margen = 1.96 * pronostico['desviacion']
+        
+        fig = go.Figure()
+        fig.add_trace(go.Bar(x=pronostico['fechas'], y=pronostico['diario'], name='Transacciones diarias',
+                             marker_color='#bdc3c7'))
+        fig.add_trace(go.Scatter(x=pronostico['fechas'], y=pronostico['promedio_7'], mode='lines',
+                                 name='Promedio móvil 7 días', line=dict(color=colors['secondary'], width=2)))
+        fig.add_trace(go.Scatter(x=pronostico['fechas'], y=pronostico['promedio_28'], mode='lines',
+                                 name='Promedio móvil 28 días', line=dict(color=colors['primary'], width=2)))
+        fig.add_trace(go.Scatter(x=list(fechas_futuras) + list(fechas_futuras[::-1]),
+                                 y=list(proyeccion + margen) + list(np.clip(proyeccion - margen, 0, None)[::-1]),
+                                 fill='toself', fillcolor='rgba(230, 126, 34, 0.2)', line=dict(width=0),
+                                 name='Intervalo 95%', hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=fechas_futuras, y=proyeccion, mode='lines', name='Pronóstico',
+                                 line=dict(color='#e67e22', width=3, dash='dash')))
+        fig.update_layout(title=f'Demanda Diaria y Pronóstico a {len(fechas_futuras)} Días',
+                          xaxis_title='Fecha', yaxis_title='Transacciones', hovermode='x unified')
+        
+        ultimos_7 = pronostico['ultimos_7']
+        ultimos_28 = pronostico['ultimos_28']
+        anteriores_7 = pronostico['anteriores_7']['transacciones']
+        comparacion_semana = ""
+        if pd.notna(anteriores_7) and anteriores_7 > 0:
+            variacion_semana = (ultimos_7['transacciones'] / anteriores_7 - 1) * 100
+            comparacion_semana = f" ({variacion_semana:+.1f}% frente a la semana anterior)"
+        total_pronostico = proyeccion.sum()
+        cambio_pronostico = (total_pronostico / ultimos_28['transacciones'] - 1) * 100 if ultimos_28['transacciones'] else 0
+        
+        dias_esp = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+        semana = proyeccion[:7]
+        dia_mayor = dias_esp[fechas_futuras[int(semana.argmax())].dayofweek]
+        dia_menor = dias_esp[fechas_futuras[int(semana.argmin())].dayofweek]
+        
+        parrafos = [
+            html.P([
+                html.Strong("Última semana: "),
+                f"{ultimos_7['transacciones']:,.0f} transacciones{comparacion_semana}, "
+                f"{ultimos_7['energia']:,.0f} kWh y ${ultimos_7['ingresos']:,.0f} en ingresos."
+            ]),
+            html.P([
+                html.Strong("Últimos 28 días: "),
+                f"{ultimos_28['transacciones']:,.0f} transacciones ({ultimos_28['transacciones'] / 28:.1f} por día), "
+                f"{ultimos_28['energia']:,.0f} kWh y ${ultimos_28['ingresos']:,.0f} en ingresos."
+            ]),
+            html.P([
+                html.Strong(f"Pronóstico próximos {len(fechas_futuras)} días: "),
+                f"{total_pronostico:,.0f} transacciones ({cambio_pronostico:+.1f}% frente a los últimos 28 días), "
+                f"con un margen aproximado de ±{margen * np.sqrt(len(fechas_futuras)):,.0f} transacciones."
+            ]),
+        ]
+        if pronostico['error_validacion'] is not None:
+            parrafos.append(html.P([
+                html.Strong("Validación: "),
+                f"Ajustado sin los últimos {DIAS_VALIDACION} días, el modelo se desvió un {pronostico['error_validacion']:.1f}% "
+                "de la demanda real de ese periodo."
+            ]))
+        variacion = pronostico['variacion_estaciones']
+        variacion = variacion[variacion['ultimos_28'] > 0]
+        if len(variacion) > 1:
+            variacion = variacion.assign(cambio=(variacion['proximos_28'] / variacion['ultimos_28'] - 1) * 100)
+            crecimiento = variacion.sort_values('cambio', ascending=False).head(3)
+            parrafos.append(html.P([
+                html.Strong("Mayor crecimiento proyectado: "),
+                ", ".join(f"{fila.estacion} ({fila.cambio:+.1f}%)" for fila in crecimiento.itertuples()) + "."
+            ]))
+        
+        return html.Div([
+            dcc.Graph(figure=fig),
+            html.Div(style=analysis_style, children=[
+                html.H4("Análisis y Pronóstico de Demanda"),
+                *parrafos,
+                html.P([
+                    html.Strong("Interpretación: "),
+                    f"El modelo combina el nivel y la tendencia de las últimas {DIAS_AJUSTE // 7} semanas con el patrón de cada "
+                    "día de la semana, y se ajusta para todas las estaciones a la vez; el pronóstico del grupo seleccionado es "
+                    "la suma de los de sus estaciones. Los filtros de mes y de rango de fechas no se aplican a esta pestaña."
+                ]),
+                html.P([
+                    html.Strong("Recomendaciones: "),
+                    f"Programar mantenimientos para el {dia_menor}, el día de menor demanda proyectada, y asegurar la "
+                    f"disponibilidad de los cargadores el {dia_mayor}. Revisar la capacidad de las estaciones con mayor "
+                    "crecimiento proyectado antes de que la demanda supere su ocupación actual."
+                ])
+            ])
+        ])
+    
+    # Cohortes de usuarios: retención por mes de adquisición, sesiones por usuario y fidelidad
+    elif tab == 'tab-cohortes':
+        analisis = vista.cohortes
+        if analisis is None:
+            return html.Div([
+                html.H3("No hay usuarios con sesiones para los filtros seleccionados", style={'textAlign': 'center', 'marginTop': '50px'}),
+            ])
+        retencion = analisis['retencion'] * 100
+        etiquetas_cohorte = [f"{c} ({n:,})" for c, n in zip(analisis['cohortes'], analisis['tamaños'])]
+        fig = go.Figure(go.Heatmap(z=retencion, x=[f"Mes {k}" for k in range(retencion.shape[1])], y=etiquetas_cohorte,
+                                   colorscale='Blues', zmin=0, zmax=100, texttemplate='%{z:.0f}%',
+                                   hovertemplate='Cohorte %{y}<br>%{x}: %{z:.1f}% activos<extra></extra>',
+                                   colorbar=dict(title='Activos (%)')))
+        fig.update_layout(title='Retención por Cohorte de Adquisición (mes de la primera sesión)',
+                          xaxis_title='Meses desde la primera sesión', yaxis_title='Cohorte (usuarios)',
+                          yaxis=dict(autorange='reversed'), height=max(400, 28 * len(etiquetas_cohorte) + 150))
+        
+        fig_sesiones = px.bar(x=ETIQUETAS_SESIONES, y=analisis['usuarios_tramo'],
+                              title='Usuarios por Número de Sesiones',
+                              labels={'x': 'Sesiones por usuario', 'y': 'Usuarios'},
+                              color=analisis['usuarios_tramo'], color_continuous_scale='Greens')
+        fig_sesiones.update_layout(showlegend=False, coloraxis_showscale=False)
+        
+        fig_fidelidad = px.bar(x=[f"{10 * i}-{10 * (i + 1)}%" for i in range(10)], y=analisis['fidelidad_recurrentes'],
+                               title='Fidelidad de Usuarios Recurrentes a su Estación Principal',
+                               labels={'x': 'Sesiones en la estación principal', 'y': 'Usuarios'},
+                               color=analisis['fidelidad_recurrentes'], color_continuous_scale='Oranges')
+        fig_fidelidad.update_layout(showlegend=False, coloraxis_showscale=False)
+        
+        usuarios = analisis['usuarios']
+        recurrentes = analisis['recurrentes']
+        pct_recurrentes = recurrentes / usuarios * 100
+        pct_fieles = analisis['fieles'] / recurrentes * 100 if recurrentes else 0
+        pct_multiestacion = analisis['multiestacion'] / recurrentes * 100 if recurrentes else 0
+        por_estacion = analisis['por_estacion']
+        parrafos = [
+            html.P([
+                html.Strong("Usuarios: "),
+                f"{usuarios:,} usuarios únicos, de los cuales {recurrentes:,} ({pct_recurrentes:.1f}%) volvieron a cargar al "
+                f"menos una vez. Cada usuario realizó en promedio {analisis['sesiones_promedio']:.1f} sesiones "
+                f"(mediana {analisis['sesiones_mediana']:.0f}) y estuvo activo {analisis['meses_activos_promedio']:.1f} meses."
+            ]),
+        ]
+        retencion_total = analisis['retencion_total'] * 100
+        if len(retencion_total) > 1:
+            parrafos.append(html.P([
+                html.Strong("Retención: "),
+                f"El {retencion_total[1]:.1f}% de los usuarios vuelve a cargar el mes siguiente a su primera sesión"
+                + (f" y el {retencion_total[3]:.1f}% sigue activo tres meses después." if len(retencion_total) > 3 else ".")
+            ]))
+        # La fidelidad solo se define para usuarios con más de una sesión
+        if recurrentes:
+            parrafos.append(html.P([
+                html.Strong("Fidelidad: "),
+                f"Los usuarios recurrentes realizan en promedio el {analisis['fidelidad_promedio'] * 100:.1f}% de sus sesiones en su "
+                f"estación principal; {analisis['fieles']:,} ({pct_fieles:.1f}%) cargan al menos el {UMBRAL_FIEL * 100:.0f}% de las "
+                f"veces en la misma estación y {analisis['multiestacion']:,} ({pct_multiestacion:.1f}%) usan tres o más estaciones."
+            ]))
+        if len(por_estacion) > 0:
+            parrafos.append(html.P([
+                html.Strong("Estaciones con más usuarios recurrentes: "),
+                ", ".join(f"{fila.estacion} ({fila.usuarios_principales:,}, {fila.usuarios_fieles:,} fieles)"
+                          for fila in por_estacion.head(3).itertuples()) + "."
+            ]))
+        
+        return html.Div([
+            dcc.Graph(figure=fig),
+            html.Div(style={'display': 'flex'}, children=[
+                html.Div(dcc.Graph(figure=fig_sesiones), style={'width': '50%'}),
+                html.Div(dcc.Graph(figure=fig_fidelidad), style={'width': '50%'}),
+            ]),
+            html.Div(style=analysis_style, children=[
+                html.H4("Análisis de Cohortes y Retención de Usuarios"),
+                *parrafos,
+                html.P([
+                    html.Strong("Interpretación: "),
+                    "Cada fila agrupa a los usuarios por el mes de su primera sesión dentro de los filtros seleccionados y "
+                    "muestra qué porcentaje de ellos cargó en cada mes posterior. Una retención que cae rápido tras el primer "
+                    "mes indica usuarios ocasionales; una fidelidad alta indica que la mayoría depende de una sola estación, "
+                    "por lo que su disponibilidad es decisiva para conservarlos."
+                ]),
+                html.P([
+                    html.Strong("Recomendaciones: "),
+                    "Ofrecer un beneficio en la segunda carga para convertir a los usuarios de una sola sesión en recurrentes, "
+                    "priorizar el mantenimiento de las estaciones con más usuarios fieles y comunicar las estaciones cercanas "
+                    "a los usuarios que dependen de una sola, para que no se pierdan cuando esté ocupada."
+                ])
+            ])
+        ])
+    
     # TAB 6: Duración Sesiones
     elif tab == 'tab-duracion':
-        df_filtrado['duracion_minutos'] = (df_filtrado['end_date_time'] - df_filtrado['start_date_time']).dt.total_seconds() / 60
-        
-        fig = px.box(df_filtrado, y='duracion_minutos',
-                     title='Distribución de Duración de Sesiones',
-                     labels={'duracion_minutos': 'Duración (minutos)'},
-                     color_discrete_sequence=['#9b59b6'])
-        fig.update_layout(showlegend=False)
+        # Diagrama de caja con cuartiles, bigotes y muestra de atípicos calculados en el servidor
+        caja = vista.caja_duracion
+        fig = go.Figure()
+        if caja is not None:
+            fig.add_trace(go.Box(x=['Sesiones'], q1=[caja['q1']], median=[caja['mediana']], q3=[caja['q3']],
+                                 lowerfence=[caja['bigote_inferior']], upperfence=[caja['bigote_superior']],
+                                 mean=[caja['promedio']], boxpoints=False, marker_color='#9b59b6'))
+            fig.add_trace(go.Scatter(x=['Sesiones'] * len(caja['atipicos']), y=caja['atipicos'],
+                                     mode='markers', marker=dict(color='#9b59b6', size=5)))
+        fig.update_layout(title='Distribución de Duración de Sesiones',
+                          yaxis_title='Duración (minutos)',
+                          showlegend=False)
         
-        dur_prom = df_filtrado['duracion_minutos'].mean()
-        dur_med = df_filtrado['duracion_minutos'].median()
-        sesiones_largas = len(df_filtrado[df_filtrado['duracion_minutos'] > 240])
-        pct_largas = (sesiones_largas / len(df_filtrado)) * 100
+        stats_duracion = vista.estadisticas_duracion
+        dur_prom = stats_duracion['promedio']
+        dur_med = stats_duracion['mediana']
+        sesiones_largas = int((vista.duracion_minutos > 240).sum())
+        pct_largas = (sesiones_largas / total) * 100
         
         return html.Div([
             dcc.Graph(figure=fig),
@@ -649,6 +1512,78 @@ def actualizar_contenido(tab, data, estacion, mes):
                 ])
             ])
         ])
+    
+    # TAB 7: Simulador de tarifas
+    elif tab == 'tab-tarifas':
+        simulacion = vista.simulacion_tarifas
+        resumen = simulacion['resumen']
+        
+        fig = px.scatter(resumen, x='participacion_valle_pct', y='variacion_ingresos_pct',
+                         color=resumen['descuento_valle'] * 100,
+                         title=f'Escenarios Tarifarios Simulados ({len(resumen):,})',
+                         labels={'participacion_valle_pct': 'Energía en Horas Valle (%)',
+                                 'variacion_ingresos_pct': 'Variación de Ingresos (%)',
+                                 'color': 'Descuento Valle (%)'},
+                         hover_data=['recargo_pico', 'descuento_estandar', 'descuento_premium'],
+                         color_continuous_scale='Viridis')
+        
+        # Escenario recomendado: el que más energía lleva a horas valle sin reducir los ingresos
+        sin_perdida = resumen[resumen['variacion_ingresos_pct'] >= 0]
+        if len(sin_perdida) > 0:
+            recomendado = sin_perdida.sort_values(['participacion_valle_pct', 'variacion_ingresos_pct'],
+                                                  ascending=False, kind='stable').iloc[0]
+        else:
+            recomendado = resumen.loc[resumen['variacion_ingresos_pct'].idxmax()]
+        mejor_ingreso = resumen.loc[resumen['variacion_ingresos_pct'].idxmax()]
+        
+        fig_horas = go.Figure()
+        fig_horas.add_trace(go.Bar(x=list(range(24)), y=simulacion['energia_hora_base'],
+                                   name='Actual', marker_color='#95a5a6'))
+        fig_horas.add_trace(go.Bar(x=list(range(24)), y=simulacion['energia_hora'][recomendado.name],
+                                   name='Escenario recomendado', marker_color='#27ae60'))
+        fig_horas.update_layout(title='Energía por Hora: Actual vs Escenario Recomendado',
+                                xaxis_title='Hora del Día', yaxis_title='Energía (kWh)', barmode='group')
+        
+        horas_valle = ', '.join(f"{h:02d}:00" for h in simulacion['horas_valle'])
+        horas_pico = ', '.join(f"{h:02d}:00" for h in simulacion['horas_pico'])
+        
+        return html.Div([
+            dcc.Graph(figure=fig),
+            dcc.Graph(figure=fig_horas),
+            html.Div(style=analysis_style, children=[
+                html.H4("Simulación de Escenarios Tarifarios"),
+                html.P([
+                    html.Strong("Escenarios evaluados: "),
+                    f"{len(resumen):,} combinaciones de descuento en horas valle ({horas_valle}), recargo en horas pico "
+                    f"({horas_pico}) y descuentos por tramos de kWh, sobre ${simulacion['ingresos_base']:,.0f} de ingresos actuales."
+                ]),
+                html.P([
+                    html.Strong("Escenario recomendado: "),
+                    f"Descuento valle de {recomendado['descuento_valle']*100:.0f}%, recargo pico de {recomendado['recargo_pico']*100:.0f}%, "
+                    f"descuento de {recomendado['descuento_estandar']*100:.0f}% en el tramo estándar y de "
+                    f"{recomendado['descuento_premium']*100:.0f}% en el tramo premium. Los ingresos varían "
+                    f"{recomendado['variacion_ingresos_pct']:+.1f}% y la energía en horas valle pasa de "
+                    f"{simulacion['participacion_valle_base_pct']:.1f}% a {recomendado['participacion_valle_pct']:.1f}%."
+                ]),
+                html.P([
+                    html.Strong("Máximo ingreso: "),
+                    f"{mejor_ingreso['variacion_ingresos_pct']:+.1f}% con recargo pico de {mejor_ingreso['recargo_pico']*100:.0f}% "
+                    f"y descuento valle de {mejor_ingreso['descuento_valle']*100:.0f}%."
+                ]),
+                html.P([
+                    html.Strong("Interpretación: "),
+                    "Cada escenario multiplica el precio actual por kWh de cada transacción según su hora y su tramo de energía. "
+                    f"La demanda responde con una elasticidad de {ELASTICIDAD}: los descuentos atraen energía y los recargos "
+                    "la reducen, por lo que los ingresos crecen menos que el precio. Los resultados son proyecciones del modelo."
+                ]),
+                html.P([
+                    html.Strong("Recomendaciones: "),
+                    "Aplicar el escenario recomendado como piloto en un grupo reducido de estaciones y comparar la participación "
+                    "real de las horas valle con la proyectada antes de extenderlo a toda la red."
+                ])
+            ])
+        ])
+
 
 if __name__ == '__main__':
     app.run(debug=True, port=8050)
\ No newline at end of file
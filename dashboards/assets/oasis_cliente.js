@@ -0,0 +1,386 @@
+// Modo cliente del dashboard (OASIS_CLIENTE=1, ver app_dashboard.py).
+// El navegador recibe el cubo de agregados (estación × mes × día × hora) una sola vez por
+// versión y recalcula aquí los KPIs y las pestañas de agregados al cambiar los filtros, con
+// las mismas figuras y textos que construir_contenido. Lo que el cubo no puede responder
+// (rango de fechas, demás pestañas) se pide al servidor a través de las solicitudes.
+// Cuando se agregan lotes (carga en modo agregar o modo vivo) llegan solo sus cubos.
+
+(function () {
+    var ORDEN_DIAS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'];
+    var DIAS_ESP = {
+        Monday: 'Lunes', Tuesday: 'Martes', Wednesday: 'Miércoles', Thursday: 'Jueves',
+        Friday: 'Viernes', Saturday: 'Sábado', Sunday: 'Domingo'
+    };
+    var KPIS_VACIOS = ['0', '0', '$0', '0', '$0', '0min'];
+
+    // Formatos equivalentes a los de Python: {:,}, {:,.Nf}, {:.Nf}, {:+.Nf} y {:02d}
+    function miles(valor, decimales) {
+        decimales = decimales || 0;
+        return valor.toLocaleString('en-US', {minimumFractionDigits: decimales, maximumFractionDigits: decimales});
+    }
+    function fijo(valor, decimales) {
+        return valor.toFixed(decimales);
+    }
+    function signo(valor, decimales) {
+        return (valor >= 0 ? '+' : '') + valor.toFixed(decimales);
+    }
+    function dosDigitos(valor) {
+        return (valor < 10 ? '0' : '') + valor;
+    }
+
+    // Celdas y pares de usuarios que cumplen los filtros (mismas reglas que normalizar_filtros)
+    function filtrar(cubo, estacion, mes) {
+        if (typeof estacion === 'string') {
+            estacion = [estacion];
+        }
+        var elegidas = (estacion || []).filter(function (est) { return est !== 'TODAS'; });
+        var codigos = null;
+        if (elegidas.length) {
+            codigos = {};
+            elegidas.forEach(function (est) {
+                var codigo = cubo.estaciones.indexOf(est);
+                if (codigo >= 0) {
+                    codigos[codigo] = true;
+                }
+            });
+        }
+        var numeroMes = (mes === null || mes === undefined || mes === 'TODOS') ? null : Number(mes);
+        function cumple(columnas, i) {
+            return (codigos === null || codigos[columnas.estacion[i]]) &&
+                (numeroMes === null || columnas.mes[i] === numeroMes);
+        }
+        var celdas = [];
+        for (var i = 0; i < cubo.celdas.estacion.length; i++) {
+            if (cumple(cubo.celdas, i)) {
+                celdas.push(i);
+            }
+        }
+        var usuarios = null;
+        if (cubo.usuarios) {
+            usuarios = new Set();
+            for (var j = 0; j < cubo.usuarios.estacion.length; j++) {
+                if (cumple(cubo.usuarios, j)) {
+                    usuarios.add(cubo.usuarios.usuario[j]);
+                }
+            }
+        }
+        return {celdas: celdas, usuarios: usuarios};
+    }
+
+    function sumar(cubo, celdas, columna) {
+        var valores = cubo.celdas[columna];
+        var total = 0;
+        celdas.forEach(function (i) { total += valores[i]; });
+        return total;
+    }
+
+    // Suma de columnas agrupada por una dimensión: {clave: [suma1, suma2, ...]}
+    function agrupar(cubo, celdas, dimension, columnas) {
+        var grupos = {};
+        celdas.forEach(function (i) {
+            var clave = cubo.celdas[dimension][i];
+            if (!(clave in grupos)) {
+                grupos[clave] = columnas.map(function () { return 0; });
+            }
+            columnas.forEach(function (columna, k) { grupos[clave][k] += cubo.celdas[columna][i]; });
+        });
+        return grupos;
+    }
+
+    // Posición del primer máximo o mínimo, como idxmax/idxmin
+    function posicionExtremo(valores, mayor) {
+        var posicion = 0;
+        for (var i = 1; i < valores.length; i++) {
+            if (mayor ? valores[i] > valores[posicion] : valores[i] < valores[posicion]) {
+                posicion = i;
+            }
+        }
+        return posicion;
+    }
+
+    function componente(tipo, props, espacio) {
+        return {type: tipo, namespace: espacio || 'dash_html_components', props: props};
+    }
+    function grafico(figura) {
+        return componente('Graph', {figure: figura}, 'dash_core_components');
+    }
+    function parrafo(titulo, texto) {
+        return componente('P', {children: [componente('Strong', {children: titulo}), texto]});
+    }
+    function contenidoTab(figura, titulo, parrafos, estilo) {
+        return componente('Div', {children: [
+            grafico(figura),
+            componente('Div', {style: estilo.analisis, children: [componente('H4', {children: titulo})].concat(parrafos)})
+        ]});
+    }
+    function mensaje(texto) {
+        return componente('Div', {children: [
+            componente('H3', {children: texto, style: {textAlign: 'center', marginTop: '50px'}})
+        ]});
+    }
+
+    // Figura equivalente a px.bar con color continuo
+    function barras(x, y, color, escala, titulo, etiquetas, horizontal, estilo) {
+        var colores = estilo.escalas[escala];
+        var hover = [etiquetas.x + '=%{x}', etiquetas.y + '=%{y}', etiquetas.color + '=%{marker.color}'];
+        return {
+            data: [{
+                type: 'bar', x: x, y: y, orientation: horizontal ? 'h' : 'v', name: '', showlegend: false,
+                marker: {color: color, coloraxis: 'coloraxis'}, textposition: 'auto',
+                hovertemplate: hover.join('<br>') + '<extra></extra>'
+            }],
+            layout: {
+                template: estilo.plantilla,
+                title: {text: titulo},
+                xaxis: {anchor: 'y', domain: [0, 1], title: {text: etiquetas.x}},
+                yaxis: {anchor: 'x', domain: [0, 1], title: {text: etiquetas.y}},
+                coloraxis: {
+                    colorbar: {title: {text: etiquetas.color}},
+                    colorscale: colores.map(function (c, i) { return [i / (colores.length - 1), c]; })
+                },
+                legend: {tracegroupgap: 0},
+                barmode: 'relative'
+            }
+        };
+    }
+
+    function tabHorario(cubo, celdas, total, estilo) {
+        var grupos = agrupar(cubo, celdas, 'hora', ['transacciones']);
+        var horas = Object.keys(grupos).map(Number).sort(function (a, b) { return a - b; });
+        var trans = horas.map(function (h) { return grupos[h][0]; });
+        var figura = barras(horas, trans, trans, 'Blues', 'Transacciones por Hora del Día',
+            {x: 'Hora', y: 'Número de Transacciones', color: 'Número de Transacciones'}, false, estilo);
+        figura.layout.showlegend = false;
+        var pico = posicionExtremo(trans, true), baja = posicionExtremo(trans, false);
+        var horaPico = horas[pico], transPico = trans[pico], horaBaja = horas[baja], transBaja = trans[baja];
+        return contenidoTab(figura, 'Análisis del Comportamiento Horario', [
+            parrafo('Hora pico: ',
+                'Las ' + dosDigitos(horaPico) + ':00 horas registran el mayor número de transacciones (' + miles(transPico) + '), ' +
+                'lo que representa un ' + fijo(transPico / total * 100, 1) + '% del total de cargas.'),
+            parrafo('Hora de menor actividad: ',
+                'Las ' + dosDigitos(horaBaja) + ':00 horas con ' + miles(transBaja) + ' transacciones.'),
+            parrafo('Interpretación: ',
+                'El pico de uso a las ' + dosDigitos(horaPico) + ':00 horas sugiere un patrón de comportamiento relacionado ' +
+                'con horarios laborales o de movilidad urbana. Esta concentración de demanda en horarios específicos ' +
+                'requiere garantizar capacidad operativa suficiente para evitar tiempos de espera y saturación del sistema.'),
+            parrafo('Recomendaciones: ',
+                'Implementar tarifas dinámicas con descuentos durante las horas de baja demanda (' + dosDigitos(horaBaja) + ':00 - ' +
+                dosDigitos((horaBaja + 3) % 24) + ':00) para distribuir mejor la carga. Asegurar disponibilidad de personal técnico ' +
+                'durante el horario pico (' + dosDigitos(horaPico) + ':00 horas) para respuesta rápida ante incidencias.')
+        ], estilo);
+    }
+
+    function tabSemanal(cubo, celdas, total, estilo) {
+        var grupos = agrupar(cubo, celdas, 'dia', ['transacciones']);
+        var dias = ORDEN_DIAS.filter(function (dia) { return cubo.dias.indexOf(dia) in grupos; });
+        var nombres = dias.map(function (dia) { return DIAS_ESP[dia]; });
+        var trans = dias.map(function (dia) { return grupos[cubo.dias.indexOf(dia)][0]; });
+        var figura = barras(nombres, trans, trans, 'Greens', 'Transacciones por Día de la Semana',
+            {x: 'Día', y: 'Número de Transacciones', color: 'Número de Transacciones'}, false, estilo);
+        figura.layout.showlegend = false;
+        var mayor = posicionExtremo(trans, true), menor = posicionExtremo(trans, false);
+        var diaMayor = nombres[mayor], transMayor = trans[mayor], diaMenor = nombres[menor], transMenor = trans[menor];
+        return contenidoTab(figura, 'Análisis del Comportamiento Semanal', [
+            parrafo('Día de mayor demanda: ',
+                diaMayor + ' con ' + miles(transMayor) + ' transacciones (' + fijo(transMayor / total * 100, 1) + '% del total semanal).'),
+            parrafo('Día de menor demanda: ',
+                diaMenor + ' con ' + miles(transMenor) + ' transacciones (' + fijo(transMenor / total * 100, 1) + '% del total).'),
+            parrafo('Interpretación: ',
+                'La diferencia de ' + miles(transMayor - transMenor) + ' transacciones entre el día más activo (' + diaMayor + ') ' +
+                'y el menos activo (' + diaMenor + ') representa una variación del ' +
+                fijo((transMayor - transMenor) / transMenor * 100, 1) + '%. ' +
+                'Este patrón semanal es fundamental para la planificación operativa, asignación de recursos y programación ' +
+                'de mantenimientos preventivos.'),
+            parrafo('Recomendaciones: ',
+                'Programar mantenimientos y actualizaciones de sistema durante el ' + diaMenor + ' para minimizar impacto en usuarios. ' +
+                'Considerar reforzar el equipo de soporte técnico los días ' + diaMayor + '. Evaluar campañas promocionales ' +
+                'en días de baja demanda para equilibrar el uso de la infraestructura a lo largo de la semana.')
+        ], estilo);
+    }
+
+    function tabEstaciones(cubo, celdas, total, estilo) {
+        var grupos = agrupar(cubo, celdas, 'estacion', ['transacciones', 'ingresos']);
+        var top = Object.keys(grupos).map(function (codigo) {
+            return {estacion: cubo.estaciones[codigo], transacciones: grupos[codigo][0], ingresos: grupos[codigo][1]};
+        }).sort(function (a, b) { return b.transacciones - a.transacciones; }).slice(0, 10);
+        var figura = barras(
+            top.map(function (f) { return f.transacciones; }), top.map(function (f) { return f.estacion; }),
+            top.map(function (f) { return f.ingresos; }), 'Oranges', 'Top 10 Estaciones por Número de Transacciones',
+            {x: 'Transacciones', y: 'Estación', color: 'ingresos'}, true, estilo);
+        figura.layout.yaxis.categoryorder = 'total ascending';
+        var top5 = top.slice(0, 5).reduce(function (suma, f) { return suma + f.transacciones; }, 0);
+        var lider = top[0];
+        return contenidoTab(figura, 'Análisis de Estaciones de Mayor Rendimiento', [
+            parrafo('Estación líder: ',
+                lider.estacion + ' con ' + miles(lider.transacciones) + ' transacciones (' + fijo(lider.transacciones / total * 100, 1) +
+                '% del total) y $' + miles(lider.ingresos) + ' en ingresos.'),
+            parrafo('Concentración top 5: ',
+                'Las cinco estaciones principales concentran ' + miles(top5) + ' transacciones, ' +
+                'representando el ' + fijo(top5 / total * 100, 1) + '% del volumen total.'),
+            parrafo('Interpretación: ',
+                'La alta concentración de uso en pocas estaciones indica ubicaciones estratégicas exitosas, ' +
+                'probablemente asociadas a centros comerciales, zonas de alta circulación o rutas principales. ' +
+                'Sin embargo, esta concentración representa riesgos de saturación y dependencia excesiva de ' +
+                'pocas instalaciones, lo que podría generar tiempos de espera y afectar la experiencia del usuario.'),
+            parrafo('Recomendaciones: ',
+                'Evaluar la ampliación de capacidad en ' + lider.estacion + ' mediante la instalación de puntos de carga adicionales. ' +
+                'Analizar factores de éxito de estas ubicaciones (accesibilidad, visibilidad, servicios complementarios) ' +
+                'para replicar el modelo en nuevas instalaciones. Implementar estrategias de distribución de demanda ' +
+                'hacia estaciones menos utilizadas mediante incentivos tarifarios o programas de lealtad.')
+        ], estilo);
+    }
+
+    function tabIngresos(cubo, celdas, total, estilo) {
+        var grupos = agrupar(cubo, celdas, 'mes', ['ingresos']);
+        var meses = Object.keys(grupos).map(Number).sort(function (a, b) { return a - b; });
+        var nombres = meses.map(function (mes) { return cubo.meses[mes]; });
+        var ingresos = meses.map(function (mes) { return grupos[mes][0]; });
+        var figura = {
+            data: [{
+                type: 'scatter', x: nombres, y: ingresos, mode: 'lines+markers', name: 'Ingresos',
+                line: {color: '#27ae60', width: 3}, marker: {size: 10}
+            }],
+            layout: {
+                template: estilo.plantilla, title: {text: 'Tendencia de Ingresos Mensuales'},
+                xaxis: {title: {text: 'Mes'}}, yaxis: {title: {text: 'Ingresos ($)'}}
+            }
+        };
+        var crecimiento = 0, mesMayor = 'N/A', ingresoMayor = 0, mesInicial = 'N/A', mesFinal = 'N/A';
+        if (meses.length >= 2) {
+            crecimiento = (ingresos[ingresos.length - 1] - ingresos[0]) / ingresos[0] * 100;
+            var mayor = posicionExtremo(ingresos, true);
+            mesMayor = nombres[mayor];
+            ingresoMayor = ingresos[mayor];
+            mesInicial = nombres[0];
+            mesFinal = nombres[nombres.length - 1];
+        }
+        var promedio = ingresos.reduce(function (suma, v) { return suma + v; }, 0) / ingresos.length;
+        return contenidoTab(figura, 'Análisis de Tendencia de Ingresos', [
+            parrafo('Crecimiento período: ', signo(crecimiento, 1) + '% desde ' + mesInicial + ' hasta ' + mesFinal + '.'),
+            parrafo('Mejor mes: ', mesMayor + ' con $' + miles(ingresoMayor) + ' en ingresos.'),
+            parrafo('Ingreso promedio mensual: ', '$' + miles(promedio)),
+            parrafo('Interpretación: ',
+                'La tendencia de ingresos muestra un ' + (crecimiento > 0 ? 'crecimiento sostenido' : 'decrecimiento') + ' ' +
+                'de ' + fijo(Math.abs(crecimiento), 1) + '% en el período analizado. Este comportamiento puede estar influenciado por ' +
+                'la adopción creciente de vehículos eléctricos, mejoras en infraestructura, campañas de marketing, ' +
+                'y factores estacionales. El desempeño destacado de ' + mesMayor + ' merece análisis detallado.'),
+            parrafo('Recomendaciones: ',
+                'Proyectar ingresos futuros considerando la tendencia de ' + fijo(crecimiento, 1) + '% para planificar inversiones. ' +
+                'Analizar factores específicos que contribuyeron al éxito de ' + mesMayor + ' (promociones, eventos, clima) ' +
+                'para replicar estrategias exitosas. Considerar la estacionalidad en programación de mantenimientos ' +
+                'y lanzamiento de campañas comerciales.')
+        ], estilo);
+    }
+
+    // Código de un nombre en la lista del cubo (se agrega al final si es nuevo)
+    function codigo(lista, nombre) {
+        var posicion = lista.indexOf(nombre);
+        if (posicion < 0) {
+            lista.push(nombre);
+            posicion = lista.length - 1;
+        }
+        return posicion;
+    }
+
+    // Agrega al cubo las celdas y los usuarios del cubo de un lote, con las estaciones y los
+    // días traducidos a los códigos del cubo. Las celdas repetidas no se combinan: los KPIs y
+    // las pestañas suman celdas y los usuarios se cuentan como conjunto.
+    function agregarCubo(cubo, parte) {
+        var estaciones = parte.estaciones.map(function (nombre) { return codigo(cubo.estaciones, nombre); });
+        var dias = parte.dias.map(function (nombre) { return codigo(cubo.dias, nombre); });
+        Object.keys(parte.meses).forEach(function (mes) { cubo.meses[mes] = parte.meses[mes]; });
+        Object.keys(cubo.celdas).forEach(function (columna) {
+            var valores = parte.celdas[columna];
+            if (columna === 'estacion') {
+                valores = valores.map(function (c) { return estaciones[c]; });
+            } else if (columna === 'dia') {
+                valores = valores.map(function (c) { return dias[c]; });
+            }
+            cubo.celdas[columna] = cubo.celdas[columna].concat(valores);
+        });
+        if (cubo.usuarios && parte.usuarios) {
+            cubo.usuarios = {
+                estacion: cubo.usuarios.estacion.concat(parte.usuarios.estacion.map(function (c) { return estaciones[c]; })),
+                mes: cubo.usuarios.mes.concat(parte.usuarios.mes),
+                usuario: cubo.usuarios.usuario.concat(parte.usuarios.usuario)
+            };
+        }
+    }
+
+    var PESTAÑAS = {
+        'tab-horario': tabHorario,
+        'tab-semanal': tabSemanal,
+        'tab-estaciones': tabEstaciones,
+        'tab-ingresos': tabIngresos
+    };
+
+    window.dash_clientside = window.dash_clientside || {};
+    window.dash_clientside.oasis = {
+        // Cubo de la versión nueva a partir del actual y de los cubos de los lotes agregados
+        aplicarDeltas: function (delta, cubo) {
+            if (!delta || !cubo || !cubo.celdas) {
+                return window.dash_clientside.no_update;
+            }
+            var nuevo = {
+                version: delta.version,
+                estaciones: cubo.estaciones.slice(),
+                dias: cubo.dias.slice(),
+                meses: Object.assign({}, cubo.meses),
+                celdas: Object.assign({}, cubo.celdas),
+                usuarios: cubo.usuarios
+            };
+            delta.deltas.forEach(function (parte) {
+                if (parte) {
+                    agregarCubo(nuevo, parte);
+                }
+            });
+            return nuevo;
+        },
+
+        // KPIs desde el cubo; sin cubo de usuarios o con rango de fechas se piden al servidor
+        kpis: function (cubo, estacion, mes, inicio, fin) {
+            var sinCambio = window.dash_clientside.no_update;
+            if (!cubo) {
+                return KPIS_VACIOS.map(function () { return sinCambio; }).concat([sinCambio]);
+            }
+            if (!cubo.celdas) {
+                return KPIS_VACIOS.concat([sinCambio]);
+            }
+            if (inicio || fin || !cubo.usuarios) {
+                return KPIS_VACIOS.map(function () { return sinCambio; }).concat([{pedido: Date.now()}]);
+            }
+            var filtrado = filtrar(cubo, estacion, mes);
+            var transacciones = sumar(cubo, filtrado.celdas, 'transacciones');
+            if (transacciones === 0) {
+                return KPIS_VACIOS.concat([sinCambio]);
+            }
+            var energia = sumar(cubo, filtrado.celdas, 'energia');
+            var ingresos = sumar(cubo, filtrado.celdas, 'ingresos');
+            var nDuracion = sumar(cubo, filtrado.celdas, 'n_duracion');
+            var duracion = nDuracion ? sumar(cubo, filtrado.celdas, 'duracion') / nDuracion : NaN;
+            var textoDuracion = duracion >= 60 ? fijo(duracion / 60, 1) + 'h' : fijo(duracion, 0) + 'min';
+            return [
+                miles(transacciones), miles(energia), '$' + miles(ingresos), miles(filtrado.usuarios.size),
+                '$' + miles(ingresos / energia), textoDuracion, sinCambio
+            ];
+        },
+
+        // Pestañas de agregados en el navegador; las demás se muestran desde tabs-content
+        contenido: function (tab, cubo, estacion, mes, inicio, fin, estilo) {
+            var sinCambio = window.dash_clientside.no_update;
+            var visible = {marginTop: '20px'};
+            var oculto = {marginTop: '20px', display: 'none'};
+            if (!cubo) {
+                return [sinCambio, sinCambio, sinCambio, sinCambio];
+            }
+            if (!cubo.celdas || inicio || fin || !(tab in PESTAÑAS)) {
+                return [sinCambio, oculto, visible, {pedido: Date.now()}];
+            }
+            var filtrado = filtrar(cubo, estacion, mes);
+            var total = sumar(cubo, filtrado.celdas, 'transacciones');
+            var hijos = total === 0 ? mensaje('No hay transacciones para los filtros seleccionados')
+                : PESTAÑAS[tab](cubo, filtrado.celdas, total, estilo);
+            return [hijos, visible, oculto, sinCambio];
+        }
+    };
+})();
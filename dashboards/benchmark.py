@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Benchmark del dashboard sobre datos sintéticos (ver generador_datos.py) a varias escalas.
+# Para cada escala mide, en un proceso aparte, la carga (lectura, preparación, dataset),
+# la memoria (dataset y pico del proceso) y la latencia de los callbacks de KPIs y de cada
+# pestaña para varias combinaciones de filtros, en frío (sin cachés) y en caliente.
+# Los resultados se guardan en JSON para comparar versiones con --comparar.
+
+ESCALAS = [100_000, 1_000_000, 10_000_000]
+PESTAÑAS = ['tab-horario', 'tab-ocupacion', 'tab-semanal', 'tab-estaciones', 'tab-energia',
+            'tab-ingresos', 'tab-pronostico', 'tab-cohortes', 'tab-duracion', 'tab-tarifas']
+DIRECTORIO_DATOS = '../datos/sintetico'
+DIRECTORIO_RESULTADOS = '../resultados/benchmarks'
+
+
+def pico_memoria_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, time.perf_counter() - inicio
+
+
+# Combinaciones de filtros representativas: sin filtros, la estación y el mes con más
+# transacciones, ambos a la vez, varias estaciones y los últimos 30 días
+def combinaciones_filtros(df):
+    estaciones = df['evse_uid'].value_counts().index.astype(str).tolist()
+    mes = int(df['mes'].value_counts().index[0])
+    fin = df['start_date_time'].max().normalize()
+    inicio = fin - pd.Timedelta(days=29)
+    return {
+        'todas': (['TODAS'], 'TODOS', None, None),
+        'estacion': ([estaciones[0]], 'TODOS', None, None),
+        'mes': (['TODAS'], mes, None, None),
+        'estacion_mes': ([estaciones[0]], mes, None, None),
+        'tres_estaciones': (estaciones[:3], 'TODOS', None, None),
+        'ultimos_30_dias': (['TODAS'], 'TODOS', inicio.strftime('%Y-%m-%d'), fin.strftime('%Y-%m-%d')),
+    }
+
+
+# Mide una escala dentro de este proceso (lo invoca `ejecutar_escala` en un proceso nuevo)
+def medir_archivo(ruta, pestañas):
+    import plotly.utils
+    import app_dashboard as app
+    from carga_datos import leer_archivo, preparar_datos
+    from vistas import cache_vistas, obtener_vista
+
+    memoria_base = pico_memoria_mb()
+    df, lectura = cronometrar(lambda: leer_archivo(ruta))
+    df, preparacion = cronometrar(lambda: preparar_datos(df))
+    dataset, creacion = cronometrar(lambda: app.crear_dataset(df))
+    del df
+    version = app.registro.registrar(dataset)
+    resultado = {
+        'archivo': os.path.basename(ruta),
+        'filas': len(dataset.df),
+        'carga': {'lectura': lectura, 'preparacion': preparacion, 'dataset': creacion,
+                  'total': lectura + preparacion + creacion},
+        'memoria': {'dataset_mb': dataset.memoria() / 1024 ** 2, 'proceso_antes_mb': memoria_base,
+                    'pico_carga_mb': pico_memoria_mb()},
+        'callbacks': [],
+    }
+
+    for nombre, (estacion, mes, fecha_inicio, fecha_fin) in combinaciones_filtros(dataset.df).items():
+        cache_vistas.limpiar()
+        app.cache_contenido.limpiar()
+        _, segundos = cronometrar(lambda: app.actualizar_kpis(version, estacion, mes, fecha_inicio, fecha_fin))
+        resultado['callbacks'].append({'filtro': nombre, 'callback': 'kpis', 'modo': 'frio', 'segundos': segundos})
+        vista = obtener_vista(dataset, *app.normalizar_filtros(estacion, mes, fecha_inicio, fecha_fin))
+        for tab in pestañas:
+            # Mismo camino que actualizar_contenido, sin pasar por los trabajos en segundo plano
+            contenido, segundos = cronometrar(lambda: app.cache_contenido.obtener_o_calcular(
+                (vista.clave, tab), lambda: app.construir_contenido(tab, vista)))
+            tamaño = len(json.dumps(contenido, cls=plotly.utils.PlotlyJSONEncoder))
+            resultado['callbacks'].append({'filtro': nombre, 'callback': tab, 'modo': 'frio',
+                                           'segundos': segundos, 'bytes': tamaño})
+        _, segundos = cronometrar(lambda: app.actualizar_kpis(version, estacion, mes, fecha_inicio, fecha_fin))
+        resultado['callbacks'].append({'filtro': nombre, 'callback': 'kpis', 'modo': 'caliente', 'segundos': segundos})
+        for tab in pestañas:
+            _, segundos = cronometrar(lambda: app.actualizar_contenido(tab, version, estacion, mes, fecha_inicio, fecha_fin))
+            resultado['callbacks'].append({'filtro': nombre, 'callback': tab, 'modo': 'caliente', 'segundos': segundos})
+
+    resultado['memoria']['pico_mb'] = pico_memoria_mb()
+    return resultado
+
+
+# Ejecuta la medición de un archivo en un proceso nuevo, para que el pico de memoria sea el suyo
+def ejecutar_escala(ruta, pestañas):
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        salida = f.name
+    try:
+        subprocess.run([sys.executable, __file__, '--ejecutar', ruta, '--resultado', salida,
+                        '--pestañas', *pestañas], check=True, stdout=subprocess.DEVNULL)
+        with open(salida) as f:
+            return json.load(f)
+    finally:
+        os.remove(salida)
+
+
+# Genera (una sola vez) el archivo sintético de cada escala
+def archivo_sintetico(filas, formato, directorio=DIRECTORIO_DATOS):
+    ruta = os.path.join(directorio, f'oasis_{filas}.{formato}')
+    if not os.path.exists(ruta):
+        from generador_datos import Plantilla, generar_archivo
+        os.makedirs(directorio, exist_ok=True)
+        print(f"Generando {filas:,} transacciones en {ruta}...")
+        generar_archivo(Plantilla(pd.read_csv('../datos/df_oasis_clean.csv')), ruta, filas)
+    return ruta
+
+
+def version_codigo():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar_benchmark(escalas, pestañas, formato, etiqueta, directorio_resultados):
+    resultados = {
+        'etiqueta': etiqueta,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': version_codigo(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'escalas': [],
+    }
+    for filas in escalas:
+        ruta = archivo_sintetico(filas, formato)
+        print(f"Midiendo {filas:,} filas...")
+        escala = ejecutar_escala(ruta, pestañas)
+        resultados['escalas'].append(escala)
+        imprimir_escala(escala)
+    os.makedirs(directorio_resultados, exist_ok=True)
+    destino = os.path.join(directorio_resultados, f'{etiqueta}.json')
+    with open(destino, 'w') as f:
+        json.dump(resultados, f, indent=1, ensure_ascii=False)
+    print(f"✓ Resultados guardados en {destino}")
+    return resultados
+
+
+def imprimir_escala(escala):
+    carga = escala['carga']
+    memoria = escala['memoria']
+    print(f"  carga {carga['total']:.2f}s (lectura {carga['lectura']:.2f}s, preparación {carga['preparacion']:.2f}s, "
+          f"dataset {carga['dataset']:.2f}s) | dataset {memoria['dataset_mb']:,.0f} MB, pico {memoria['pico_mb']:,.0f} MB")
+    for medida in escala['callbacks']:
+        if medida['modo'] == 'frio':
+            tamaño = f" {medida['bytes'] / 1024:,.0f} KB" if 'bytes' in medida else ''
+            print(f"  {medida['filtro']:<16} {medida['callback']:<15} {medida['segundos'] * 1000:>10,.1f} ms{tamaño}")
+
+
+# Tabla de diferencias entre dos archivos de resultados (misma escala, filtro, callback y modo)
+def comparar(ruta_base, ruta_nueva):
+    with open(ruta_base) as f:
+        base = json.load(f)
+    with open(ruta_nueva) as f:
+        nueva = json.load(f)
+    escalas_base = {escala['filas']: escala for escala in base['escalas']}
+    print(f"{base['etiqueta']} -> {nueva['etiqueta']}")
+    for escala in nueva['escalas']:
+        anterior = escalas_base.get(escala['filas'])
+        if anterior is None:
+            continue
+        print(f"\n{escala['filas']:,} filas")
+        filas = [('carga total', anterior['carga']['total'], escala['carga']['total']),
+                 ('pico memoria (MB)', anterior['memoria']['pico_mb'], escala['memoria']['pico_mb'])]
+        medidas = {(m['filtro'], m['callback'], m['modo']): m['segundos'] for m in anterior['callbacks']}
+        for m in escala['callbacks']:
+            clave = (m['filtro'], m['callback'], m['modo'])
+            if clave in medidas:
+                filas.append((' '.join(clave), medidas[clave], m['segundos']))
+        for nombre, valor_base, valor_nuevo in filas:
+            cambio = (valor_nuevo / valor_base - 1) * 100 if valor_base else float('nan')
+            print(f"  {nombre:<45} {valor_base:>12,.4f} {valor_nuevo:>12,.4f} {cambio:>+8.1f}%")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark del dashboard con datos sintéticos.")
+    parser.add_argument('--filas', type=int, nargs='+', default=ESCALAS, help="escalas a medir (filas)")
+    parser.add_argument('--pestañas', nargs='+', default=PESTAÑAS)
+    parser.add_argument('--formato', choices=['parquet', 'csv'], default='parquet')
+    parser.add_argument('--etiqueta', default=None, help="nombre del archivo de resultados (por defecto el commit)")
+    parser.add_argument('--salida', default=DIRECTORIO_RESULTADOS)
+    parser.add_argument('--comparar', nargs=2, metavar=('BASE', 'NUEVO'), help="compara dos archivos de resultados")
+    parser.add_argument('--ejecutar', help=argparse.SUPPRESS)
+    parser.add_argument('--resultado', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+    elif args.ejecutar:
+        with open(args.resultado, 'w') as f:
+            json.dump(medir_archivo(args.ejecutar, args.pestañas), f)
+    else:
+        etiqueta = args.etiqueta or version_codigo() or datetime.now().strftime('%Y%m%d-%H%M%S')
+        ejecutar_benchmark(args.filas, args.pestañas, args.formato, etiqueta, args.salida)
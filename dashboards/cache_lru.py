@@ -0,0 +1,55 @@
+import threading
+from collections import OrderedDict
+
+
+# Caché LRU en memoria con tamaño máximo y contadores de aciertos/fallos.
+# Compartida entre callbacks e hilos del servidor.
+class CacheLRU:
+    def __init__(self, max_entradas=128):
+        self.max_entradas = max_entradas
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return self._datos[clave]
+            self.fallos += 1
+            return None
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self.desalojos += 1
+
+    # Devuelve el valor guardado o lo calcula con `funcion` y lo guarda.
+    # Si otro hilo guardó la misma clave mientras tanto, se conserva ese valor.
+    def obtener_o_calcular(self, clave, funcion):
+        valor = self.obtener(clave)
+        if valor is not None:
+            return valor
+        valor = funcion()
+        with self._lock:
+            if clave in self._datos:
+                return self._datos[clave]
+        self.guardar(clave, valor)
+        return valor
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+    def estadisticas(self):
+        return {'entradas': len(self._datos), 'max_entradas': self.max_entradas,
+                'aciertos': self.aciertos, 'fallos': self.fallos, 'desalojos': self.desalojos}
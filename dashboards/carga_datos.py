@@ -0,0 +1,180 @@
+import argparse
+import base64
+import gzip
+import io
+import os
+import zipfile
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from limpieza_datos import DIAS_SEMANA, columnas_calendario
+from metricas import etapa
+
+# Esquema explícito del formato columnar (Parquet/Feather)
+COLUMNAS_CATEGORICAS = ['evse_uid', 'status', 'status_transaction']
+COLUMNAS_CENTAVOS = ['amount_transaction', 'amount_third']
+COLUMNAS_FECHA = ['start_date_time', 'end_date_time']
+
+# Representación compacta en memoria
+COLUMNAS_FLOAT32 = ['potency_kw', 'pocket_amount', 'rented_kWh', 'rented_time_minutes']
+COLUMNAS_ENTERAS = ['id', 'connector_id', 'user_id', 'mes', 'hora']
+
+EXTENSIONES_PARQUET = ('.parquet', '.pq')
+EXTENSIONES_FEATHER = ('.feather', '.arrow')
+
+# Lectura por bloques de CSV subidos: filas por bloque y tipos fijos para las columnas
+# de texto, así todos los bloques producen las mismas columnas aunque alguno venga vacío
+TAMAÑO_BLOQUE = 200_000
+TIPOS_TEXTO_CSV = {col: str for col in ['evse_uid', 'duration', 'status', 'status_transaction',
+                                        'coupon_code', 'journal_code', 'invoice_code']}
+
+
+# Lee un archivo según su extensión: Parquet, Feather o CSV
+def leer_archivo(ruta):
+    extension = os.path.splitext(str(ruta))[1].lower()
+    if extension in EXTENSIONES_PARQUET:
+        return pd.read_parquet(ruta)
+    if extension in EXTENSIONES_FEATHER:
+        return pd.read_feather(ruta)
+    return pd.read_csv(ruta)
+
+
+# Lee el contenido decodificado de un archivo subido desde el dashboard
+def leer_contenido(decoded, filename):
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension in EXTENSIONES_PARQUET:
+        return pd.read_parquet(io.BytesIO(decoded))
+    if extension in EXTENSIONES_FEATHER:
+        return pd.read_feather(io.BytesIO(decoded))
+    return pd.read_csv(io.StringIO(decoded.decode('utf-8')))
+
+
+# Flujo binario que decodifica el base64 de dcc.Upload a medida que se lee,
+# sin materializar nunca el archivo completo decodificado.
+class LectorBase64(io.RawIOBase):
+    def __init__(self, texto, inicio=0, bloque=4 * 1024 * 1024):
+        self._texto = texto
+        self._pos = inicio
+        self._bloque = bloque - bloque % 4
+        self._pendiente = b''
+        self._desplazamiento = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, destino):
+        if self._desplazamiento >= len(self._pendiente):
+            if self._pos >= len(self._texto):
+                return 0
+            fin = self._pos + self._bloque
+            self._pendiente = base64.b64decode(self._texto[self._pos:fin])
+            self._pos = fin
+            self._desplazamiento = 0
+        n = min(len(destino), len(self._pendiente) - self._desplazamiento)
+        destino[:n] = memoryview(self._pendiente)[self._desplazamiento:self._desplazamiento + n]
+        self._desplazamiento += n
+        return n
+
+
+# Abre el contenido de dcc.Upload como flujo, descomprimiendo gzip o zip si hace falta
+def abrir_flujo(contents):
+    inicio = contents.index(',') + 1
+    flujo = io.BufferedReader(LectorBase64(contents, inicio), buffer_size=1024 * 1024)
+    firma = flujo.peek(4)[:4]
+    if firma[:2] == b'\x1f\x8b':
+        return gzip.GzipFile(fileobj=flujo)
+    if firma == b'PK\x03\x04':
+        # zip necesita acceso aleatorio al índice del final del archivo
+        archivo_zip = zipfile.ZipFile(io.BytesIO(flujo.read()))
+        nombres = [n for n in archivo_zip.namelist() if not n.endswith('/')]
+        csvs = [n for n in nombres if n.lower().endswith('.csv')] or nombres
+        return archivo_zip.open(csvs[0])
+    return flujo
+
+
+# Lee un CSV subido (plano, .gz o .zip) en bloques de tamaño acotado
+def leer_bloques(contents, tamaño_bloque=TAMAÑO_BLOQUE):
+    with abrir_flujo(contents) as flujo:
+        with pd.read_csv(flujo, chunksize=tamaño_bloque, dtype=TIPOS_TEXTO_CSV) as lector:
+            yield from lector
+
+
+# Une los bloques ya preparados unificando las categorías de las columnas categóricas.
+# No modifica los bloques recibidos (uno de ellos puede ser un dataset ya registrado).
+def concatenar_bloques(bloques):
+    if len(bloques) > 1:
+        categoricas = set.intersection(*[set(b.select_dtypes('category').columns) for b in bloques])
+        tipos = {col: pd.CategoricalDtype(union_categoricals([b[col] for b in bloques]).categories)
+                 for col in categoricas}
+        bloques = [b.astype(tipos) for b in bloques]
+    return pd.concat(bloques, ignore_index=True)
+
+
+# Convierte montos a pesos y deriva las columnas de calendario con el pipeline de limpieza.
+# Si las fechas ya vienen tipadas (formato columnar) no se vuelven a parsear.
+def preparar_datos(df):
+    for col in COLUMNAS_CENTAVOS:
+        df[col] = df[col].astype('float64') / 100
+    with etapa('fechas'):
+        for col in COLUMNAS_FECHA:
+            if not pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = pd.to_datetime(df[col], format='mixed')
+    with etapa('calendario'):
+        df = columnas_calendario(df)
+        df['fecha'] = df['start_date_time'].dt.date
+    return df
+
+
+# Reduce la memoria del DataFrame ya preparado: categorías para textos repetidos,
+# enteros pequeños, float32 donde la precisión lo permite (los montos y la energía, que se
+# suman en el cubo y los KPIs, siguen en float64 para no acumular el redondeo de float32)
+# y fechas como datetime64 en lugar de objetos date de Python.
+def compactar_datos(df):
+    for col in COLUMNAS_CATEGORICAS + ['mes_nombre']:
+        df[col] = df[col].astype('category')
+    df['dia_semana'] = pd.Categorical(df['dia_semana'], categories=DIAS_SEMANA)
+    for col in COLUMNAS_FLOAT32:
+        if col in df.columns:
+            df[col] = df[col].astype('float32')
+    for col in COLUMNAS_ENTERAS:
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    df['fecha'] = df['start_date_time'].dt.normalize()
+    return df
+
+
+# Memoria total del DataFrame en bytes (incluye el contenido de las columnas de texto)
+def memoria_df(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+# Aplica el esquema columnar a un DataFrame leído desde CSV
+def aplicar_esquema(df):
+    for col in COLUMNAS_FECHA:
+        df[col] = pd.to_datetime(df[col], format='mixed')
+    for col in COLUMNAS_CENTAVOS:
+        df[col] = df[col].round().astype('Int64')
+    for col in COLUMNAS_CATEGORICAS:
+        df[col] = df[col].astype('category')
+    return df
+
+
+# Conversión única de CSV a Parquet/Feather para evitar el parseo de texto al arrancar
+def convertir_a_columnar(origen, destino):
+    df = aplicar_esquema(pd.read_csv(origen))
+    extension = os.path.splitext(destino)[1].lower()
+    if extension in EXTENSIONES_FEATHER:
+        df.to_feather(destino)
+    else:
+        df.to_parquet(destino, index=False)
+    return df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convierte el CSV de transacciones a formato columnar (Parquet/Feather).")
+    parser.add_argument('origen', nargs='?', default='../datos/df_oasis_clean.csv')
+    parser.add_argument('destino', nargs='?', default='../datos/df_oasis_clean.parquet')
+    args = parser.parse_args()
+    df = convertir_a_columnar(args.origen, args.destino)
+    print(f"✓ {len(df):,} registros convertidos: {args.origen} -> {args.destino}")
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+# Análisis de usuarios: cohortes mensuales de adquisición y su retención, sesiones por usuario
+# y fidelidad a una estación (proporción de las sesiones de cada usuario en su estación principal).
+# Usuarios, meses y estaciones se codifican como enteros; las relaciones usuario × mes y
+# usuario × estación se guardan como pares distintos (las coordenadas de una matriz dispersa)
+# con su número de sesiones, así el costo crece con las sesiones y no con usuarios × meses.
+
+# Tramos de sesiones por usuario (límite inferior de cada tramo)
+TRAMOS_SESIONES = [1, 2, 3, 6, 11, 21, 51]
+ETIQUETAS_SESIONES = ['1', '2', '3-5', '6-10', '11-20', '21-50', '51+']
+# Un usuario recurrente es fiel si al menos esta proporción de sus sesiones es en una estación
+UMBRAL_FIEL = 0.8
+
+
+# Pares distintos (fila, columna) y sus conteos, ordenados por fila y luego por columna
+def _pares(filas, columnas, n_columnas):
+    codigos, conteos = np.unique(filas.astype(np.int64) * n_columnas + columnas, return_counts=True)
+    return codigos // n_columnas, codigos % n_columnas, conteos
+
+
+# Posición del primer par de cada fila (los pares vienen ordenados por fila)
+def _inicios(filas):
+    return np.flatnonzero(np.r_[True, filas[1:] != filas[:-1]])
+
+
+def analizar_usuarios(df):
+    fechas = df['start_date_time']
+    validas = (fechas.notna() & df['user_id'].notna() & df['evse_uid'].notna()).to_numpy()
+    if not validas.any():
+        return None
+    usuarios, _ = pd.factorize(df['user_id'][validas])
+    estaciones, nombres_estaciones = pd.factorize(df['evse_uid'][validas])
+    fechas = fechas[validas]
+    año_mes = (fechas.dt.year * 12 + fechas.dt.month - 1).to_numpy()
+    primer_mes = int(año_mes.min())
+    meses = año_mes - primer_mes
+    n_meses = int(meses.max()) + 1
+    n_usuarios = int(usuarios.max()) + 1
+
+    # Cohortes: mes de la primera sesión de cada usuario y meses activos desde entonces
+    usuario_mes, mes, _ = _pares(usuarios, meses, n_meses)
+    inicios = _inicios(usuario_mes)
+    cohorte = mes[inicios]
+    desfase = mes - cohorte[usuario_mes]
+    activos = np.bincount(cohorte[usuario_mes] * n_meses + desfase,
+                          minlength=n_meses * n_meses).reshape(n_meses, n_meses)
+    tamaños = activos[:, 0]
+    # Una cohorte solo se observa hasta el último mes de los datos
+    observable = np.arange(n_meses)[None, :] < (n_meses - np.arange(n_meses))[:, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        retencion = np.where(observable & (tamaños[:, None] > 0), activos / tamaños[:, None], np.nan)
+        # Retención de todas las cohortes juntas k meses después, ponderada por su tamaño
+        retencion_total = activos.sum(axis=0) / (observable * tamaños[:, None]).sum(axis=0)
+    meses_activos = np.diff(np.r_[inicios, len(usuario_mes)])
+    # Meses sin usuarios nuevos no forman cohorte (quedarían como filas vacías)
+    con_usuarios = tamaños > 0
+    etiquetas = [f"{(primer_mes + k) // 12}-{(primer_mes + k) % 12 + 1:02d}" for k in np.flatnonzero(con_usuarios)]
+
+    # Sesiones por usuario
+    sesiones = np.bincount(usuarios, minlength=n_usuarios)
+    tramos = np.searchsorted(TRAMOS_SESIONES, sesiones, side='right') - 1
+    usuarios_tramo = np.bincount(tramos, minlength=len(TRAMOS_SESIONES))
+
+    # Fidelidad: sesiones en la estación más usada por cada usuario sobre sus sesiones totales
+    usuario_estacion, estacion, sesiones_estacion = _pares(usuarios, estaciones, len(nombres_estaciones))
+    orden = np.lexsort((-sesiones_estacion, usuario_estacion))
+    inicios = _inicios(usuario_estacion)
+    principal = estacion[orden][inicios]
+    fidelidad = sesiones_estacion[orden][inicios] / sesiones
+    estaciones_usuario = np.diff(np.r_[inicios, len(usuario_estacion)])
+    recurrentes = sesiones >= 2
+    fidelidad_recurrentes = fidelidad[recurrentes]
+    principales = np.bincount(principal[recurrentes], minlength=len(nombres_estaciones))
+    fieles = np.bincount(principal[recurrentes], weights=fidelidad_recurrentes >= UMBRAL_FIEL,
+                         minlength=len(nombres_estaciones))
+    por_estacion = pd.DataFrame({
+        'estacion': np.asarray(nombres_estaciones, dtype=object),
+        'usuarios_principales': principales,
+        'usuarios_fieles': fieles.astype(int),
+    })
+    por_estacion = por_estacion[por_estacion['usuarios_principales'] > 0].sort_values(
+        'usuarios_principales', ascending=False, kind='stable').reset_index(drop=True)
+
+    return {
+        'cohortes': etiquetas,
+        'tamaños': tamaños[con_usuarios],
+        'retencion': retencion[con_usuarios],
+        'retencion_total': retencion_total,
+        'usuarios': n_usuarios,
+        'recurrentes': int(recurrentes.sum()),
+        'meses_activos_promedio': meses_activos.mean(),
+        'sesiones_promedio': sesiones.mean(),
+        'sesiones_mediana': float(np.median(sesiones)),
+        'usuarios_tramo': usuarios_tramo,
+        'fidelidad_recurrentes': np.histogram(fidelidad_recurrentes, bins=10, range=(0, 1))[0],
+        'fidelidad_promedio': fidelidad_recurrentes.mean() if recurrentes.any() else np.nan,
+        'fieles': int((fidelidad_recurrentes >= UMBRAL_FIEL).sum()),
+        'multiestacion': int((estaciones_usuario[recurrentes] >= 3).sum()),
+        'por_estacion': por_estacion,
+    }
@@ -0,0 +1,133 @@
+import pandas as pd
+
+# Dimensiones del cubo: estación × mes × día de la semana × hora
+DIMENSIONES = ['evse_uid', 'mes', 'dia_semana', 'hora']
+# Máximo de pares (estación, mes, usuario) que se envían al navegador en el modo cliente
+MAX_USUARIOS_CLIENTE = 200_000
+
+
+# Cubo de agregados precalculado al cargar los datos.
+# Cada celda guarda conteos y sumas, de modo que cualquier filtro por estación y mes
+# se responde sumando celdas en lugar de recorrer todas las transacciones.
+# Los usuarios únicos no son sumables, así que se guardan los conjuntos exactos de
+# usuarios por (estación, mes), que son las dimensiones por las que filtra el dashboard.
+class CuboAgregados:
+    def __init__(self, celdas, usuarios, nombres_mes):
+        self.celdas = celdas
+        self.usuarios = usuarios
+        self.nombres_mes = nombres_mes
+
+    # estaciones: None (todas) o lista de evse_uid; mes: None (todos) o número de mes
+    def filtrar(self, estaciones=None, mes=None):
+        celdas = self.celdas
+        usuarios = self.usuarios
+        if estaciones is not None:
+            celdas = celdas[celdas['evse_uid'].isin(estaciones)]
+            usuarios = usuarios[usuarios['evse_uid'].isin(estaciones)]
+        if mes is not None:
+            celdas = celdas[celdas['mes'] == mes]
+            usuarios = usuarios[usuarios['mes'] == mes]
+        return CuboAgregados(celdas, usuarios, self.nombres_mes)
+
+    def kpis(self):
+        transacciones = int(self.celdas['transacciones'].sum())
+        n_duracion = self.celdas['n_duracion'].sum()
+        return {
+            'transacciones': transacciones,
+            'energia': self.celdas['energia'].sum(),
+            'ingresos': self.celdas['ingresos'].sum(),
+            'usuarios': self.usuarios['user_id'].nunique(),
+            'duracion_promedio': self.celdas['duracion'].sum() / n_duracion if n_duracion else float('nan'),
+        }
+
+    def por_hora(self):
+        return self.celdas.groupby('hora', observed=True)['transacciones'].sum().reset_index()
+
+    def por_dia(self):
+        return self.celdas.groupby('dia_semana', observed=True)['transacciones'].sum().reset_index()
+
+    def por_estacion(self):
+        return self.celdas.groupby('evse_uid', observed=True)[['transacciones', 'ingresos']].sum().reset_index()
+
+    def por_mes(self):
+        ingresos_mes = self.celdas.groupby('mes', observed=True)['ingresos'].sum().reset_index()
+        ingresos_mes['mes_nombre'] = ingresos_mes['mes'].map(self.nombres_mes)
+        return ingresos_mes
+
+    # Totales por una dimensión (hora, dia_semana, evse_uid o mes) con la duración promedio;
+    # por estación y por mes se agregan los usuarios únicos, que el cubo guarda por (estación, mes)
+    def agrupar(self, dimension):
+        grupos = self.celdas.groupby(dimension, observed=True)[
+            ['transacciones', 'energia', 'ingresos', 'duracion', 'n_duracion']].sum()
+        grupos['duracion_promedio'] = grupos.pop('duracion') / grupos.pop('n_duracion')
+        if dimension in ('evse_uid', 'mes'):
+            usuarios = self.usuarios.groupby(dimension, observed=True)['user_id'].nunique()
+            grupos['usuarios'] = usuarios.reindex(grupos.index, fill_value=0).astype(int)
+        grupos = grupos.reset_index()
+        if dimension == 'mes':
+            grupos.insert(1, 'mes_nombre', grupos['mes'].map(self.nombres_mes))
+        return grupos
+
+    def memoria(self):
+        return int(self.celdas.memory_usage(deep=True).sum() + self.usuarios.memory_usage(deep=True).sum())
+
+    # Versión compacta para el navegador (modo cliente): columnas como listas y las estaciones
+    # y los días codificados como enteros; los usuarios van con su user_id, así los de un cubo
+    # delta (ver agregar_lote) se reconocen en el navegador. Si hay más de `max_usuarios` pares
+    # (estación, mes, usuario) no se envían y los usuarios únicos se siguen pidiendo al servidor.
+    def para_cliente(self, max_usuarios=MAX_USUARIOS_CLIENTE):
+        codigos_estacion, estaciones = pd.factorize(self.celdas['evse_uid'].astype(str), sort=True)
+        codigos_dia, dias = pd.factorize(self.celdas['dia_semana'].astype(str))
+        celdas = {
+            'estacion': codigos_estacion.tolist(),
+            'mes': self.celdas['mes'].fillna(-1).astype(int).tolist(),
+            'dia': codigos_dia.tolist(),
+            'hora': self.celdas['hora'].fillna(-1).astype(int).tolist(),
+            'transacciones': self.celdas['transacciones'].astype(int).tolist(),
+            'energia': self.celdas['energia'].round(3).tolist(),
+            'ingresos': self.celdas['ingresos'].round(2).tolist(),
+            'duracion': self.celdas['duracion'].fillna(0).round(3).tolist(),
+            'n_duracion': self.celdas['n_duracion'].astype(int).tolist(),
+        }
+        usuarios = None
+        if max_usuarios is None or len(self.usuarios) <= max_usuarios:
+            conocidos = self.usuarios[self.usuarios['user_id'].notna()]
+            usuarios = {
+                'estacion': pd.Index(estaciones).get_indexer(conocidos['evse_uid'].astype(str)).tolist(),
+                'mes': conocidos['mes'].fillna(-1).astype(int).tolist(),
+                'usuario': conocidos['user_id'].tolist(),
+            }
+        return {
+            'estaciones': list(estaciones),
+            'dias': list(dias),
+            'meses': {int(mes): nombre for mes, nombre in self.nombres_mes.items()},
+            'celdas': celdas,
+            'usuarios': usuarios,
+        }
+
+
+def construir_cubo(df):
+    duracion = (df['end_date_time'] - df['start_date_time']).dt.total_seconds() / 60
+    # Las sumas se acumulan en float64 aunque el DataFrame esté en modo compacto
+    base = df[DIMENSIONES].assign(energy_kwh=df['energy_kwh'].astype('float64'),
+                                  amount_transaction=df['amount_transaction'].astype('float64'),
+                                  duracion_minutos=duracion)
+    celdas = base.groupby(DIMENSIONES, observed=True, dropna=False).agg(
+        transacciones=('energy_kwh', 'size'),
+        energia=('energy_kwh', 'sum'),
+        ingresos=('amount_transaction', 'sum'),
+        duracion=('duracion_minutos', 'sum'),
+        n_duracion=('duracion_minutos', 'count'),
+    ).reset_index()
+    usuarios = df[['evse_uid', 'mes', 'user_id']].drop_duplicates().reset_index(drop=True)
+    nombres_mes = df.groupby('mes', observed=True)['mes_nombre'].first()
+    return CuboAgregados(celdas, usuarios, nombres_mes)
+
+
+# Combina dos cubos (por ejemplo, de bloques o lotes distintos) sumando celda a celda
+def combinar_cubos(a, b):
+    celdas = pd.concat([a.celdas, b.celdas], ignore_index=True)
+    celdas = celdas.groupby(DIMENSIONES, observed=True, dropna=False).sum().reset_index()
+    usuarios = pd.concat([a.usuarios, b.usuarios], ignore_index=True).drop_duplicates().reset_index(drop=True)
+    nombres_mes = a.nombres_mes.combine_first(b.nombres_mes)
+    return CuboAgregados(celdas, usuarios, nombres_mes)
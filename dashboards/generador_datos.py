@@ -0,0 +1,164 @@
+import argparse
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from carga_datos import EXTENSIONES_PARQUET
+
+# Generador de transacciones sintéticas con el esquema de df_oasis_clean.csv a cualquier escala.
+# Cada usuario sintético repite el historial de un usuario real (estaciones, conector, día de la
+# semana y hora, energía, duración y precio) en semanas al azar dentro del periodo, con ruido en
+# la energía y la duración. Así se conservan los perfiles horario y semanal, las distribuciones
+# y la recurrencia de usuarios del dataset real.
+
+# Filas aproximadas por bloque: el archivo se escribe por partes para acotar la memoria
+FILAS_BLOQUE = 1_000_000
+# Desviación del ruido lognormal aplicado a la energía (y al monto) y a la duración
+RUIDO = 0.1
+# Desplazamiento máximo (segundos) de la hora de inicio respecto de la sesión original
+DESPLAZAMIENTO_MAXIMO = 1800
+# Primer lunes del periodo generado
+INICIO_PERIODO = pd.Timestamp('2025-01-06')
+
+COLUMNAS = ['id', 'start_date_time', 'end_date_time', 'energy_kwh', 'potency_kw', 'connector_id', 'evse_uid',
+            'duration', 'status', 'amount_transaction', 'amount_third', 'status_transaction', 'coupon_code',
+            'pocket_amount', 'rented_kWh', 'rented_time_minutes', 'journal_code', 'invoice_code', 'user_id']
+
+
+# Transacciones reales agrupadas por usuario, con el segundo de la semana en que empezó
+# cada sesión y su duración
+class Plantilla:
+    def __init__(self, df):
+        inicio = pd.to_datetime(df['start_date_time'], format='mixed')
+        fin = pd.to_datetime(df['end_date_time'], format='mixed')
+        validas = (inicio.notna() & fin.notna() & (fin >= inicio)).to_numpy()
+        df, inicio, fin = df[validas], inicio[validas], fin[validas]
+        codigos_usuario, _ = pd.factorize(df['user_id'])
+        orden = np.argsort(codigos_usuario, kind='stable')
+        self.filas = df.iloc[orden].reset_index(drop=True)
+        self.conteos = np.bincount(codigos_usuario)
+        self.inicios = np.cumsum(self.conteos) - self.conteos
+        self.segundo_semana = (inicio.dt.dayofweek * 86400 + (inicio - inicio.dt.normalize()).dt.total_seconds()
+                               ).to_numpy()[orden]
+        self.duracion = (fin - inicio).dt.total_seconds().to_numpy()[orden]
+        self.codigos_estacion, self.estaciones = pd.factorize(self.filas['evse_uid'])
+
+    @property
+    def promedio_por_usuario(self):
+        return self.conteos.mean()
+
+
+# Nombres de estación: las reales y, si se piden más, copias con sufijo (_C1, _C2, ...)
+def nombres_estaciones(estaciones, copias):
+    return np.array([est if copia == 0 else f"{est}_C{copia}" for copia in range(copias) for est in estaciones],
+                    dtype=object)
+
+
+# Genera las transacciones de `n_usuarios` usuarios sintéticos (ids y usuarios consecutivos).
+# Con `max_filas` se descartan las últimas, antes de mezclar, para no partir a varios usuarios.
+def generar_bloque(plantilla, n_usuarios, primer_id, primer_usuario, semanas, copias, rng, max_filas=None):
+    reales = rng.integers(0, len(plantilla.conteos), n_usuarios)
+    conteos = plantilla.conteos[reales]
+    if max_filas is not None:
+        conteos = np.diff(np.minimum(np.concatenate([[0], np.cumsum(conteos)]), max_filas))
+    n = int(conteos.sum())
+    # Posición en la plantilla de cada transacción: inicio del usuario real + orden dentro de él
+    indices = np.repeat(plantilla.inicios[reales] - (np.cumsum(conteos) - conteos), conteos) + np.arange(n)
+    usuario = np.repeat(np.arange(primer_usuario, primer_usuario + n_usuarios), conteos)
+    copia = np.repeat(rng.integers(0, copias, n_usuarios), conteos)
+    base = plantilla.filas.iloc[indices].reset_index(drop=True)
+
+    semana = rng.integers(0, semanas, n)
+    segundos = plantilla.segundo_semana[indices] + rng.uniform(-DESPLAZAMIENTO_MAXIMO, DESPLAZAMIENTO_MAXIMO, n)
+    segundos = np.clip(segundos, 0, 7 * 86400 - 1) + semana * 7 * 86400
+    inicio = INICIO_PERIODO + pd.to_timedelta(np.round(segundos), unit='s')
+    duracion = np.round(plantilla.duracion[indices] * rng.lognormal(0, RUIDO, n))
+    fin = inicio + pd.to_timedelta(duracion, unit='s')
+    factor_energia = rng.lognormal(0, RUIDO, n)
+
+    duracion = duracion.astype('int64')
+    horas, resto = np.divmod(duracion, 3600)
+    minutos, segs = np.divmod(resto, 60)
+    texto_duracion = (pd.Series(horas).astype(str).str.zfill(2) + ':' + pd.Series(minutos).astype(str).str.zfill(2)
+                      + ':' + pd.Series(segs).astype(str).str.zfill(2))
+    ids = pd.Series(np.arange(primer_id, primer_id + n)).astype(str)
+
+    bloque = pd.DataFrame({
+        'id': np.arange(primer_id, primer_id + n),
+        'start_date_time': inicio,
+        'end_date_time': fin,
+        'energy_kwh': np.round(base['energy_kwh'].to_numpy() * factor_energia, 2),
+        'potency_kw': base['potency_kw'].to_numpy(),
+        'connector_id': base['connector_id'].to_numpy(),
+        'evse_uid': nombres_estaciones(plantilla.estaciones, copias)[
+            copia * len(plantilla.estaciones) + plantilla.codigos_estacion[indices]],
+        'duration': texto_duracion,
+        'status': base['status'].to_numpy(),
+        'amount_transaction': np.round(base['amount_transaction'].to_numpy() * factor_energia, -2).astype('int64'),
+        'amount_third': np.round(base['amount_third'].to_numpy() * factor_energia, -2),
+        'status_transaction': base['status_transaction'].to_numpy(),
+        'coupon_code': base['coupon_code'].to_numpy(),
+        'pocket_amount': base['pocket_amount'].to_numpy(),
+        'rented_kWh': base['rented_kWh'].to_numpy(),
+        'rented_time_minutes': base['rented_time_minutes'].to_numpy(),
+        'journal_code': ('CC-1-' + ids).where(base['journal_code'].notna().to_numpy()),
+        'invoice_code': ('FV-2-' + ids).where(base['invoice_code'].notna().to_numpy()),
+        'user_id': usuario,
+    }, columns=COLUMNAS)
+    # El archivo real no está ordenado por usuario ni por fecha
+    return bloque.take(rng.permutation(n)).reset_index(drop=True)
+
+
+# Escribe `filas` transacciones sintéticas en `destino` (CSV o Parquet según la extensión)
+def generar_archivo(plantilla, destino, filas, dias=365, estaciones=None, semilla=0):
+    rng = np.random.default_rng(semilla)
+    semanas = max(1, dias // 7)
+    copias = max(1, math.ceil((estaciones or len(plantilla.estaciones)) / len(plantilla.estaciones)))
+    usuarios_bloque = max(1, int(FILAS_BLOQUE / plantilla.promedio_por_usuario))
+    parquet = os.path.splitext(destino)[1].lower() in EXTENSIONES_PARQUET
+    escritor = None
+    generadas = 0
+    usuarios = 0
+    try:
+        while generadas < filas:
+            n_usuarios = min(usuarios_bloque, math.ceil((filas - generadas) / plantilla.promedio_por_usuario * 1.1))
+            bloque = generar_bloque(plantilla, n_usuarios, generadas + 1, usuarios, semanas, copias, rng,
+                                    max_filas=filas - generadas)
+            if parquet:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                tabla = pa.Table.from_pandas(bloque, preserve_index=False,
+                                             schema=escritor.schema if escritor is not None else None)
+                if escritor is None:
+                    # Una columna de texto vacía en el primer bloque se declara como texto, no como nula
+                    esquema = pa.schema([campo.with_type(pa.string()) if pa.types.is_null(campo.type) else campo
+                                         for campo in tabla.schema])
+                    tabla = tabla.cast(esquema)
+                    escritor = pq.ParquetWriter(destino, esquema)
+                escritor.write_table(tabla)
+            else:
+                bloque.to_csv(destino, index=False, mode='w' if generadas == 0 else 'a', header=(generadas == 0),
+                              date_format='%Y-%m-%d %H:%M:%S')
+            generadas += len(bloque)
+            usuarios += n_usuarios
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return generadas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Genera transacciones sintéticas con el esquema del dataset real.")
+    parser.add_argument('filas', type=int, help="cantidad de transacciones a generar")
+    parser.add_argument('destino', help="archivo de salida (.csv, .parquet)")
+    parser.add_argument('--origen', default='../datos/df_oasis_clean.csv', help="dataset real usado como plantilla")
+    parser.add_argument('--dias', type=int, default=365, help="duración del periodo generado")
+    parser.add_argument('--estaciones', type=int, default=None,
+                        help="cantidad aproximada de estaciones (múltiplo de las reales)")
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+    plantilla = Plantilla(pd.read_csv(args.origen))
+    total = generar_archivo(plantilla, args.destino, args.filas, args.dias, args.estaciones, args.semilla)
+    print(f"✓ {total:,} transacciones sintéticas guardadas en {args.destino}")
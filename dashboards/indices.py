@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+
+# Índices precalculados para filtrar sin recorrer toda la tabla:
+# posiciones de filas por estación y por mes, y las fechas de inicio ordenadas
+# para ubicar cualquier rango de tiempo con búsqueda binaria.
+class IndiceFiltros:
+    def __init__(self, df):
+        self.df = df
+        fechas = df['start_date_time'].to_numpy()
+        if df['start_date_time'].is_monotonic_increasing:
+            self.orden = None
+            self.fechas = fechas
+        else:
+            self.orden = np.argsort(fechas, kind='stable')
+            self.fechas = fechas[self.orden]
+        self.por_estacion = df.groupby('evse_uid', observed=True).indices
+        self.por_mes = df.groupby('mes', observed=True).indices
+
+    # Posiciones (ordenadas) de las filas con inicio en [desde, hasta)
+    def _posiciones_rango(self, desde, hasta):
+        inicio = 0 if desde is None else np.searchsorted(self.fechas, np.datetime64(desde), side='left')
+        fin = len(self.fechas) if hasta is None else np.searchsorted(self.fechas, np.datetime64(hasta), side='left')
+        if self.orden is None:
+            return slice(inicio, fin)
+        return np.sort(self.orden[inicio:fin])
+
+    # Devuelve las filas que cumplen los filtros. Sin filtros se devuelve el mismo DataFrame,
+    # un rango de fechas sobre datos ordenados es un corte contiguo (vista sin copia) y en
+    # los demás casos solo se toman las filas seleccionadas.
+    # estaciones: None (todas) o lista de evse_uid; mes: None (todos) o número de mes.
+    def filtrar(self, estaciones=None, mes=None, desde=None, hasta=None):
+        seleccion = None
+        if desde is not None or hasta is not None:
+            seleccion = self._posiciones_rango(desde, hasta)
+            if isinstance(seleccion, slice):
+                if estaciones is None and mes is None:
+                    return self.df.iloc[seleccion]
+                seleccion = np.arange(seleccion.start, seleccion.stop)
+        if estaciones is not None:
+            vacio = np.empty(0, dtype=np.intp)
+            posiciones = np.sort(np.concatenate([self.por_estacion.get(est, vacio) for est in estaciones] or [vacio]))
+            seleccion = posiciones if seleccion is None else np.intersect1d(seleccion, posiciones, assume_unique=True)
+        if mes is not None:
+            posiciones = self.por_mes.get(mes, np.empty(0, dtype=np.intp))
+            seleccion = posiciones if seleccion is None else np.intersect1d(seleccion, posiciones, assume_unique=True)
+        if seleccion is None:
+            return self.df
+        return self.df.take(seleccion)
+
+    def memoria(self):
+        tamaño = self.fechas.nbytes if self.orden is None else self.fechas.nbytes + self.orden.nbytes
+        tamaño += sum(p.nbytes for p in self.por_estacion.values())
+        tamaño += sum(p.nbytes for p in self.por_mes.values())
+        return int(tamaño)
+
+
+# Ordena las transacciones por fecha de inicio para que los rangos de tiempo sean contiguos
+def ordenar_por_fecha(df):
+    if df['start_date_time'].is_monotonic_increasing:
+        return df
+    return df.sort_values('start_date_time', kind='stable', ignore_index=True)
+
+
+# Convierte los valores del filtro de fechas (texto 'YYYY-MM-DD') en un rango [desde, hasta)
+def rango_fechas(fecha_inicio, fecha_fin):
+    desde = pd.Timestamp(fecha_inicio) if fecha_inicio else None
+    hasta = pd.Timestamp(fecha_fin) + pd.Timedelta(days=1) if fecha_fin else None
+    return desde, hasta
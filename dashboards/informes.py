@@ -0,0 +1,249 @@
+import argparse
+import html as html_texto
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+import plotly.graph_objects as go
+import plotly.offline
+from dash import dcc
+
+# Generación de informes estáticos sin servidor: un HTML por estación y mes (y los totales de
+# la red) con las figuras y el análisis de cada pestaña, tal como los arma el dashboard.
+# El dataset se publica una vez (ver publicacion.py) y cada proceso del grupo lo mapea en
+# memoria con su cubo de agregados, en lugar de volver a leer y preparar el archivo.
+# Con --formatos png/pdf las figuras se exportan además como imágenes (requiere kaleido).
+
+PESTAÑAS = {
+    'tab-horario': 'Análisis Horario',
+    'tab-ocupacion': 'Ocupación',
+    'tab-semanal': 'Análisis Semanal',
+    'tab-estaciones': 'Top Estaciones',
+    'tab-energia': 'Distribución Energía',
+    'tab-ingresos': 'Ingresos Mensuales',
+    'tab-pronostico': 'Pronóstico Demanda',
+    'tab-cohortes': 'Cohortes Usuarios',
+    'tab-duracion': 'Duración Sesiones',
+    'tab-tarifas': 'Simulador Tarifas',
+}
+ARCHIVO_PLOTLYJS = 'plotly.min.js'
+# Propiedades de estilo numéricas que no llevan unidad (el resto se interpreta en px, como en React)
+SIN_UNIDAD = {'fontWeight', 'opacity', 'zIndex', 'flex', 'flexGrow', 'flexShrink', 'lineHeight', 'order'}
+
+# Estado de cada proceso del grupo
+_proceso = {}
+
+
+def nombre_archivo(texto):
+    return re.sub(r'[^\w.-]', '_', str(texto))
+
+
+def estilo_css(estilo):
+    partes = []
+    for clave, valor in estilo.items():
+        propiedad = re.sub(r'([A-Z])', r'-\1', clave).lower()
+        if isinstance(valor, (int, float)) and clave not in SIN_UNIDAD:
+            valor = f'{valor}px'
+        partes.append(f'{propiedad}:{valor}')
+    return ';'.join(partes)
+
+
+# Convierte el árbol de componentes de Dash que devuelve construir_contenido en HTML.
+# Cada figura (dcc.Graph) se entrega a `figura_html`, que devuelve su fragmento.
+def componente_a_html(componente, figura_html):
+    if componente is None:
+        return ''
+    if isinstance(componente, (list, tuple)):
+        return ''.join(componente_a_html(hijo, figura_html) for hijo in componente)
+    if isinstance(componente, (str, int, float)):
+        return html_texto.escape(str(componente))
+    if isinstance(componente, dcc.Graph):
+        return figura_html(componente.figure)
+    etiqueta = type(componente).__name__.lower()
+    atributos = ''
+    for prop in ('id', 'className', 'style', 'title', 'colSpan', 'rowSpan'):
+        valor = getattr(componente, prop, None)
+        if valor is None:
+            continue
+        if prop == 'style':
+            valor = estilo_css(valor)
+        nombre = {'className': 'class', 'colSpan': 'colspan', 'rowSpan': 'rowspan'}.get(prop, prop)
+        atributos += f' {nombre}="{html_texto.escape(str(valor))}"'
+    hijos = componente_a_html(getattr(componente, 'children', None), figura_html)
+    return f'<{etiqueta}{atributos}>{hijos}</{etiqueta}>'
+
+
+def _iniciar_proceso(directorio_publicado, salida, pestañas, formatos):
+    # El dashboard se importa en modo compartido: mapea la versión publicada y no lee el archivo.
+    # Sin modo vivo, métricas, API ni estado de trabajos en disco: cada proceso solo renderiza.
+    os.environ['OASIS_DATOS_COMPARTIDOS'] = directorio_publicado
+    os.environ.pop('OASIS_DIRECTORIO_VIVO', None)
+    for variable in ('OASIS_METRICAS', 'OASIS_API', 'OASIS_DIRECTORIO_TRABAJOS'):
+        os.environ[variable] = '0'
+    import app_dashboard
+    _proceso.update(app=app_dashboard, salida=salida, pestañas=pestañas, formatos=formatos)
+
+
+def _exportar_figura(figura, ruta_base, formatos):
+    figura = go.Figure(figura)
+    for formato in formatos:
+        figura.write_image(f'{ruta_base}.{formato}', format=formato, width=1100, height=550)
+
+
+# Informe de una estación (o de la red, con 'TODAS') para un mes (o 'TODOS'). Devuelve la
+# ruta relativa del HTML y las transacciones, o None si no hay transacciones con esos filtros.
+def generar_informe(estacion, mes):
+    app = _proceso['app']
+    from vistas import obtener_vista
+    dataset = app.obtener_dataset(app.version_vigente())
+    vista = obtener_vista(dataset, *app.normalizar_filtros(estacion, mes))
+    kpis = vista.kpis
+    if kpis['transacciones'] == 0:
+        return None
+    nombre_mes = 'Todos los meses' if mes == 'TODOS' else dataset.cubo.nombres_mes.get(mes, str(mes))
+    nombre_estacion = 'Todas las estaciones' if estacion == 'TODAS' else estacion
+    carpeta = nombre_archivo(estacion)
+    base = nombre_archivo(mes)
+    os.makedirs(os.path.join(_proceso['salida'], carpeta), exist_ok=True)
+
+    secciones = []
+    for tab in _proceso['pestañas']:
+        figuras = []
+
+        def figura_html(figura):
+            figuras.append(figura)
+            if _proceso['formatos']:
+                _exportar_figura(figura, os.path.join(_proceso['salida'], carpeta, f'{base}_{tab}_{len(figuras)}'),
+                                 _proceso['formatos'])
+            return go.Figure(figura).to_html(full_html=False, include_plotlyjs=False)
+
+        contenido = componente_a_html(app.construir_contenido(tab, vista), figura_html)
+        secciones.append(f'<section><h2>{html_texto.escape(PESTAÑAS.get(tab, tab))}</h2>{contenido}</section>')
+
+    duracion = kpis['duracion_promedio']
+    resumen = [
+        ('Transacciones', f"{kpis['transacciones']:,}"),
+        ('Energía (kWh)', f"{kpis['energia']:,.0f}"),
+        ('Ingresos', f"${kpis['ingresos']:,.0f}"),
+        ('Usuarios únicos', f"{kpis['usuarios']:,}"),
+        ('Precio por kWh', f"${kpis['ingresos'] / kpis['energia']:,.0f}" if kpis['energia'] else '-'),
+        ('Duración promedio', f"{duracion / 60:.1f}h" if duracion >= 60 else f"{duracion:.0f}min"),
+    ]
+    titulo = f"{nombre_estacion} - {nombre_mes}"
+    documento = (
+        '<!DOCTYPE html><html lang="es"><head><meta charset="utf-8">'
+        f'<title>Informe OASIS - {html_texto.escape(titulo)}</title>'
+        f'<script src="../{ARCHIVO_PLOTLYJS}"></script>'
+        '<style>body{font-family:Arial,sans-serif;margin:30px;color:#2c3e50}'
+        'table{border-collapse:collapse}td{padding:4px 16px;border-bottom:1px solid #ddd}</style>'
+        '</head><body>'
+        f'<h1>Informe OASIS: {html_texto.escape(titulo)}</h1><table>'
+        + ''.join(f'<tr><td>{nombre}</td><td><strong>{valor}</strong></td></tr>' for nombre, valor in resumen)
+        + '</table>' + ''.join(secciones) + '</body></html>'
+    )
+    ruta = os.path.join(carpeta, f'{base}.html')
+    with open(os.path.join(_proceso['salida'], ruta), 'w', encoding='utf-8') as f:
+        f.write(documento)
+    return ruta, kpis['transacciones']
+
+
+# Todos los meses de una estación en un mismo proceso: sus vistas comparten los índices ya leídos
+def generar_estacion(estacion, meses):
+    informes = []
+    for mes in meses:
+        resultado = generar_informe(estacion, mes)
+        if resultado is not None:
+            informes.append((estacion, mes) + resultado)
+    return informes
+
+
+# Primero los totales de la red y, dentro de cada estación, el total anual y luego los meses
+def _orden_informe(informe):
+    estacion, mes = informe[:2]
+    return estacion != 'TODAS', estacion, mes != 'TODOS', 0 if mes == 'TODOS' else mes
+
+
+def escribir_indice(salida, informes, nombres_mes):
+    filas = []
+    for estacion, mes, ruta, transacciones in sorted(informes, key=_orden_informe):
+        nombre_mes = 'Todos los meses' if mes == 'TODOS' else nombres_mes.get(mes, str(mes))
+        filas.append(f'<tr><td>{html_texto.escape(estacion)}</td><td>{html_texto.escape(nombre_mes)}</td>'
+                     f'<td>{transacciones:,}</td><td><a href="{html_texto.escape(ruta)}">ver</a></td></tr>')
+    with open(os.path.join(salida, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write('<!DOCTYPE html><html lang="es"><head><meta charset="utf-8"><title>Informes OASIS</title>'
+                '<style>body{font-family:Arial,sans-serif;margin:30px}td,th{padding:4px 12px;text-align:left}</style>'
+                f'</head><body><h1>Informes OASIS ({len(informes):,})</h1>'
+                '<table><tr><th>Estación</th><th>Mes</th><th>Transacciones</th><th></th></tr>'
+                + ''.join(filas) + '</table></body></html>')
+
+
+# Publica el archivo de origen en un directorio temporal para que lo mapeen los procesos
+def publicar_origen(origen, directorio):
+    from carga_datos import compactar_datos, leer_archivo, preparar_datos
+    from cubo_agregados import construir_cubo
+    from publicacion import publicar_dataset
+    from registro_datos import Dataset
+    df = compactar_datos(preparar_datos(leer_archivo(origen)))
+    publicar_dataset(Dataset(df, construir_cubo(df)), directorio)
+
+
+def generar_informes(salida, origen=None, publicado=None, estaciones=None, meses=None, pestañas=None,
+                     formatos=(), procesos=None):
+    from publicacion import cargar_publicado, leer_puntero
+    pestañas = list(pestañas or PESTAÑAS)
+    formatos = [formato for formato in formatos if formato != 'html']
+    if formatos:
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            raise SystemExit("Exportar figuras a PNG/PDF requiere kaleido (pip install kaleido)")
+
+    temporal = None
+    if publicado is None:
+        temporal = publicado = tempfile.mkdtemp(prefix='oasis-informes-')
+        publicar_origen(origen, publicado)
+    try:
+        cubo = cargar_publicado(publicado, leer_puntero(publicado)).cubo
+        estaciones = estaciones or ['TODAS'] + sorted(cubo.celdas['evse_uid'].unique())
+        meses = meses or ['TODOS'] + [int(mes) for mes in sorted(cubo.nombres_mes.index)]
+        os.makedirs(salida, exist_ok=True)
+        with open(os.path.join(salida, ARCHIVO_PLOTLYJS), 'w', encoding='utf-8') as f:
+            f.write(plotly.offline.get_plotlyjs())
+
+        inicio = time.perf_counter()
+        informes = []
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=get_context('spawn'),
+                                 initializer=_iniciar_proceso,
+                                 initargs=(publicado, salida, pestañas, formatos)) as grupo:
+            futuros = [grupo.submit(generar_estacion, estacion, meses) for estacion in estaciones]
+            for i, futuro in enumerate(as_completed(futuros), 1):
+                informes.extend(futuro.result())
+                print(f"  {i}/{len(futuros)} estaciones, {len(informes):,} informes "
+                      f"({time.perf_counter() - inicio:.0f}s)")
+        escribir_indice(salida, informes, cubo.nombres_mes)
+        return informes
+    finally:
+        if temporal is not None:
+            shutil.rmtree(temporal, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Genera los informes estáticos por estación y mes.")
+    parser.add_argument('origen', nargs='?', default='../datos/df_oasis_clean.csv')
+    parser.add_argument('--salida', default='../resultados/informes')
+    parser.add_argument('--publicado', default=None,
+                        help="directorio ya publicado con publicacion.py (en lugar de leer el origen)")
+    parser.add_argument('--estaciones', nargs='+', default=None, help="por defecto todas, más el total de la red")
+    parser.add_argument('--meses', nargs='+', type=int, default=None, help="por defecto todos, más el total anual")
+    parser.add_argument('--pestañas', nargs='+', choices=list(PESTAÑAS), default=None)
+    parser.add_argument('--formatos', nargs='+', choices=['html', 'png', 'pdf', 'svg'], default=['html'])
+    parser.add_argument('--procesos', type=int, default=None, help="por defecto, uno por núcleo")
+    args = parser.parse_args()
+    inicio = time.perf_counter()
+    informes = generar_informes(args.salida, args.origen, args.publicado, args.estaciones, args.meses,
+                                args.pestañas, args.formatos, args.procesos)
+    print(f"✓ {len(informes):,} informes generados en {args.salida} ({time.perf_counter() - inicio:.0f}s)")
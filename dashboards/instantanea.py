@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from publicacion import cargar_publicado, publicar_dataset, purgar_versiones
+
+# Instantánea de arranque: el dataset inicial ya tipado (columnas, cubo y series diarias)
+# guardado con el formato de publicacion.py en <carpeta del archivo>/instantanea/. La versión
+# se deriva del hash del archivo fuente, así que una instantánea solo se usa si el archivo no
+# cambió; al arrancar se mapea en memoria en lugar de leer, preparar y agregar el archivo.
+
+DIRECTORIO_INSTANTANEA = 'instantanea'
+ARCHIVO_HUELLAS = 'huellas.json'
+# Cambia cuando cambia la forma de preparar los datos (invalida las instantáneas anteriores)
+FORMATO = 2
+# Instantáneas que se conservan (por ejemplo, con y sin modo compacto)
+MAX_INSTANTANEAS = 2
+
+
+def directorio_instantanea(ruta_fuente):
+    return os.path.join(os.path.dirname(os.path.abspath(ruta_fuente)), DIRECTORIO_INSTANTANEA)
+
+
+def _hash_archivo(ruta, bloque=4 * 1024 * 1024):
+    resumen = hashlib.blake2b(digest_size=16)
+    with open(ruta, 'rb') as f:
+        while datos := f.read(bloque):
+            resumen.update(datos)
+    return resumen.hexdigest()
+
+
+def _leer_huellas(directorio):
+    try:
+        with open(os.path.join(directorio, ARCHIVO_HUELLAS)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+# Hash del contenido del archivo fuente. Se recuerda junto con el tamaño y la fecha de
+# modificación, así en los arranques siguientes no hace falta volver a leer el archivo.
+def huella_archivo(ruta, directorio):
+    estado = os.stat(ruta)
+    clave = os.path.abspath(ruta)
+    huellas = _leer_huellas(directorio)
+    anterior = huellas.get(clave)
+    if anterior and anterior['tamaño'] == estado.st_size and anterior['modificado'] == estado.st_mtime_ns:
+        return anterior['hash']
+    huella = _hash_archivo(ruta)
+    huellas[clave] = {'tamaño': estado.st_size, 'modificado': estado.st_mtime_ns, 'hash': huella}
+    try:
+        os.makedirs(directorio, exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(prefix='.huellas-', dir=directorio)
+        with os.fdopen(descriptor, 'w') as f:
+            json.dump(huellas, f, indent=1)
+        os.replace(temporal, os.path.join(directorio, ARCHIVO_HUELLAS))
+    except OSError:
+        pass
+    return huella
+
+
+# Versión de la instantánea: hash del archivo y opciones que cambian el dataset resultante
+def version_instantanea(huella, compacto):
+    return hashlib.blake2b(f'{FORMATO}:{int(compacto)}:{huella}'.encode(), digest_size=8).hexdigest()
+
+
+# Dataset inicial desde la instantánea o, si no la hay o el archivo cambió, con `construir`
+# (que recibe la ruta), guardando la instantánea para el próximo arranque.
+# Devuelve el dataset y si salió de la instantánea.
+def cargar_o_construir(ruta, construir, compacto):
+    directorio = directorio_instantanea(ruta)
+    version = version_instantanea(huella_archivo(ruta, directorio), compacto)
+    try:
+        dataset = cargar_publicado(directorio, version)
+    except Exception as e:
+        # Instantánea dañada (por ejemplo, escrita por otra versión de pandas): se reconstruye
+        print(f"No se pudo abrir la instantánea de arranque {version}: {e}")
+        shutil.rmtree(os.path.join(directorio, version), ignore_errors=True)
+        dataset = None
+    if dataset is not None:
+        return dataset, True
+    dataset = construir(ruta)
+    dataset.version = version
+    try:
+        publicar_dataset(dataset, directorio, actual=False)
+        purgar_versiones(directorio, MAX_INSTANTANEAS)
+    except OSError as e:
+        print(f"No se pudo guardar la instantánea de arranque en {directorio}: {e}")
+    return dataset, False
@@ -0,0 +1,98 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Pipeline de limpieza del notebook 01 (01_analisis_puertos_carga.ipynb) como operaciones
+# vectorizadas sobre columnas completas, reutilizable desde los notebooks, el dashboard y la CLI.
+
+DIAS_SEMANA = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+DIAS_ESP = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+MESES_ESP = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 'Julio', 'Agosto',
+             'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
+
+# Periodo del día para cada hora (0-23): Madrugada 0-5, Mañana 6-11, Tarde 12-17, Noche 18-23
+PERIODOS_DIA = ['Madrugada', 'Mañana', 'Tarde', 'Noche']
+PERIODO_POR_HORA = np.repeat(np.arange(4), 6)
+
+COLUMNAS_ELIMINAR = ['coupon_code']
+# Formato de las fechas en el CSV limpio (el del archivo original, sin fracciones de segundo)
+FORMATO_FECHA_CSV = '%Y-%m-%d %H:%M:%S'
+
+
+# Convierte las fechas de texto a datetime (ISO 8601, con o sin microsegundos)
+def convertir_fechas(df):
+    for col in ['start_date_time', 'end_date_time']:
+        if not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], format='ISO8601', errors='coerce')
+    return df
+
+
+# Columnas de calendario que usa el dashboard: mes, hora, día de la semana y nombre del mes.
+# Los nombres salen de tablas de búsqueda indexadas por código, no de formatear cada fila.
+def columnas_calendario(df):
+    inicio = df['start_date_time'].dt
+    df['mes'] = inicio.month
+    df['hora'] = inicio.hour
+    df['dia_semana'] = pd.Categorical.from_codes(inicio.dayofweek.fillna(-1).astype('int8'), categories=DIAS_SEMANA)
+    df['mes_nombre'] = pd.Categorical.from_codes((inicio.month - 1).fillna(-1).astype('int8'), categories=MESES_ESP)
+    return df
+
+
+# Columnas adicionales del análisis exploratorio (año, día, periodo del día, fin de semana)
+def columnas_analisis(df):
+    inicio = df['start_date_time'].dt
+    codigo_dia = inicio.dayofweek.fillna(-1).astype('int8')
+    hora = inicio.hour
+    codigo_periodo = np.where(hora.notna(), PERIODO_POR_HORA[hora.fillna(0).astype('int8')], -1)
+    df['año'] = inicio.year
+    df['dia'] = inicio.day
+    df['dia_semana_esp'] = pd.Categorical.from_codes(codigo_dia, categories=DIAS_ESP)
+    df['periodo_dia'] = pd.Categorical.from_codes(codigo_periodo, categories=PERIODOS_DIA)
+    df['es_fin_de_semana'] = codigo_dia >= 5
+    return df
+
+
+# Limpieza completa: elimina coupon_code (99% vacío), descarta transacciones sin fecha de fin
+# y agrega las columnas derivadas en el mismo orden que el notebook 01
+def limpiar_datos(df):
+    df = df.drop(columns=[col for col in COLUMNAS_ELIMINAR if col in df.columns])
+    df = df.dropna(subset=['end_date_time']).reset_index(drop=True)
+    df = convertir_fechas(df)
+    df = columnas_calendario(df)
+    df = columnas_analisis(df)
+    orden = ['año', 'mes', 'dia', 'hora', 'dia_semana', 'mes_nombre', 'dia_semana_esp', 'periodo_dia', 'es_fin_de_semana']
+    return df[[col for col in df.columns if col not in orden] + orden]
+
+
+# Limpia un archivo completo. Con destino CSV se procesa por bloques de filas,
+# así la reconstrucción nocturna no necesita cargar todo el histórico en memoria.
+def limpiar_archivo(origen, destino, tamaño_bloque=1_000_000):
+    extension = os.path.splitext(destino)[1].lower()
+    if extension != '.csv':
+        from carga_datos import EXTENSIONES_FEATHER, leer_archivo
+        df = limpiar_datos(leer_archivo(origen))
+        if extension in EXTENSIONES_FEATHER:
+            df.to_feather(destino)
+        else:
+            df.to_parquet(destino, index=False)
+        return len(df)
+    total = 0
+    with pd.read_csv(origen, chunksize=tamaño_bloque) as lector:
+        for i, bloque in enumerate(lector):
+            bloque = limpiar_datos(bloque)
+            bloque.to_csv(destino, index=False, mode='w' if i == 0 else 'a', header=(i == 0),
+                          date_format=FORMATO_FECHA_CSV)
+            total += len(bloque)
+    return total
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Limpia el CSV de transacciones (pipeline del notebook 01).")
+    parser.add_argument('origen', nargs='?', default='../datos/df_oasis_clean.csv')
+    parser.add_argument('destino', nargs='?', default='../datos/datos_limpios.csv')
+    parser.add_argument('--bloque', type=int, default=1_000_000, help="filas por bloque al escribir CSV")
+    args = parser.parse_args()
+    total = limpiar_archivo(args.origen, args.destino, args.bloque)
+    print(f"✓ {total:,} registros limpios guardados en {args.destino}")
@@ -0,0 +1,199 @@
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Instrumentación de los callbacks: tiempo total y por etapa, filas procesadas, bytes de
+# respuesta y aciertos de caché, expuestos en /metrics con el formato de texto de Prometheus.
+# Con OASIS_PERFILADO=1 cada callback medido se perfila con cProfile (ver /metrics/perfil).
+
+# Límites (segundos) de los intervalos del histograma de latencia de los callbacks
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PERFILADO = os.environ.get('OASIS_PERFILADO', '0') == '1'
+
+# Callback y etapas en curso en cada hilo
+_hilo = threading.local()
+
+
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # callback -> conteos acumulados por límite (el último es el total) y suma de segundos
+        self._latencias = defaultdict(lambda: [[0] * (len(LIMITES_LATENCIA) + 1), 0.0])
+        self._sumas = defaultdict(float)
+        self._colectores = []
+        self._perfil = None
+
+    def observar_callback(self, callback, segundos):
+        with self._lock:
+            latencia = self._latencias[callback]
+            for i, limite in enumerate(LIMITES_LATENCIA):
+                if segundos <= limite:
+                    latencia[0][i] += 1
+            latencia[0][-1] += 1
+            latencia[1] += segundos
+
+    # Suma un valor a un contador o a la suma de un resumen (nombre + etiquetas)
+    def sumar(self, nombre, valor=1, **etiquetas):
+        with self._lock:
+            self._sumas[(nombre, tuple(sorted(etiquetas.items())))] += valor
+
+    # Función que devuelve [(nombre, tipo, etiquetas, valor)] al exportar (cachés, memoria, ...)
+    def registrar_colector(self, funcion):
+        self._colectores.append(funcion)
+
+    def agregar_perfil(self, perfil):
+        with self._lock:
+            if self._perfil is None:
+                self._perfil = pstats.Stats(perfil)
+            else:
+                self._perfil.add(perfil)
+
+    def perfil_texto(self, n=40):
+        with self._lock:
+            if self._perfil is None:
+                return "Sin datos de perfilado (activar con OASIS_PERFILADO=1)\n"
+            salida = io.StringIO()
+            self._perfil.stream = salida
+            self._perfil.sort_stats('cumulative').print_stats(n)
+            return salida.getvalue()
+
+    # Texto en formato de exposición de Prometheus. Los nombres terminados en _sum/_count
+    # forman resúmenes y los demás son contadores.
+    def exportar(self):
+        with self._lock:
+            latencias = {callback: (list(conteos), suma) for callback, (conteos, suma) in self._latencias.items()}
+            sumas = dict(self._sumas)
+        lineas = ['# TYPE oasis_callback_segundos histogram']
+        for callback, (conteos, suma) in sorted(latencias.items()):
+            for limite, conteo in zip(LIMITES_LATENCIA + ('+Inf',), conteos):
+                lineas.append(f'oasis_callback_segundos_bucket{{callback="{callback}",le="{limite}"}} {conteo}')
+            lineas.append(f'oasis_callback_segundos_sum{{callback="{callback}"}} {suma:.12g}')
+            lineas.append(f'oasis_callback_segundos_count{{callback="{callback}"}} {conteos[-1]}')
+        tipos = {}
+        for (nombre, etiquetas), valor in sorted(sumas.items()):
+            base, tipo = nombre, 'counter'
+            for sufijo in ('_sum', '_count'):
+                if nombre.endswith(sufijo):
+                    base, tipo = nombre[:-len(sufijo)], 'summary'
+            if base not in tipos:
+                tipos[base] = tipo
+                lineas.append(f'# TYPE {base} {tipo}')
+            lineas.append(f'{nombre}{_etiquetas(etiquetas)} {valor:.12g}')
+        for colector in self._colectores:
+            for nombre, tipo, etiquetas, valor in colector():
+                if nombre not in tipos:
+                    tipos[nombre] = tipo
+                    lineas.append(f'# TYPE {nombre} {tipo}')
+                lineas.append(f'{nombre}{_etiquetas(tuple(sorted(etiquetas.items())))} {valor:.12g}')
+        return '\n'.join(lineas) + '\n'
+
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ''
+    return '{' + ','.join(f'{clave}="{valor}"' for clave, valor in etiquetas) + '}'
+
+
+metricas = Metricas()
+
+
+def callback_actual():
+    return getattr(_hilo, 'callback', None) or 'otro'
+
+
+# Mide una ejecución completa (un callback o un trabajo en segundo plano)
+@contextmanager
+def medicion(callback):
+    anterior = getattr(_hilo, 'callback', None)
+    _hilo.callback = callback
+    perfil = None
+    if PERFILADO:
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Otro hilo ya está perfilando (Python 3.12+ admite un solo perfilador a la vez)
+            perfil = None
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        metricas.observar_callback(callback, time.perf_counter() - inicio)
+        if perfil is not None:
+            perfil.disable()
+            metricas.agregar_perfil(perfil)
+        _hilo.callback = anterior
+
+
+# Mide una etapa dentro de la ejecución en curso. Se registra el tiempo propio de la etapa:
+# las etapas anidadas se descuentan de la que las contiene para que las sumas no se repitan.
+@contextmanager
+def etapa(nombre):
+    pila = getattr(_hilo, 'etapas', None)
+    if pila is None:
+        pila = _hilo.etapas = []
+    pila.append(0.0)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - inicio
+        anidadas = pila.pop()
+        if pila:
+            pila[-1] += duracion
+        metricas.sumar('oasis_etapa_segundos_sum', duracion - anidadas, callback=callback_actual(), etapa=nombre)
+        metricas.sumar('oasis_etapa_segundos_count', 1, callback=callback_actual(), etapa=nombre)
+
+
+def contar_filas(n):
+    metricas.sumar('oasis_filas_total', n, callback=callback_actual())
+
+
+# Decorador para los callbacks de Dash: mide el callback y deja su nombre en la petición
+# para asociarle los bytes de la respuesta (ver instalar)
+def medir_callback(funcion):
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        from flask import g, has_request_context
+        if has_request_context():
+            g.callback_oasis = funcion.__name__
+        with medicion(funcion.__name__):
+            return funcion(*args, **kwargs)
+    return envoltura
+
+
+# Registra en el servidor Flask el tiempo y tamaño de cada respuesta de callback y las rutas
+# /metrics (Prometheus) y /metrics/perfil (resumen de cProfile)
+def instalar(server):
+    from flask import Response, g
+
+    @server.before_request
+    def _inicio_peticion():
+        g.inicio_oasis = time.perf_counter()
+
+    @server.after_request
+    def _fin_peticion(respuesta):
+        callback = getattr(g, 'callback_oasis', None)
+        if callback is not None and not respuesta.direct_passthrough:
+            tamaño = respuesta.calculate_content_length() or 0
+            metricas.sumar('oasis_respuesta_bytes_sum', tamaño, callback=callback)
+            metricas.sumar('oasis_respuesta_bytes_count', 1, callback=callback)
+            # Tiempo total de la petición: incluye deserializar la entrada y serializar la salida
+            segundos = time.perf_counter() - g.get('inicio_oasis', time.perf_counter())
+            metricas.sumar('oasis_peticion_segundos_sum', segundos, callback=callback)
+            metricas.sumar('oasis_peticion_segundos_count', 1, callback=callback)
+        return respuesta
+
+    @server.route('/metrics')
+    def _metricas():
+        return Response(metricas.exportar(), mimetype='text/plain; version=0.0.4')
+
+    @server.route('/metrics/perfil')
+    def _perfil():
+        return Response(metricas.perfil_texto(), mimetype='text/plain')
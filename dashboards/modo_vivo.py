@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+import traceback
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from carga_datos import EXTENSIONES_FEATHER, EXTENSIONES_PARQUET
+from metricas import metricas
+
+# Modo vivo: un hilo revisa periódicamente una carpeta y cada archivo de transacciones nuevo
+# se agrega a la versión vigente del dataset (ver `ingerir_archivo_vivo` en app_dashboard.py).
+# Un archivo se ingiere cuando su tamaño y fecha de modificación no cambian entre dos
+# revisiones, así no se lee uno que todavía se está copiando. Los archivos no se mueven: al
+# reiniciar se vuelven a aplicar todos (los ids repetidos se omiten al agregar).
+# Con varios workers solo ingiere el que obtiene el candado de la carpeta; los demás reciben
+# las versiones nuevas a través de la publicación compartida.
+
+EXTENSIONES_VIVO = ('.csv', '.gz', '.zip') + EXTENSIONES_PARQUET + EXTENSIONES_FEATHER
+ARCHIVO_CANDADO = '.oasis_vivo.lock'
+
+
+def archivo_ingerible(nombre):
+    return not nombre.startswith(('.', '~')) and nombre.lower().endswith(EXTENSIONES_VIVO)
+
+
+class FuenteViva:
+    # `ingerir(ruta)` agrega el archivo a la versión vigente y devuelve la versión nueva
+    def __init__(self, directorio, ingerir, version_inicial=None, intervalo=5.0):
+        self.directorio = directorio
+        self.ingerir = ingerir
+        self.intervalo = intervalo
+        self.version = version_inicial
+        # Versiones que fueron vigentes: las sesiones que las usan pasan a la última
+        self.versiones = {version_inicial} if version_inicial else set()
+        self._vistos = {}
+        self._procesados = set()
+        self._candado = None
+        self._hilo = None
+        self._detener = threading.Event()
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._ejecutar, name='oasis-modo-vivo', daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+
+    def _ejecutar(self):
+        while not self._detener.is_set():
+            try:
+                if self._tomar_candado():
+                    self.revisar()
+            except Exception:
+                traceback.print_exc()
+            self._detener.wait(self.intervalo)
+
+    # Candado exclusivo sobre la carpeta (se conserva mientras viva el proceso)
+    def _tomar_candado(self):
+        if fcntl is None or self._candado is not None:
+            return True
+        archivo = open(os.path.join(self.directorio, ARCHIVO_CANDADO), 'a')
+        try:
+            fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            archivo.close()
+            return False
+        self._candado = archivo
+        return True
+
+    # Archivos listos: ingeribles, no procesados y sin cambios desde la revisión anterior
+    def pendientes(self):
+        listos = []
+        vistos = {}
+        with os.scandir(self.directorio) as entradas:
+            for entrada in entradas:
+                if not entrada.is_file() or not archivo_ingerible(entrada.name):
+                    continue
+                estado = entrada.stat()
+                firma = (entrada.name, estado.st_size, estado.st_mtime_ns)
+                if firma in self._procesados:
+                    continue
+                vistos[entrada.name] = firma
+                if self._vistos.get(entrada.name) == firma:
+                    listos.append((estado.st_mtime_ns, entrada.name, firma))
+        self._vistos = vistos
+        return [(os.path.join(self.directorio, nombre), firma) for _, nombre, firma in sorted(listos)]
+
+    # Ingiere los archivos listos, en orden de modificación. Un archivo con error no se
+    # reintenta hasta que cambie.
+    def revisar(self):
+        for ruta, firma in self.pendientes():
+            self._procesados.add(firma)
+            inicio = time.perf_counter()
+            try:
+                version = self.ingerir(ruta)
+            except Exception as e:
+                metricas.sumar('oasis_vivo_archivos_total', resultado='error')
+                print(f"Modo vivo: no se pudo ingerir '{os.path.basename(ruta)}': {e}")
+                continue
+            metricas.sumar('oasis_vivo_archivos_total', resultado='ingerido')
+            if version is not None:
+                self.version = version
+                self.versiones.add(version)
+            print(f"✓ Modo vivo: '{os.path.basename(ruta)}' ingerido en {time.perf_counter() - inicio:.2f}s")
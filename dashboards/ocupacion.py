@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+from trabajos import informar_progreso
+
+HORA_NS = 3600 * 10**9
+DIAS_SEMANA = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+# 1970-01-01 (día 0 de la época) fue jueves; con lunes = 0 el desplazamiento es 3
+DESPLAZAMIENTO_EPOCA = 3
+
+
+# Barrido de eventos (sweep-line) por cargador (evse_uid, connector_id).
+# Cada sesión aporta +1 en su inicio y -1 en su fin; al ordenar los eventos por
+# (cargador, tiempo, tipo) la suma acumulada da las sesiones activas en cada instante.
+# Devuelve los segmentos de tiempo con concurrencia constante. Costo O(n log n).
+def segmentos_concurrencia(df):
+    inicio = df['start_date_time'].to_numpy()
+    fin = df['end_date_time'].to_numpy()
+    validas = ~np.isnat(inicio) & ~np.isnat(fin) & (fin > inicio)
+    df = df[validas]
+    codigos, cargadores = pd.MultiIndex.from_arrays(
+        [df['evse_uid'].astype(str), df['connector_id']]).factorize()
+    n = len(df)
+    tiempos = np.concatenate([inicio[validas], fin[validas]]).astype('int64')
+    deltas = np.concatenate([np.ones(n, dtype=np.int32), -np.ones(n, dtype=np.int32)])
+    cods = np.concatenate([codigos, codigos])
+    # Los fines van antes que los inicios en el mismo instante: sesiones consecutivas no se solapan
+    orden = np.lexsort((deltas, tiempos, cods))
+    tiempos, deltas, cods = tiempos[orden], deltas[orden], cods[orden]
+    # Cada cargador suma cero, así que la suma acumulada global se reinicia sola entre cargadores
+    concurrencia = np.cumsum(deltas)
+    mismo = cods[:-1] == cods[1:]
+    segmentos = pd.DataFrame({
+        'cargador': cods[:-1][mismo],
+        'inicio': tiempos[:-1][mismo],
+        'fin': tiempos[1:][mismo],
+        'concurrencia': concurrencia[:-1][mismo],
+    })
+    segmentos = segmentos[(segmentos['concurrencia'] > 0) & (segmentos['fin'] > segmentos['inicio'])]
+    return segmentos.reset_index(drop=True), cargadores, codigos
+
+
+# Parte los segmentos en tramos que no cruzan el cambio de hora, para asignar el tiempo
+# ocupado a cada (día de la semana, hora del día)
+def dividir_por_hora(segmentos):
+    ini = segmentos['inicio'].to_numpy()
+    fin = segmentos['fin'].to_numpy()
+    hora_ini = ini // HORA_NS
+    n = (fin - 1) // HORA_NS - hora_ini + 1
+    idx = np.repeat(np.arange(len(ini)), n)
+    desplazamiento = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    hora_abs = hora_ini[idx] + desplazamiento
+    duracion = np.minimum(fin[idx], (hora_abs + 1) * HORA_NS) - np.maximum(ini[idx], hora_abs * HORA_NS)
+    return pd.DataFrame({
+        'cargador': segmentos['cargador'].to_numpy()[idx],
+        'hora_abs': hora_abs,
+        'duracion': duracion,
+        'concurrencia': segmentos['concurrencia'].to_numpy()[idx],
+    })
+
+
+# Ocupación por cargador y por (día de la semana, hora): pico de sesiones simultáneas y
+# porcentaje del tiempo con al menos una sesión activa sobre el periodo analizado
+def calcular_ocupacion(df):
+    informar_progreso(0.0, "Ordenando inicios y fines de sesión")
+    segmentos, cargadores, codigos = segmentos_concurrencia(df)
+    if segmentos.empty:
+        return None
+    informar_progreso(0.5, "Repartiendo el tiempo ocupado por hora")
+    tramos = dividir_por_hora(segmentos)
+    informar_progreso(0.8, "Calculando la utilización")
+    n_cargadores = len(cargadores)
+
+    # Horas disponibles del periodo analizado, por (día, hora) y por cargador
+    primera_hora = int(tramos['hora_abs'].min())
+    ultima_hora = int(tramos['hora_abs'].max())
+    horas = np.arange(primera_hora, ultima_hora + 1)
+    periodo_horas = len(horas)
+    tramos['hora'] = tramos['hora_abs'] % 24
+    tramos['dia'] = (tramos['hora_abs'] // 24 + DESPLAZAMIENTO_EPOCA) % 7
+    disponibles = np.bincount(((horas // 24 + DESPLAZAMIENTO_EPOCA) % 7) * 24 + horas % 24, minlength=7 * 24)
+
+    por_hora_dia = tramos.groupby(['dia', 'hora']).agg(
+        ocupado=('duracion', 'sum'), pico=('concurrencia', 'max')).reset_index()
+    horas_disponibles = disponibles[por_hora_dia['dia'] * 24 + por_hora_dia['hora']] * n_cargadores
+    por_hora_dia['utilizacion_pct'] = por_hora_dia['ocupado'] / (horas_disponibles * HORA_NS) * 100
+    por_hora_dia['dia_semana'] = np.array(DIAS_SEMANA)[por_hora_dia['dia']]
+
+    por_cargador = segmentos.assign(duracion=segmentos['fin'] - segmentos['inicio']).groupby('cargador').agg(
+        ocupado=('duracion', 'sum'), pico=('concurrencia', 'max')).reset_index()
+    por_cargador['sesiones'] = np.bincount(codigos, minlength=n_cargadores)[por_cargador['cargador']]
+    por_cargador['evse_uid'] = cargadores.get_level_values(0)[por_cargador['cargador']]
+    por_cargador['connector_id'] = cargadores.get_level_values(1)[por_cargador['cargador']]
+    por_cargador['horas_ocupado'] = por_cargador['ocupado'] / HORA_NS
+    por_cargador['utilizacion_pct'] = por_cargador['horas_ocupado'] / periodo_horas * 100
+
+    return {
+        'por_hora_dia': por_hora_dia,
+        'por_cargador': por_cargador.sort_values('utilizacion_pct', ascending=False, kind='stable'),
+        'n_cargadores': n_cargadores,
+        'periodo_horas': periodo_horas,
+        'utilizacion_pct': tramos['duracion'].sum() / (periodo_horas * n_cargadores * HORA_NS) * 100,
+        'pico': int(segmentos['concurrencia'].max()),
+    }
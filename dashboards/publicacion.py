@@ -0,0 +1,176 @@
+import argparse
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from registro_datos import Dataset
+
+# Publicación de datasets para el modo con varios workers (gunicorn).
+# Cada versión se escribe una sola vez en <directorio>/<versión>/ con un .npy por columna,
+# y los workers la abren con np.load(mmap_mode='r'): todas las copias comparten las mismas
+# páginas del sistema operativo en lugar de volver a leer y parsear el CSV cada una.
+# El archivo ACTUAL indica la versión vigente y se reemplaza de forma atómica (os.replace).
+
+ARCHIVO_ACTUAL = 'ACTUAL'
+ARCHIVO_HISTORIAL = 'HISTORIAL'
+ARCHIVO_METADATOS = 'metadatos.pkl'
+# Versiones que se conservan en disco (además de la vigente)
+MAX_VERSIONES = 8
+
+
+# Escribe el dataset como versión publicada. Las columnas categóricas guardan sus códigos y
+# las de texto se codifican igual (se comparten como categorías); el cubo, las series diarias,
+# la cuarentena y el delta del último lote van en los metadatos.
+# La versión se arma en un directorio temporal y se renombra al terminar, así nunca se ve a medias.
+# Si otro worker publicó la misma versión mientras tanto (por ejemplo, al arrancar todos a la
+# vez), el renombre falla, se descarta la copia temporal y se usa la ya publicada.
+def publicar_dataset(dataset, directorio, actual=True):
+    os.makedirs(directorio, exist_ok=True)
+    version = dataset.version or uuid.uuid4().hex[:12]
+    destino = os.path.join(directorio, version)
+    if not os.path.isdir(destino):
+        temporal = tempfile.mkdtemp(prefix=f'.{version}-', dir=directorio)
+        try:
+            _escribir_version(dataset, temporal)
+            os.rename(temporal, destino)
+        except BaseException:
+            shutil.rmtree(temporal, ignore_errors=True)
+            if not os.path.isdir(destino):
+                raise
+    if actual:
+        escribir_puntero(directorio, version)
+    purgar_versiones(directorio)
+    return version
+
+
+# Escribe las columnas (.npy) y los metadatos de una versión en `temporal`
+def _escribir_version(dataset, temporal):
+    columnas = []
+    for i, col in enumerate(dataset.df.columns):
+        serie = dataset.df[col]
+        categorias, ordenada = None, False
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            valores = serie.cat.codes.to_numpy()
+            categorias, ordenada = serie.cat.categories, serie.cat.ordered
+        elif serie.dtype == object:
+            valores, categorias = pd.factorize(serie)
+        else:
+            valores = serie.to_numpy()
+        archivo = f'{i:03d}.npy'
+        np.save(os.path.join(temporal, archivo), np.ascontiguousarray(valores))
+        columnas.append({'nombre': col, 'archivo': archivo, 'categorias': categorias, 'ordenada': ordenada})
+    with open(os.path.join(temporal, ARCHIVO_METADATOS), 'wb') as f:
+        pickle.dump({'columnas': columnas, 'cubo': dataset.cubo, 'series': dataset.series,
+                     'cuarentena': dataset.cuarentena, 'delta': dataset.delta, 'filas': len(dataset.df)}, f)
+
+
+# Cambia la versión vigente: se escribe un archivo temporal y se reemplaza ACTUAL en un solo paso.
+# HISTORIAL lista las versiones que fueron vigentes (a diferencia de los archivos subidos).
+def escribir_puntero(directorio, version):
+    descriptor, temporal = tempfile.mkstemp(prefix='.ACTUAL-', dir=directorio)
+    with os.fdopen(descriptor, 'w') as f:
+        f.write(version)
+    os.replace(temporal, os.path.join(directorio, ARCHIVO_ACTUAL))
+    with open(os.path.join(directorio, ARCHIVO_HISTORIAL), 'a') as f:
+        f.write(version + '\n')
+
+
+def leer_puntero(directorio):
+    try:
+        with open(os.path.join(directorio, ARCHIVO_ACTUAL)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def versiones_vigentes(directorio):
+    try:
+        with open(os.path.join(directorio, ARCHIVO_HISTORIAL)) as f:
+            return set(f.read().split())
+    except FileNotFoundError:
+        return set()
+
+
+# Abre una versión publicada sin copiar las columnas (memoria mapeada de solo lectura).
+# Devuelve None si la versión no existe (nunca se publicó o ya fue purgada).
+def cargar_publicado(directorio, version):
+    if not version or not version.isalnum():
+        return None
+    ruta = os.path.join(directorio, version)
+    try:
+        with open(os.path.join(ruta, ARCHIVO_METADATOS), 'rb') as f:
+            metadatos = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    columnas = {}
+    for col in metadatos['columnas']:
+        valores = np.load(os.path.join(ruta, col['archivo']), mmap_mode='r')
+        if col['categorias'] is not None:
+            valores = pd.Categorical.from_codes(valores, categories=col['categorias'], ordered=col['ordenada'])
+        columnas[col['nombre']] = valores
+    dataset = Dataset(pd.DataFrame(columnas, copy=False), metadatos['cubo'], metadatos.get('series'),
+                      metadatos.get('cuarentena'))
+    dataset.delta = metadatos.get('delta')
+    dataset.version = version
+    return dataset
+
+
+# Borra las versiones más antiguas, salvo la vigente. Los workers que aún las tengan
+# mapeadas siguen leyéndolas: el sistema libera los archivos cuando se dejan de usar.
+def purgar_versiones(directorio, max_versiones=MAX_VERSIONES):
+    actual = leer_puntero(directorio)
+    versiones = [entrada for entrada in os.scandir(directorio)
+                 if entrada.is_dir() and not entrada.name.startswith('.') and entrada.name != actual]
+    versiones.sort(key=lambda entrada: entrada.stat().st_mtime, reverse=True)
+    for entrada in versiones[max_versiones:]:
+        shutil.rmtree(entrada.path, ignore_errors=True)
+
+
+# Versión vigente vista desde un worker. El puntero se consulta como máximo cada `intervalo`
+# segundos; cuando cambia se mapea la nueva versión y las siguientes consultas la devuelven.
+class DatasetCompartido:
+    def __init__(self, directorio, intervalo=2.0):
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self.version = None
+        self.dataset = None
+        # Versiones que fueron vigentes en este worker
+        self.historial = set()
+        self._revisado = None
+        self._lock = threading.Lock()
+
+    def actual(self, forzar=False):
+        with self._lock:
+            ahora = time.monotonic()
+            if forzar or self._revisado is None or ahora - self._revisado >= self.intervalo:
+                self._revisado = ahora
+                version = leer_puntero(self.directorio)
+                if version is not None and version != self.version:
+                    dataset = cargar_publicado(self.directorio, version)
+                    if dataset is not None:
+                        self.dataset, self.version = dataset, version
+                        self.historial.add(version)
+            return self.dataset
+
+
+if __name__ == '__main__':
+    from carga_datos import compactar_datos, leer_archivo, preparar_datos
+    from cubo_agregados import construir_cubo
+
+    parser = argparse.ArgumentParser(description="Publica un dataset para el modo con varios workers.")
+    parser.add_argument('origen', nargs='?', default='../datos/df_oasis_clean.csv')
+    parser.add_argument('directorio', nargs='?', default='../datos/publicado')
+    parser.add_argument('--sin-compactar', action='store_true', help="no reducir los tipos de las columnas")
+    args = parser.parse_args()
+    df = preparar_datos(leer_archivo(args.origen))
+    if not args.sin_compactar:
+        df = compactar_datos(df)
+    version = publicar_dataset(Dataset(df, construir_cubo(df)), args.directorio)
+    print(f"✓ {len(df):,} registros publicados en {args.directorio} (versión {version})")
@@ -0,0 +1,102 @@
+import threading
+import uuid
+from collections import OrderedDict
+
+from indices import IndiceFiltros, ordenar_por_fecha
+from series_diarias import construir_series
+
+
+# Dataset cargado: el DataFrame tipado (ordenado por fecha de inicio) y las
+# estructuras derivadas (agregados, índices de filtrado y series diarias).
+# `cuarentena` guarda las filas de los archivos subidos que no pasaron la validación y
+# `delta`, si el dataset resulta de agregar un lote, la versión anterior y el cubo del lote.
+class Dataset:
+    def __init__(self, df, cubo=None, series=None, cuarentena=None):
+        self.df = ordenar_por_fecha(df)
+        self.cubo = cubo
+        self.indice = IndiceFiltros(self.df)
+        self.version = None
+        self._series = series
+        self.cuarentena = cuarentena
+        self.delta = None
+
+    # Series diarias por estación; si no se recibieron (por ejemplo, al subir un archivo)
+    # se construyen al primer uso
+    @property
+    def series(self):
+        if self._series is None:
+            self._series = construir_series(self.df)
+        return self._series
+
+    def memoria(self):
+        tamaño = int(self.df.memory_usage(deep=True).sum()) + self.indice.memoria()
+        if self.cubo is not None:
+            tamaño += self.cubo.memoria()
+        if self._series is not None:
+            tamaño += self._series.memoria()
+        if self.cuarentena is not None:
+            tamaño += int(self.cuarentena.memory_usage(deep=True).sum())
+        return tamaño
+
+
+# Registro de datasets en memoria del servidor.
+# El navegador solo guarda la versión (un token) en 'stored-data' y los callbacks
+# recuperan aquí el Dataset ya tipado, sin volver a serializarlo ni parsear fechas.
+class RegistroDatos:
+    def __init__(self, max_datasets=4, max_memoria_mb=1024):
+        self.max_datasets = max_datasets
+        self.max_memoria = max_memoria_mb * 1024 * 1024
+        self._datos = OrderedDict()
+        self._fijos = set()
+        self._memoria = 0
+        self._lock = threading.Lock()
+
+    # Registra el dataset y devuelve su versión. Sin `version` se genera un token nuevo;
+    # los datasets publicados en disco conservan la suya para que todos los workers la reconozcan.
+    def registrar(self, dataset, fijo=False, version=None):
+        version = version or uuid.uuid4().hex[:12]
+        dataset.version = version
+        tamaño = dataset.memoria()
+        with self._lock:
+            if version in self._datos:
+                self._memoria -= self._datos[version][1]
+            self._datos[version] = (dataset, tamaño)
+            self._memoria += tamaño
+            if fijo:
+                self._fijos.add(version)
+            self._desalojar(version)
+        return version
+
+    def obtener(self, version):
+        if version is None:
+            return None
+        with self._lock:
+            entrada = self._datos.get(version)
+            if entrada is None:
+                return None
+            self._datos.move_to_end(version)
+            return entrada[0]
+
+    # Deja de fijar un dataset (por ejemplo, la versión publicada anterior) para que pueda desalojarse
+    def liberar(self, version):
+        with self._lock:
+            self._fijos.discard(version)
+            self._desalojar(None)
+
+    def __contains__(self, version):
+        with self._lock:
+            return version in self._datos
+
+    def memoria_usada(self):
+        return self._memoria
+
+    # Elimina los datasets menos usados recientemente hasta respetar los límites.
+    # Nunca se desaloja el dataset recién registrado ni los fijos (datos iniciales).
+    def _desalojar(self, version_actual):
+        for version in list(self._datos):
+            if len(self._datos) <= self.max_datasets and self._memoria <= self.max_memoria:
+                break
+            if version == version_actual or version in self._fijos:
+                continue
+            _, tamaño = self._datos.pop(version)
+            self._memoria -= tamaño
@@ -0,0 +1,56 @@
+import numpy as np
+
+# Máximo de sesiones atípicas que se envían al navegador en el diagrama de caja
+MAX_ATIPICOS = 500
+
+
+# Conteos por intervalo calculados en el servidor: el navegador recibe solo `bins` barras
+def histograma(valores, bins=30):
+    valores = np.asarray(valores, dtype='float64')
+    valores = valores[~np.isnan(valores)]
+    conteos, bordes = np.histogram(valores, bins=bins)
+    return {
+        'centros': (bordes[:-1] + bordes[1:]) / 2,
+        'anchos': np.diff(bordes),
+        'conteos': conteos,
+    }
+
+
+# Estadísticas descriptivas de una columna numérica (ignora valores faltantes)
+def estadisticas(valores):
+    valores = np.asarray(valores, dtype='float64')
+    valores = valores[~np.isnan(valores)]
+    if len(valores) == 0:
+        return {'promedio': np.nan, 'mediana': np.nan, 'minimo': np.nan, 'maximo': np.nan, 'n': 0}
+    return {
+        'promedio': valores.mean(),
+        'mediana': np.median(valores),
+        'minimo': valores.min(),
+        'maximo': valores.max(),
+        'n': len(valores),
+    }
+
+
+# Cuartiles, bigotes (1.5 × rango intercuartílico) y una muestra acotada de atípicos
+# para dibujar un diagrama de caja sin enviar todas las filas
+def resumen_caja(valores, max_atipicos=MAX_ATIPICOS):
+    valores = np.asarray(valores, dtype='float64')
+    valores = np.sort(valores[~np.isnan(valores)])
+    if len(valores) == 0:
+        return None
+    q1, mediana, q3 = np.quantile(valores, [0.25, 0.5, 0.75])
+    rango = q3 - q1
+    dentro = valores[(valores >= q1 - 1.5 * rango) & (valores <= q3 + 1.5 * rango)]
+    atipicos = valores[(valores < q1 - 1.5 * rango) | (valores > q3 + 1.5 * rango)]
+    if len(atipicos) > max_atipicos:
+        # Muestra equiespaciada sobre los atípicos ordenados (conserva los extremos)
+        atipicos = atipicos[np.linspace(0, len(atipicos) - 1, max_atipicos).round().astype(int)]
+    return {
+        'q1': q1,
+        'mediana': mediana,
+        'q3': q3,
+        'bigote_inferior': dentro.min(),
+        'bigote_superior': dentro.max(),
+        'promedio': valores.mean(),
+        'atipicos': atipicos,
+    }
@@ -0,0 +1,262 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Series diarias por estación (transacciones, energía e ingresos) con sumas móviles de 7 y 28
+# días, y un pronóstico de demanda que ajusta todas las estaciones a la vez.
+# Las series se guardan como matrices estación × día. Al agregar un lote solo se recorren sus
+# filas y las sumas móviles se actualizan desde el primer día afectado: para días nuevos al
+# final el costo es constante por día, sin volver a recorrer el historial.
+
+METRICAS = ('transacciones', 'energia', 'ingresos')
+VENTANAS = (7, 28)
+# Días de historia usados para ajustar el pronóstico y días que se reservan para validarlo
+DIAS_AJUSTE = 112
+DIAS_VALIDACION = 14
+HORIZONTE = 28
+
+
+# Matrices compartidas por las versiones sucesivas de unas series. Una versión nueva escribe
+# en el mismo bloque si solo agrega días después de los ya ocupados; las anteriores siguen
+# viendo sus primeras columnas sin cambios.
+class _Bloque:
+    def __init__(self, n_estaciones, capacidad):
+        self.valores = {m: np.zeros((n_estaciones, capacidad)) for m in METRICAS}
+        self.sumas = {(m, v): np.zeros((n_estaciones, capacidad)) for m in METRICAS for v in VENTANAS}
+        self.ocupado = 0
+        self.lock = threading.Lock()
+
+    @property
+    def capacidad(self):
+        return self.valores[METRICAS[0]].shape[1]
+
+
+# Día (desde `inicio`), estación y valores de cada transacción del lote
+def _dias_lote(df):
+    fechas = df['start_date_time']
+    validas = fechas.notna().to_numpy()
+    df = df[validas]
+    dias = df['start_date_time'].dt.normalize()
+    valores = {
+        'transacciones': np.ones(len(df)),
+        'energia': df['energy_kwh'].astype('float64').fillna(0).to_numpy(),
+        'ingresos': df['amount_transaction'].astype('float64').fillna(0).to_numpy(),
+    }
+    return dias, df['evse_uid'].astype(str).to_numpy(), valores
+
+
+class SeriesDiarias:
+    def __init__(self, estaciones, inicio, n_dias, bloque):
+        self.estaciones = estaciones
+        self.inicio = inicio
+        self.n_dias = n_dias
+        self._bloque = bloque
+        self._pronostico = None
+        self._lock = threading.Lock()
+
+    # Al serializar (publicación) se guardan solo los días ocupados, sin los candados
+    def __getstate__(self):
+        return {
+            'estaciones': self.estaciones, 'inicio': self.inicio, 'n_dias': self.n_dias,
+            'valores': {m: self.valores(m) for m in METRICAS},
+            'sumas': {clave: self.suma_movil(*clave) for clave in self._bloque.sumas},
+        }
+
+    def __setstate__(self, estado):
+        bloque = _Bloque(len(estado['estaciones']), 0)
+        bloque.valores, bloque.sumas = estado['valores'], estado['sumas']
+        bloque.ocupado = estado['n_dias']
+        self.__init__(estado['estaciones'], estado['inicio'], estado['n_dias'], bloque)
+
+    @property
+    def fechas(self):
+        return pd.date_range(self.inicio, periods=self.n_dias, freq='D')
+
+    def valores(self, metrica):
+        return self._bloque.valores[metrica][:, :self.n_dias]
+
+    # Suma móvil de `ventana` días terminada en cada día (los primeros días suman lo disponible)
+    def suma_movil(self, metrica, ventana):
+        return self._bloque.sumas[(metrica, ventana)][:, :self.n_dias]
+
+    def promedio_movil(self, metrica, ventana):
+        return self.suma_movil(metrica, ventana) / ventana
+
+    def memoria(self):
+        return sum(m.nbytes for m in self._bloque.valores.values()) + \
+            sum(m.nbytes for m in self._bloque.sumas.values())
+
+    # Posiciones de las estaciones pedidas (None: todas)
+    def filas(self, estaciones=None):
+        if estaciones is None:
+            return np.arange(len(self.estaciones))
+        posiciones = self.estaciones.get_indexer(estaciones)
+        return posiciones[posiciones >= 0]
+
+    # Nueva versión de las series con las transacciones del lote sumadas
+    def agregar(self, lote):
+        dias, estaciones_lote, valores = _dias_lote(lote)
+        if len(dias) == 0:
+            return self
+        estaciones = self.estaciones.append(pd.Index(pd.unique(estaciones_lote)).difference(self.estaciones))
+        inicio = min(self.inicio, dias.min())
+        desplazamiento = (self.inicio - inicio).days
+        n_dias = max(desplazamiento + self.n_dias, (dias.max() - inicio).days + 1)
+        posiciones_dia = (dias - inicio).dt.days.to_numpy()
+        primer_dia = int(posiciones_dia.min())
+
+        bloque = self._bloque
+        with bloque.lock:
+            en_lugar = (desplazamiento == 0 and len(estaciones) == len(self.estaciones)
+                        and bloque.ocupado == self.n_dias and primer_dia >= self.n_dias
+                        and n_dias <= bloque.capacidad)
+            if en_lugar:
+                bloque.ocupado = n_dias
+        if not en_lugar:
+            # Copia con el doble de capacidad: los agregados siguientes al final no copian de nuevo
+            nuevo = _Bloque(len(estaciones), max(2 * n_dias, 64))
+            filas = slice(0, len(self.estaciones))
+            columnas = slice(desplazamiento, desplazamiento + self.n_dias)
+            for metrica in METRICAS:
+                nuevo.valores[metrica][filas, columnas] = self.valores(metrica)
+            nuevo.ocupado = n_dias
+            bloque = nuevo
+            # Sin días nuevos al principio, las sumas móviles anteriores al lote siguen valiendo
+            if desplazamiento == 0:
+                for clave in nuevo.sumas:
+                    nuevo.sumas[clave][filas, :self.n_dias] = self.suma_movil(*clave)
+            else:
+                primer_dia = 0
+
+        plano = estaciones.get_indexer(estaciones_lote) * n_dias + posiciones_dia
+        for metrica in METRICAS:
+            suma = np.bincount(plano, weights=valores[metrica], minlength=len(estaciones) * n_dias)
+            bloque.valores[metrica][:, :n_dias] += suma.reshape(len(estaciones), n_dias)
+        _actualizar_sumas(bloque, primer_dia, n_dias)
+        return SeriesDiarias(estaciones, inicio, n_dias, bloque)
+
+    # Pronóstico de todas las estaciones (se calcula una vez por versión de las series)
+    def pronostico(self, metrica='transacciones'):
+        with self._lock:
+            if self._pronostico is None:
+                self._pronostico = pronosticar(self, metrica)
+            return self._pronostico
+
+
+# Recalcula las sumas móviles de los días [desde, hasta) a partir de la del día anterior:
+# suma[d] = suma[d-1] + valor[d] - valor[d-ventana], para todas las estaciones a la vez
+def _actualizar_sumas(bloque, desde, hasta):
+    if desde >= hasta:
+        return
+    for metrica in METRICAS:
+        valores = bloque.valores[metrica]
+        for ventana in VENTANAS:
+            sumas = bloque.sumas[(metrica, ventana)]
+            salientes = np.zeros((valores.shape[0], hasta - desde))
+            primero = max(desde, ventana)
+            if primero < hasta:
+                salientes[:, primero - desde:] = valores[:, primero - ventana:hasta - ventana]
+            anterior = sumas[:, desde - 1] if desde > 0 else 0.0
+            sumas[:, desde:hasta] = (anterior if np.isscalar(anterior) else anterior[:, None]) + \
+                np.cumsum(valores[:, desde:hasta] - salientes, axis=1)
+
+
+def construir_series(df):
+    vacias = SeriesDiarias(pd.Index([], dtype=object), pd.Timestamp(df['start_date_time'].min()).normalize(),
+                           0, _Bloque(0, 0))
+    if pd.isna(vacias.inicio):
+        return vacias
+    return vacias.agregar(df)
+
+
+# Diseño del modelo: nivel, tendencia y un efecto por día de la semana
+def _diseño(fechas, origen, escala):
+    t = (fechas - origen).days.to_numpy() / escala
+    dia = fechas.dayofweek.to_numpy()
+    columnas = [np.ones(len(fechas)), t] + [(dia == d).astype(float) for d in range(1, 7)]
+    return np.column_stack(columnas)
+
+
+# Ajusta por mínimos cuadrados todas las series con la misma matriz de diseño: una sola
+# resolución (np.linalg.lstsq con una columna por estación) en lugar de un modelo por estación
+def _ajustar(y, fechas):
+    origen = fechas[0]
+    escala = max(len(fechas), 1)
+    x = _diseño(fechas, origen, escala)
+    coeficientes = np.linalg.lstsq(x, y.T, rcond=None)[0]
+    residuos = y - (x @ coeficientes).T
+    libertad = max(len(fechas) - x.shape[1], 1)
+    sigma = np.sqrt((residuos ** 2).sum(axis=1) / libertad)
+    return coeficientes, sigma, origen, escala
+
+
+def _predecir(coeficientes, fechas, origen, escala):
+    return np.clip((_diseño(fechas, origen, escala) @ coeficientes).T, 0, None)
+
+
+# Pronóstico de los próximos `horizonte` días para todas las estaciones. Se valida antes con
+# los últimos DIAS_VALIDACION días (ajustando sin ellos) para informar el error esperado.
+def pronosticar(series, metrica='transacciones', horizonte=HORIZONTE, dias_ajuste=DIAS_AJUSTE):
+    valores = series.valores(metrica)
+    fechas = series.fechas
+    historia = min(dias_ajuste, series.n_dias)
+    y = valores[:, series.n_dias - historia:]
+    fechas_ajuste = fechas[series.n_dias - historia:]
+
+    real_validacion = prediccion_validacion = None
+    if historia > 2 * DIAS_VALIDACION:
+        coeficientes, _, origen, escala = _ajustar(y[:, :-DIAS_VALIDACION], fechas_ajuste[:-DIAS_VALIDACION])
+        prediccion_validacion = _predecir(coeficientes, fechas_ajuste[-DIAS_VALIDACION:], origen, escala)
+        real_validacion = y[:, -DIAS_VALIDACION:]
+
+    coeficientes, sigma, origen, escala = _ajustar(y, fechas_ajuste)
+    fechas_futuras = pd.date_range(fechas[-1] + pd.Timedelta(days=1), periods=horizonte, freq='D')
+    return {
+        'metrica': metrica,
+        'fechas': fechas_futuras,
+        'pronostico': _predecir(coeficientes, fechas_futuras, origen, escala),
+        'sigma': sigma,
+        'real_validacion': real_validacion,
+        'prediccion_validacion': prediccion_validacion,
+    }
+
+
+# Resumen para un grupo de estaciones: historia diaria sumada, promedios móviles, pronóstico
+# agregado (suma de los de cada estación, con varianzas sumadas) y variación por estación
+def resumen_pronostico(series, estaciones=None, dias_historia=120):
+    filas = series.filas(estaciones)
+    pronostico = series.pronostico()
+    metrica = pronostico['metrica']
+    desde = max(series.n_dias - dias_historia, 0)
+    ultimo = series.n_dias - 1
+    suma_28 = series.suma_movil(metrica, 28)[filas]
+    pronostico_filas = pronostico['pronostico'][filas]
+
+    error = None
+    if pronostico['real_validacion'] is not None:
+        real = pronostico['real_validacion'][filas].sum(axis=0)
+        prediccion = pronostico['prediccion_validacion'][filas].sum(axis=0)
+        error = np.abs(real - prediccion).sum() / real.sum() * 100 if real.sum() else None
+
+    variacion = pd.DataFrame({
+        'estacion': series.estaciones[filas],
+        'ultimos_28': suma_28[:, ultimo] if series.n_dias else 0,
+        'proximos_28': pronostico_filas[:, :28].sum(axis=1),
+    })
+    return {
+        'fechas': series.fechas[desde:],
+        'diario': series.valores(metrica)[filas, desde:].sum(axis=0),
+        'promedio_7': series.promedio_movil(metrica, 7)[filas, desde:].sum(axis=0),
+        'promedio_28': series.promedio_movil(metrica, 28)[filas, desde:].sum(axis=0),
+        'ultimos_7': {m: series.suma_movil(m, 7)[filas, ultimo].sum() for m in METRICAS},
+        # La semana anterior solo se compara si está completa (al menos 14 días de datos)
+        'anteriores_7': {m: series.suma_movil(m, 7)[filas, ultimo - 7].sum() if ultimo >= 13 else np.nan
+                         for m in METRICAS},
+        'ultimos_28': {m: series.suma_movil(m, 28)[filas, ultimo].sum() for m in METRICAS},
+        'fechas_pronostico': pronostico['fechas'],
+        'pronostico': pronostico_filas.sum(axis=0),
+        'desviacion': np.sqrt((pronostico['sigma'][filas] ** 2).sum()),
+        'error_validacion': error,
+        'variacion_estaciones': variacion,
+    }
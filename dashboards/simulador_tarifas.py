@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+from trabajos import informar_progreso
+
+# Elasticidad precio de la demanda de energía: un precio 10% mayor reduce la energía ~3%
+ELASTICIDAD = -0.3
+# Resolución (kWh) con que se agrupan las sesiones para aplicar los tramos tarifarios
+RESOLUCION_KWH = 0.5
+# Máximo de celdas (escenarios × grupos) por lote para acotar la memoria, y mínimo de lotes
+# para poder informar el avance (y atender una cancelación) durante la simulación
+MAX_CELDAS_LOTE = 2_000_000
+MIN_LOTES = 8
+
+
+# Comprime las transacciones en grupos (estación, día, hora, energía por sesión redondeada)
+# con sus totales de sesiones, energía e ingresos. Los escenarios se evalúan sobre los
+# grupos, cuyo número queda acotado aunque crezca la cantidad de transacciones.
+def preparar_base(df):
+    dias = df['start_date_time'].dt.dayofweek.to_numpy()
+    energia = df['energy_kwh'].to_numpy(dtype='float64')
+    codigos_estacion, estaciones = pd.factorize(df['evse_uid'].astype(str), sort=True)
+    base = pd.DataFrame({
+        'estacion': codigos_estacion,
+        'dia': dias,
+        'hora': df['hora'].to_numpy(),
+        'tramo_kwh': np.round(energia / RESOLUCION_KWH).astype('int64'),
+        'energia': energia,
+        'ingresos': df['amount_transaction'].to_numpy(dtype='float64'),
+    })
+    grupos = base.groupby(['estacion', 'dia', 'hora', 'tramo_kwh']).agg(
+        sesiones=('energia', 'size'), energia=('energia', 'sum'), ingresos=('ingresos', 'sum')).reset_index()
+    grupos['energia_sesion'] = grupos['energia'] / grupos['sesiones']
+    return grupos, list(estaciones)
+
+
+# Conjunto de escenarios como matrices (S = número de escenarios):
+#   factor_hora (S, 24), factor_dia (S, 7), factor_estacion (S, E): multiplicadores del precio
+#   actual por kWh según la hora, el día de la semana (lunes = 0) y la estación;
+#   umbrales (S, K): límites de los tramos de kWh por sesión (ordenados, np.inf si sobra);
+#   factor_tramo (S, K + 1): multiplicador del precio de la energía dentro de cada tramo.
+def escenarios_neutros(n, n_estaciones, n_tramos=0):
+    return {
+        'factor_hora': np.ones((n, 24)),
+        'factor_dia': np.ones((n, 7)),
+        'factor_estacion': np.ones((n, n_estaciones)),
+        'umbrales': np.full((n, n_tramos), np.inf),
+        'factor_tramo': np.ones((n, n_tramos + 1)),
+    }
+
+
+# Multiplicador medio por tramos para cada grupo: cada tramo de la sesión se cobra con su
+# propio factor (como una tarifa escalonada progresiva)
+def _factor_tramos(umbrales, factor_tramo, energia_sesion):
+    limites = np.concatenate([np.zeros((len(umbrales), 1)), umbrales, np.full((len(umbrales), 1), np.inf)], axis=1)
+    energia = energia_sesion[np.newaxis, :]
+    ponderado = np.zeros((len(umbrales), len(energia_sesion)))
+    for k in range(factor_tramo.shape[1]):
+        en_tramo = np.clip(energia - limites[:, k:k + 1], 0, limites[:, k + 1:k + 2] - limites[:, k:k + 1])
+        ponderado += factor_tramo[:, k:k + 1] * en_tramo
+    return np.divide(ponderado, energia, out=np.ones_like(ponderado), where=energia > 0)
+
+
+# Evalúa todos los escenarios en lotes de matrices (escenarios × grupos).
+# Con un factor de precio f la energía cambia a energía · f^ε y los ingresos a ingresos · f^(1+ε).
+def simular(grupos, escenarios, elasticidad=ELASTICIDAD):
+    estacion = grupos['estacion'].to_numpy()
+    dia = grupos['dia'].to_numpy()
+    hora = grupos['hora'].to_numpy()
+    energia = grupos['energia'].to_numpy()
+    ingresos = grupos['ingresos'].to_numpy()
+    energia_sesion = grupos['energia_sesion'].to_numpy()
+    horas = np.zeros((len(grupos), 24))
+    horas[np.arange(len(grupos)), hora] = 1
+
+    n = len(escenarios['factor_hora'])
+    tamaño_lote = max(1, min(MAX_CELDAS_LOTE // max(len(grupos), 1), -(-n // MIN_LOTES)))
+    ingresos_esc = np.empty(n)
+    energia_esc = np.empty(n)
+    energia_hora = np.empty((n, 24))
+    for inicio in range(0, n, tamaño_lote):
+        informar_progreso(inicio / n, f"Escenarios simulados: {inicio:,} de {n:,}")
+        lote = slice(inicio, inicio + tamaño_lote)
+        factor = (escenarios['factor_hora'][lote][:, hora]
+                  * escenarios['factor_dia'][lote][:, dia]
+                  * escenarios['factor_estacion'][lote][:, estacion]
+                  * _factor_tramos(escenarios['umbrales'][lote], escenarios['factor_tramo'][lote], energia_sesion))
+        respuesta = factor ** elasticidad
+        energia_lote = energia * respuesta
+        ingresos_esc[lote] = (ingresos * factor * respuesta).sum(axis=1)
+        energia_esc[lote] = energia_lote.sum(axis=1)
+        energia_hora[lote] = energia_lote @ horas
+
+    return {
+        'ingresos': ingresos_esc,
+        'energia': energia_esc,
+        'energia_hora': energia_hora,
+        'ingresos_base': ingresos.sum(),
+        'energia_base': energia.sum(),
+        'energia_hora_base': energia @ horas,
+    }
+
+
+# Rejilla de escenarios para las recomendaciones del dashboard: descuento en horas valle,
+# recargo en horas pico y descuentos por tramos de kWh (básico / estándar / premium)
+def generar_escenarios(horas_valle, horas_pico, energia_med, energia_prom, n_estaciones):
+    descuento_valle, recargo_pico, descuento_estandar, descuento_premium = [
+        opciones.ravel() for opciones in np.meshgrid(
+            np.linspace(0, 0.5, 11), np.linspace(0, 0.3, 7), np.linspace(0, 0.15, 4), np.linspace(0, 0.3, 7),
+            indexing='ij')]
+    n = len(descuento_valle)
+    escenarios = escenarios_neutros(n, n_estaciones, n_tramos=2)
+    escenarios['factor_hora'][:, horas_valle] = (1 - descuento_valle)[:, np.newaxis]
+    escenarios['factor_hora'][:, horas_pico] = (1 + recargo_pico)[:, np.newaxis]
+    escenarios['umbrales'][:] = sorted([energia_med, energia_prom])
+    escenarios['factor_tramo'][:, 1] = 1 - descuento_estandar
+    escenarios['factor_tramo'][:, 2] = 1 - descuento_premium
+    parametros = pd.DataFrame({
+        'descuento_valle': descuento_valle,
+        'recargo_pico': recargo_pico,
+        'descuento_estandar': descuento_estandar,
+        'descuento_premium': descuento_premium,
+    })
+    return escenarios, parametros
+
+
+# Simulación completa para una vista de datos: arma la rejilla con las horas de menor y mayor
+# demanda y la mediana/promedio de energía, y resume el resultado de cada escenario
+def simular_recomendaciones(df, n_horas=6):
+    grupos, estaciones = preparar_base(df)
+    sesiones_hora = np.bincount(grupos['hora'], weights=grupos['sesiones'], minlength=24)
+    orden = np.argsort(sesiones_hora, kind='stable')
+    horas_valle, horas_pico = np.sort(orden[:n_horas]), np.sort(orden[-n_horas:])
+    energia = df['energy_kwh'].to_numpy(dtype='float64')
+    escenarios, parametros = generar_escenarios(horas_valle, horas_pico, np.median(energia), energia.mean(),
+                                                len(estaciones))
+    resultado = simular(grupos, escenarios)
+
+    resumen = parametros.copy()
+    resumen['ingresos'] = resultado['ingresos']
+    resumen['variacion_ingresos_pct'] = (resultado['ingresos'] / resultado['ingresos_base'] - 1) * 100
+    resumen['energia'] = resultado['energia']
+    resumen['participacion_valle_pct'] = resultado['energia_hora'][:, horas_valle].sum(axis=1) / resultado['energia'] * 100
+    return {
+        'resumen': resumen,
+        'energia_hora': resultado['energia_hora'],
+        'energia_hora_base': resultado['energia_hora_base'],
+        'ingresos_base': resultado['ingresos_base'],
+        'participacion_valle_base_pct': resultado['energia_hora_base'][horas_valle].sum() / resultado['energia_base'] * 100,
+        'horas_valle': horas_valle,
+        'horas_pico': horas_pico,
+        'n_grupos': len(grupos),
+    }
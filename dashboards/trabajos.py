@@ -0,0 +1,254 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+PENDIENTE = 'pendiente'
+EJECUTANDO = 'ejecutando'
+TERMINADO = 'terminado'
+CANCELADO = 'cancelado'
+ERROR = 'error'
+# Trabajo de otro proceso que dejó de latir (el proceso se detuvo antes de terminarlo)
+PERDIDO = 'perdido'
+
+# Segundos entre escrituras del estado de los trabajos activos (latido); un trabajo activo de
+# otro proceso cuyo archivo no se actualizó en VENCIMIENTO_S se da por perdido
+LATIDO_S = 2.0
+VENCIMIENTO_S = 30.0
+# Mínimo de segundos entre escrituras del avance informado por el cálculo
+INTERVALO_AVANCE_S = 0.5
+# Los archivos de los trabajos finalizados se borran pasado este tiempo
+MAX_EDAD_S = 3600
+PATRON_ID = re.compile(r'[0-9a-f]{12}')
+
+# Trabajo que se está ejecutando en cada hilo (para informar_progreso)
+_hilo = threading.local()
+
+
+class TrabajoCancelado(Exception):
+    pass
+
+
+# Trabajo en segundo plano: estado, avance (0-1, o None si no se conoce), mensaje y resultado.
+# `clave` es un texto que identifica el cálculo (por ejemplo, pestaña y filtros) y el resultado
+# debe poder guardarse como JSON (una versión o una clave de caché, no el contenido).
+# La cancelación es cooperativa: el cálculo se detiene en el siguiente punto donde informa su avance.
+class Trabajo:
+    def __init__(self, clave=None, id_trabajo=None):
+        self.id = id_trabajo or uuid.uuid4().hex[:12]
+        self.clave = clave
+        self.estado = PENDIENTE
+        self.progreso = None
+        self.mensaje = ''
+        self.resultado = None
+        self.error = None
+        self.actualizado = time.time()
+        self._cancelar = threading.Event()
+        self._futuro = None
+        self._gestor = None
+        self._escrito = 0.0
+        self._lock_escritura = threading.Lock()
+
+    @property
+    def activo(self):
+        return self.estado in (PENDIENTE, EJECUTANDO)
+
+    def cancelar(self):
+        self._cancelar.set()
+        if self._futuro is not None and self._futuro.cancel():
+            self.estado = CANCELADO
+            self._guardar()
+
+    def avanzar(self, progreso=None, mensaje=None):
+        if self._cancelar.is_set():
+            raise TrabajoCancelado(self.id)
+        if progreso is not None:
+            self.progreso = min(max(progreso, 0.0), 1.0)
+        if mensaje is not None:
+            self.mensaje = mensaje
+        if time.monotonic() - self._escrito >= INTERVALO_AVANCE_S:
+            self._guardar()
+
+    def _guardar(self):
+        if self._gestor is not None:
+            self._escrito = time.monotonic()
+            self._gestor._guardar(self)
+
+    def a_estado(self):
+        return {'id': self.id, 'clave': self.clave, 'estado': self.estado, 'progreso': self.progreso,
+                'mensaje': self.mensaje, 'resultado': self.resultado, 'error': self.error,
+                'actualizado': time.time()}
+
+    # Copia de solo lectura de un trabajo a partir del estado guardado por otro proceso
+    @classmethod
+    def desde_estado(cls, estado):
+        trabajo = cls(estado.get('clave'), estado['id'])
+        for campo in ('estado', 'progreso', 'mensaje', 'resultado', 'error', 'actualizado'):
+            setattr(trabajo, campo, estado.get(campo))
+        return trabajo
+
+
+# Informa el avance del trabajo que corre en este hilo y lanza TrabajoCancelado si fue cancelado.
+# Fuera de un trabajo no hace nada, así los módulos de cálculo pueden llamarla siempre.
+def informar_progreso(progreso=None, mensaje=None):
+    trabajo = getattr(_hilo, 'trabajo', None)
+    if trabajo is not None:
+        trabajo.avanzar(progreso, mensaje)
+
+
+# Ejecuta los cálculos pesados (carga de archivos, ocupación, simulaciones) en un grupo de
+# hilos del mismo proceso, que comparten el registro de datasets y las cachés en memoria.
+# Los callbacks consultan el estado por id con un dcc.Interval y el servidor sigue atendiendo
+# al resto de usuarios mientras tanto.
+# Con `directorio`, el estado de cada trabajo se guarda además en <directorio>/<id>.json, así
+# cualquier proceso que comparta la carpeta (por ejemplo, los workers de gunicorn) responde la
+# consulta de avance. Cancelar un trabajo de otro proceso deja <id>.cancelar, que su dueño
+# revisa en cada latido.
+class GestorTrabajos:
+    def __init__(self, max_hilos=2, max_trabajos=64, directorio=None):
+        self.max_trabajos = max_trabajos
+        self.directorio = directorio
+        self._ejecutor = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix='trabajo')
+        self._trabajos = OrderedDict()
+        self._lock = threading.Lock()
+        if directorio is not None:
+            os.makedirs(directorio, exist_ok=True)
+            threading.Thread(target=self._latir, name='trabajos-latido', daemon=True).start()
+
+    def enviar(self, funcion, clave=None, mensaje=''):
+        trabajo = Trabajo(clave)
+        trabajo.mensaje = mensaje
+        if self.directorio is not None:
+            trabajo._gestor = self
+        with self._lock:
+            self._trabajos[trabajo.id] = trabajo
+            self._purgar()
+        trabajo._guardar()
+        trabajo._futuro = self._ejecutor.submit(self._ejecutar, trabajo, funcion)
+        return trabajo
+
+    def _ejecutar(self, trabajo, funcion):
+        if trabajo._cancelar.is_set():
+            trabajo.estado = CANCELADO
+            trabajo._guardar()
+            return
+        trabajo.estado = EJECUTANDO
+        trabajo._guardar()
+        _hilo.trabajo = trabajo
+        try:
+            trabajo.resultado = funcion()
+            trabajo.progreso = 1.0
+            trabajo.estado = TERMINADO
+        except TrabajoCancelado:
+            trabajo.estado = CANCELADO
+        except Exception as e:
+            trabajo.error = str(e)
+            trabajo.estado = ERROR
+        finally:
+            _hilo.trabajo = None
+            trabajo._guardar()
+
+    # Trabajo de este proceso o, si no lo es, la copia guardada por otro proceso (None si no
+    # existe). Un trabajo ajeno que dejó de latir se informa como PERDIDO.
+    def obtener(self, id_trabajo):
+        if id_trabajo is None:
+            return None
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+        if trabajo is not None or self.directorio is None or not PATRON_ID.fullmatch(str(id_trabajo)):
+            return trabajo
+        try:
+            with open(self._ruta(id_trabajo)) as f:
+                trabajo = Trabajo.desde_estado(json.load(f))
+        except (FileNotFoundError, ValueError):
+            return None
+        if trabajo.activo and time.time() - trabajo.actualizado > VENCIMIENTO_S:
+            trabajo.estado = PERDIDO
+        return trabajo
+
+    def cancelar(self, id_trabajo):
+        trabajo = self.obtener(id_trabajo)
+        if trabajo is None or not trabajo.activo:
+            return
+        if trabajo._gestor is self or self.directorio is None:
+            trabajo.cancelar()
+        else:
+            try:
+                open(self._ruta(id_trabajo, '.cancelar'), 'w').close()
+            except OSError:
+                pass
+
+    # Olvida los trabajos finalizados más antiguos cuando se supera max_trabajos
+    def _purgar(self):
+        for id_trabajo in list(self._trabajos):
+            if len(self._trabajos) <= self.max_trabajos:
+                break
+            if not self._trabajos[id_trabajo].activo:
+                del self._trabajos[id_trabajo]
+
+    def _ruta(self, id_trabajo, extension='.json'):
+        return os.path.join(self.directorio, id_trabajo + extension)
+
+    # Escribe el estado en un temporal y lo renombra, así nunca se lee a medias. El candado del
+    # trabajo evita que un latido con un estado anterior reemplace al estado final.
+    # Un resultado que no se puede guardar como JSON deja el trabajo en ERROR (en este proceso y
+    # en los demás); si falla la escritura se borra el temporal y el próximo latido lo reintenta.
+    def _guardar(self, trabajo):
+        with trabajo._lock_escritura:
+            try:
+                contenido = json.dumps(trabajo.a_estado())
+            except (TypeError, ValueError) as e:
+                trabajo.resultado = None
+                trabajo.error = f"el resultado no se puede guardar como JSON: {e}"
+                trabajo.estado = ERROR
+                contenido = json.dumps(trabajo.a_estado())
+            temporal = None
+            try:
+                descriptor, temporal = tempfile.mkstemp(prefix='.trabajo-', dir=self.directorio)
+                with os.fdopen(descriptor, 'w') as f:
+                    f.write(contenido)
+                os.replace(temporal, self._ruta(trabajo.id))
+            except OSError:
+                if temporal is not None and os.path.exists(temporal):
+                    try:
+                        os.remove(temporal)
+                    except OSError:
+                        pass
+
+    # Latido: reescribe el estado de los trabajos activos de este proceso, aplica las
+    # cancelaciones pedidas desde otros procesos y borra los archivos viejos
+    def _latir(self):
+        ultima_purga = 0.0
+        while True:
+            time.sleep(LATIDO_S)
+            with self._lock:
+                activos = [trabajo for trabajo in self._trabajos.values() if trabajo.activo]
+            for trabajo in activos:
+                pedido = self._ruta(trabajo.id, '.cancelar')
+                if os.path.exists(pedido):
+                    trabajo.cancelar()
+                    try:
+                        os.remove(pedido)
+                    except OSError:
+                        pass
+                trabajo._guardar()
+            if time.monotonic() - ultima_purga > MAX_EDAD_S / 10:
+                ultima_purga = time.monotonic()
+                self._purgar_archivos()
+
+    def _purgar_archivos(self):
+        limite = time.time() - MAX_EDAD_S
+        with self._lock:
+            activos = {id_trabajo for id_trabajo, trabajo in self._trabajos.items() if trabajo.activo}
+        try:
+            with os.scandir(self.directorio) as entradas:
+                for entrada in entradas:
+                    if entrada.name.split('.')[0] not in activos and entrada.stat().st_mtime < limite:
+                        os.remove(entrada.path)
+        except OSError:
+            pass
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = pc = None
+
+# Validación de los archivos subidos antes de prepararlos. Cada regla es una máscara booleana
+# sobre columnas completas (sin recorrer filas); las filas que fallan alguna pasan a una tabla
+# de cuarentena con los motivos, y las demás siguen al dashboard. Las fechas y los números se
+# convierten una sola vez aquí, así preparar_datos ya no los vuelve a parsear.
+
+# Códigos de motivo, en el orden en que se informan (cada uno es un bit del código de la fila)
+MOTIVOS = (
+    'fecha_inicio_invalida',    # vacía o sin formato de fecha
+    'fecha_fin_invalida',       # con texto que no es fecha (vacía se acepta: sesión sin cierre)
+    'fin_antes_de_inicio',
+    'estacion_faltante',
+    'energia_invalida',         # texto no numérico
+    'energia_negativa',
+    'potencia_implausible',     # negativa o mayor que POTENCIA_MAXIMA_KW
+    'monto_invalido',
+    'monto_negativo',
+    'duracion_invalida',        # texto que no es una duración
+    'duracion_inconsistente',   # difiere de fin - inicio en más de TOLERANCIA_DURACION_S
+)
+COLUMNAS_REQUERIDAS = ['id', 'start_date_time', 'end_date_time', 'energy_kwh', 'evse_uid',
+                       'amount_transaction', 'user_id']
+# Los cargadores rápidos comerciales llegan a 350 kW
+POTENCIA_MAXIMA_KW = 400
+TOLERANCIA_DURACION_S = 60
+PATRON_DURACION = r'^\d+:\d{1,2}:\d{1,2}$'
+
+
+# Valores presentes: ni nulos ni texto vacío. Con `filas` solo se revisan (y se devuelven)
+# esas filas, por ejemplo las que no se pudieron convertir, que suelen ser muy pocas.
+def _presentes(serie, filas=None):
+    presentes = serie.notna().to_numpy()
+    if filas is not None:
+        presentes &= filas
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        vacias = serie.cat.categories.astype(str).str.strip() == ''
+        return presentes & ~vacias[serie.cat.codes.to_numpy()]
+    if not (serie.dtype == object or pd.api.types.is_string_dtype(serie)):
+        return presentes
+    if filas is None and pa is not None:
+        texto = pc.utf8_trim_whitespace(pa.array(serie.astype(object), type=pa.string(), from_pandas=True))
+        return pc.fill_null(pc.not_equal(texto, ''), False).to_numpy(zero_copy_only=False)
+    presentes[presentes] = serie[presentes].astype(str).str.strip().ne('').to_numpy()
+    return presentes
+
+
+def _fecha(serie):
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie, np.zeros(len(serie), dtype=bool)
+    fechas = pd.to_datetime(serie, format='mixed', errors='coerce')
+    nulas = fechas.isna().to_numpy()
+    return fechas, _presentes(serie, nulas)
+
+
+def _numero(serie):
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie, np.zeros(len(serie), dtype=bool)
+    numeros = pd.to_numeric(serie, errors='coerce')
+    nulos = numeros.isna().to_numpy()
+    return numeros, _presentes(serie, nulos)
+
+
+# Segundos de una columna de duraciones (texto HH:MM:SS o timedelta); NaN donde no hay valor.
+# El formato habitual se separa con pyarrow sobre la columna completa; los demás textos
+# (por ejemplo '1 days 02:00:00') pasan por pd.to_timedelta, que es más lento pero general.
+def _segundos_duracion(serie):
+    if pd.api.types.is_timedelta64_dtype(serie):
+        return serie.dt.total_seconds().to_numpy()
+    segundos = np.full(len(serie), np.nan)
+    resto = np.ones(len(serie), dtype=bool)
+    if pa is not None:
+        texto = pa.array(serie.astype(object), type=pa.string(), from_pandas=True)
+        habituales = pc.fill_null(pc.match_substring_regex(texto, PATRON_DURACION), False)
+        partes = pc.split_pattern(pc.if_else(habituales, texto, '0:0:0'), ':')
+        numeros = pc.cast(pc.list_flatten(partes), pa.int64()).to_numpy().reshape(-1, 3)
+        habituales = habituales.to_numpy(zero_copy_only=False)
+        segundos[habituales] = (numeros @ np.array([3600, 60, 1]))[habituales]
+        resto &= ~habituales
+    resto = _presentes(serie, resto)
+    if resto.any():
+        segundos[resto] = pd.to_timedelta(serie[resto].astype(str), errors='coerce').dt.total_seconds().to_numpy()
+    return segundos
+
+
+# Valida un bloque de transacciones. Devuelve las filas válidas (con fechas y números ya
+# convertidos), la cuarentena (filas originales, su número en el archivo y los motivos) y
+# el conteo de filas por motivo. Modifica las columnas de `df`.
+def validar(df, primera_fila=0):
+    faltantes = [col for col in COLUMNAS_REQUERIDAS if col not in df.columns]
+    if faltantes:
+        raise ValueError(f"faltan columnas: {', '.join(faltantes)}")
+
+    inicio, inicio_invalido = _fecha(df['start_date_time'])
+    fin, fin_invalido = _fecha(df['end_date_time'])
+    energia, energia_invalida = _numero(df['energy_kwh'])
+    monto, monto_invalido = _numero(df['amount_transaction'])
+    convertidas = {'start_date_time': inicio, 'end_date_time': fin,
+                   'energy_kwh': energia, 'amount_transaction': monto}
+    fechas_validas = inicio.notna().to_numpy() & fin.notna().to_numpy()
+    reglas = {
+        'fecha_inicio_invalida': inicio.isna().to_numpy(),
+        'fecha_fin_invalida': fin_invalido,
+        'fin_antes_de_inicio': fechas_validas & (fin < inicio).to_numpy(),
+        'estacion_faltante': ~_presentes(df['evse_uid']),
+        'energia_invalida': energia_invalida,
+        'energia_negativa': (energia < 0).to_numpy(),
+        'monto_invalido': monto_invalido,
+        'monto_negativo': (monto < 0).to_numpy(),
+    }
+    if 'potency_kw' in df.columns:
+        potencia, reglas['potencia_implausible'] = _numero(df['potency_kw'])
+        reglas['potencia_implausible'] |= ((potencia < 0) | (potencia > POTENCIA_MAXIMA_KW)).to_numpy()
+        convertidas['potency_kw'] = potencia
+    if 'duration' in df.columns:
+        segundos = _segundos_duracion(df['duration'])
+        reglas['duracion_invalida'] = _presentes(df['duration'], np.isnan(segundos))
+        transcurridos = (fin - inicio).dt.total_seconds().to_numpy()
+        with np.errstate(invalid='ignore'):
+            reglas['duracion_inconsistente'] = fechas_validas & \
+                (np.abs(segundos - transcurridos) > TOLERANCIA_DURACION_S)
+
+    codigos = np.zeros(len(df), dtype=np.int32)
+    for bit, motivo in enumerate(MOTIVOS):
+        if motivo in reglas:
+            codigos |= reglas[motivo].astype(np.int32) << bit
+    fallan = codigos != 0
+    conteos = {motivo: int(reglas[motivo].sum()) for motivo in MOTIVOS
+               if motivo in reglas and reglas[motivo].any()}
+
+    cuarentena = df[fallan].copy()
+    if fallan.any():
+        # Texto de motivos por código distinto (pocos), no por fila
+        distintos, posiciones = np.unique(codigos[fallan], return_inverse=True)
+        textos = np.array([', '.join(m for bit, m in enumerate(MOTIVOS) if codigo >> bit & 1)
+                           for codigo in distintos], dtype=object)
+        cuarentena.insert(0, 'fila', primera_fila + np.flatnonzero(fallan) + 1)
+        cuarentena['motivos'] = textos[posiciones]
+
+    for col, valores in convertidas.items():
+        df[col] = valores
+    validas = df[~fallan] if fallan.any() else df
+    return validas, cuarentena, conteos
+
+
+# Une las cuarentenas de varios bloques o lotes (None si ninguna tiene filas)
+def unir_cuarentenas(cuarentenas):
+    cuarentenas = [c for c in cuarentenas if c is not None and len(c)]
+    if not cuarentenas:
+        return None
+    return pd.concat(cuarentenas, ignore_index=True)
+
+
+def sumar_conteos(total, conteos):
+    for motivo, n in conteos.items():
+        total[motivo] = total.get(motivo, 0) + n
+    return total
+
+
+# Mensaje para el estado de la carga, p. ej. "3 filas en cuarentena (energia_negativa: 2, ...)"
+def resumen_cuarentena(cuarentena, conteos):
+    if cuarentena is None or not len(cuarentena):
+        return ""
+    detalle = ', '.join(f"{motivo}: {n:,}" for motivo, n in conteos.items())
+    return f"{len(cuarentena):,} filas en cuarentena ({detalle})"
@@ -0,0 +1,133 @@
+import threading
+
+from cache_lru import CacheLRU
+from cohortes import analizar_usuarios
+from cubo_agregados import construir_cubo
+from metricas import contar_filas, etapa, metricas
+from ocupacion import calcular_ocupacion
+from series_diarias import resumen_pronostico
+from simulador_tarifas import simular_recomendaciones
+from resumenes import estadisticas, histograma, resumen_caja
+
+
+# Vista filtrada de un dataset para un estado de filtros (estaciones, mes, rango de fechas).
+# Las filas, los agregados y las columnas derivadas se calculan una sola vez, al primer uso,
+# y se comparten entre el callback de KPIs y el de las pestañas.
+class VistaFiltrada:
+    def __init__(self, dataset, estaciones, mes, desde, hasta):
+        self.clave = clave_vista(dataset, estaciones, mes, desde, hasta)
+        self.dataset = dataset
+        self.estaciones = estaciones
+        self.mes = mes
+        self.desde = desde
+        self.hasta = hasta
+        self._resultados = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    # Cada resultado tiene su propio candado: dos callbacks que piden el mismo resultado lo
+    # calculan una vez, y uno que pide otro (por ejemplo, los KPIs mientras un trabajo calcula
+    # la ocupación) no espera.
+    def _calcular(self, nombre, funcion):
+        with self._lock:
+            if nombre in self._resultados:
+                metricas.sumar('oasis_vista_resultados_total', resultado='reutilizado')
+                return self._resultados[nombre]
+            lock = self._locks.setdefault(nombre, threading.Lock())
+        with lock:
+            if nombre not in self._resultados:
+                metricas.sumar('oasis_vista_resultados_total', resultado='calculado')
+                with etapa(nombre):
+                    self._resultados[nombre] = funcion()
+            else:
+                metricas.sumar('oasis_vista_resultados_total', resultado='reutilizado')
+            return self._resultados[nombre]
+
+    @property
+    def sin_rango(self):
+        return self.desde is None and self.hasta is None
+
+    # Filas filtradas (vista o selección del DataFrame del dataset; no se modifican)
+    @property
+    def filas(self):
+        def calcular():
+            filas = self.dataset.indice.filtrar(self.estaciones, self.mes, self.desde, self.hasta)
+            contar_filas(len(filas))
+            return filas
+        return self._calcular('filas', calcular)
+
+    # Duración de cada sesión en minutos
+    @property
+    def duracion_minutos(self):
+        def calcular():
+            filas = self.filas
+            return ((filas['end_date_time'] - filas['start_date_time']).dt.total_seconds() / 60).to_numpy()
+        return self._calcular('duracion_minutos', calcular)
+
+    # Agregados: se cortan del cubo del dataset salvo que haya rango de fechas
+    @property
+    def cubo(self):
+        def calcular():
+            if self.sin_rango:
+                return self.dataset.cubo.filtrar(self.estaciones, self.mes)
+            return construir_cubo(self.filas)
+        return self._calcular('cubo', calcular)
+
+    @property
+    def kpis(self):
+        return self._calcular('kpis', lambda: self.cubo.kpis())
+
+    # Resúmenes de distribución: el navegador recibe bins y cuartiles, no las filas
+    @property
+    def histograma_energia(self):
+        return self._calcular('histograma_energia', lambda: histograma(self.filas['energy_kwh'].to_numpy(), bins=30))
+
+    @property
+    def estadisticas_energia(self):
+        return self._calcular('estadisticas_energia', lambda: estadisticas(self.filas['energy_kwh'].to_numpy()))
+
+    @property
+    def estadisticas_duracion(self):
+        return self._calcular('estadisticas_duracion', lambda: estadisticas(self.duracion_minutos))
+
+    @property
+    def caja_duracion(self):
+        return self._calcular('caja_duracion', lambda: resumen_caja(self.duracion_minutos))
+
+
+    # Ocupación de los cargadores (barrido de sesiones activas en el tiempo)
+    @property
+    def ocupacion(self):
+        return self._calcular('ocupacion', lambda: calcular_ocupacion(self.filas))
+
+    # Escenarios tarifarios simulados sobre las transacciones de la vista
+    @property
+    def simulacion_tarifas(self):
+        return self._calcular('simulacion_tarifas', lambda: simular_recomendaciones(self.filas))
+
+    # Serie diaria y pronóstico de las estaciones de la vista. El pronóstico se ajusta una vez
+    # por dataset para todas las estaciones; el mes y el rango de fechas no se aplican.
+    @property
+    def pronostico(self):
+        def calcular():
+            series = self.dataset.series
+            return resumen_pronostico(series, self.estaciones) if series.n_dias else None
+        return self._calcular('pronostico', calcular)
+
+    # Cohortes de adquisición, retención y fidelidad de los usuarios de la vista
+    @property
+    def cohortes(self):
+        return self._calcular('cohortes', lambda: analizar_usuarios(self.filas))
+
+
+# Vistas memoizadas por (versión del dataset, estaciones, mes, rango de fechas)
+cache_vistas = CacheLRU(max_entradas=64)
+
+
+def clave_vista(dataset, estaciones, mes, desde, hasta):
+    return (dataset.version, tuple(sorted(estaciones)) if estaciones else None, mes, desde, hasta)
+
+
+def obtener_vista(dataset, estaciones, mes, desde, hasta):
+    clave = clave_vista(dataset, estaciones, mes, desde, hasta)
+    return cache_vistas.obtener_o_calcular(clave, lambda: VistaFiltrada(dataset, estaciones, mes, desde, hasta))
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Los módulos del dashboard se importan por nombre desde dashboards/, como en app_dashboard.py
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'dashboards'))
+
+ARCHIVO_DATOS = os.path.join(RAIZ, 'datos', 'df_oasis_clean.csv')
+
+
+# Transacciones reales ya preparadas (una muestra, para que las pruebas sean rápidas)
+@pytest.fixture
+def transacciones():
+    from carga_datos import preparar_datos
+    return preparar_datos(pd.read_csv(ARCHIVO_DATOS, nrows=2000))
+
+
+# El dashboard importado una vez, sin métricas y con los trabajos en una carpeta temporal
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    os.environ['OASIS_METRICAS'] = '0'
+    os.environ['OASIS_DIRECTORIO_TRABAJOS'] = str(tmp_path_factory.mktemp('trabajos'))
+    for variable in ('OASIS_DATOS_COMPARTIDOS', 'OASIS_DIRECTORIO_VIVO'):
+        os.environ.pop(variable, None)
+    import app_dashboard
+    return app_dashboard
+
+
+# Dataset con las transacciones dadas, registrado con una versión propia para la caché de vistas
+@pytest.fixture
+def crear_dataset(app):
+    def crear(df, version):
+        dataset = app.crear_dataset(df)
+        dataset.version = version
+        return dataset
+    return crear
+
+
+# Texto visible de un árbol de componentes de Dash (sin las figuras)
+def texto_componente(componente):
+    if componente is None:
+        return ''
+    if isinstance(componente, (list, tuple)):
+        return ''.join(texto_componente(hijo) for hijo in componente)
+    if isinstance(componente, (str, int, float)):
+        return str(componente)
+    return texto_componente(getattr(componente, 'children', None))
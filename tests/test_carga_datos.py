@@ -0,0 +1,23 @@
+import numpy as np
+
+from carga_datos import COLUMNAS_FLOAT32, compactar_datos
+from cubo_agregados import construir_cubo
+
+
+# Las columnas que se suman en el cubo y los KPIs no se reducen a float32
+def test_compactar_conserva_float64_en_columnas_sumadas(transacciones):
+    compacto = compactar_datos(transacciones.copy())
+    for col in ['energy_kwh', 'amount_transaction']:
+        assert compacto[col].dtype == np.float64
+    assert 'energy_kwh' not in COLUMNAS_FLOAT32
+
+
+def test_compactar_no_cambia_los_kpis(transacciones):
+    original = construir_cubo(transacciones).kpis()
+    compacto = construir_cubo(compactar_datos(transacciones.copy())).kpis()
+    assert compacto['transacciones'] == original['transacciones']
+    assert compacto['usuarios'] == original['usuarios']
+    # Sumas idénticas, sin el ruido de redondeo de float32
+    assert compacto['energia'] == original['energia']
+    assert compacto['ingresos'] == original['ingresos']
+    assert compacto['duracion_promedio'] == original['duracion_promedio']
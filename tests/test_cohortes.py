@@ -0,0 +1,27 @@
+import re
+
+import numpy as np
+
+from cohortes import analizar_usuarios
+from conftest import texto_componente
+from vistas import obtener_vista
+
+
+def test_analisis_sin_usuarios_recurrentes(transacciones):
+    una_sesion = transacciones.drop_duplicates('user_id')
+    analisis = analizar_usuarios(una_sesion)
+    assert analisis['recurrentes'] == 0
+    assert analisis['fieles'] == 0
+    assert np.isnan(analisis['fidelidad_promedio'])
+    # Ninguna cohorte vacía en la matriz de retención
+    assert (analisis['tamaños'] > 0).all()
+    assert len(analisis['cohortes']) == len(analisis['tamaños']) == len(analisis['retencion'])
+
+
+# Si cada usuario carga una sola vez, la pestaña omite la fidelidad en lugar de mostrar "nan%"
+def test_pestaña_cohortes_sin_usuarios_recurrentes(app, crear_dataset, transacciones):
+    dataset = crear_dataset(transacciones.drop_duplicates('user_id').copy(), 'cohortes-una-sesion')
+    texto = texto_componente(app.construir_contenido('tab-cohortes', obtener_vista(dataset, None, None, None, None)))
+    assert 'Usuarios:' in texto
+    assert 'Fidelidad:' not in texto
+    assert not re.search(r'\bnan\b', texto, re.IGNORECASE)
@@ -0,0 +1,37 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from cubo_agregados import construir_cubo
+from informes import _iniciar_proceso, _proceso
+from publicacion import publicar_dataset
+from registro_datos import Dataset
+
+
+# Lo que el dashboard importado en el proceso del grupo dejó encendido
+def _estado_proceso():
+    app = _proceso['app']
+    rutas = {regla.rule for regla in app.server.url_map.iter_rules()}
+    return {'vivo': app.fuente_viva is not None,
+            'trabajos': app.gestor_trabajos.directorio,
+            'api': any(ruta.startswith('/api/') for ruta in rutas),
+            'metricas': '/metrics' in rutas}
+
+
+# Los procesos de informes no heredan el modo vivo ni la API y no escriben estado de trabajos
+def test_proceso_de_informes_solo_renderiza(tmp_path, transacciones, monkeypatch):
+    publicado = str(tmp_path / 'publicado')
+    dataset = Dataset(transacciones, construir_cubo(transacciones))
+    dataset.version = 'informes1'
+    publicar_dataset(dataset, publicado)
+    monkeypatch.setenv('OASIS_DIRECTORIO_VIVO', str(tmp_path / 'vivo'))
+    monkeypatch.setenv('OASIS_DIRECTORIO_TRABAJOS', str(tmp_path / 'trabajos'))
+    monkeypatch.delenv('OASIS_API', raising=False)
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn'), initializer=_iniciar_proceso,
+                             initargs=(publicado, str(tmp_path / 'salida'), [], [])) as grupo:
+        estado = grupo.submit(_estado_proceso).result()
+
+    assert estado == {'vivo': False, 'trabajos': None, 'api': False, 'metricas': False}
+    assert not os.path.exists(tmp_path / 'vivo')
+    assert not os.path.exists(tmp_path / 'trabajos')
@@ -0,0 +1,34 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from conftest import texto_componente
+from series_diarias import construir_series, resumen_pronostico
+from vistas import obtener_vista
+
+
+def _primeros_dias(transacciones, dias):
+    inicio = transacciones['start_date_time'].min().normalize()
+    return transacciones[transacciones['start_date_time'] < inicio + pd.Timedelta(days=dias)].copy()
+
+
+# Con menos de 14 días no hay una semana anterior completa para comparar
+def test_resumen_sin_semana_anterior_completa(transacciones):
+    resumen = resumen_pronostico(construir_series(_primeros_dias(transacciones, 10)))
+    assert np.isnan(resumen['anteriores_7']['transacciones'])
+
+
+def test_resumen_con_semana_anterior_completa(transacciones):
+    series = construir_series(_primeros_dias(transacciones, 30))
+    resumen = resumen_pronostico(series)
+    assert series.n_dias >= 14
+    assert resumen['anteriores_7']['transacciones'] > 0
+
+
+def test_pestaña_pronostico_con_pocos_dias_no_muestra_nan(app, crear_dataset, transacciones):
+    dataset = crear_dataset(_primeros_dias(transacciones, 10), 'pronostico-10-dias')
+    texto = texto_componente(app.construir_contenido('tab-pronostico', obtener_vista(dataset, None, None, None, None)))
+    assert 'Última semana' in texto
+    assert not re.search(r'\bnan\b', texto, re.IGNORECASE)
+    assert 'semana anterior' not in texto
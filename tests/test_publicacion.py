@@ -0,0 +1,49 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import publicacion
+from cubo_agregados import construir_cubo
+from publicacion import cargar_publicado, leer_puntero, publicar_dataset
+from registro_datos import Dataset
+
+
+def _dataset(transacciones, version='abc123'):
+    dataset = Dataset(transacciones, construir_cubo(transacciones))
+    dataset.version = version
+    return dataset
+
+
+def _temporales(directorio):
+    return [nombre for nombre in os.listdir(directorio) if nombre.startswith('.abc123-')]
+
+
+# Varios workers que arrancan a la vez publican la misma versión de la instantánea
+def test_publicar_misma_version_en_paralelo(tmp_path, transacciones):
+    directorio = str(tmp_path)
+    with ThreadPoolExecutor(max_workers=4) as ejecutor:
+        versiones = list(ejecutor.map(lambda _: publicar_dataset(_dataset(transacciones), directorio), range(8)))
+    assert set(versiones) == {'abc123'}
+    assert leer_puntero(directorio) == 'abc123'
+    assert _temporales(directorio) == []
+    assert len(cargar_publicado(directorio, 'abc123').df) == len(transacciones)
+
+
+# Otro worker termina de publicar entre la revisión del destino y el renombre
+def test_publicar_version_ya_renombrada_por_otro(tmp_path, transacciones, monkeypatch):
+    directorio = str(tmp_path)
+    publicar_dataset(_dataset(transacciones), directorio)
+    llamadas = []
+    original = os.path.isdir
+
+    # Solo la primera revisión (antes de escribir) ve el destino como inexistente
+    def isdir(ruta):
+        if ruta.endswith('abc123') and not llamadas:
+            llamadas.append(ruta)
+            return False
+        return original(ruta)
+
+    monkeypatch.setattr(publicacion.os.path, 'isdir', isdir)
+    assert publicar_dataset(_dataset(transacciones), directorio) == 'abc123'
+    assert llamadas
+    assert _temporales(directorio) == []
+    assert len(cargar_publicado(directorio, 'abc123').df) == len(transacciones)
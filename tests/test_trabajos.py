@@ -0,0 +1,37 @@
+import json
+import os
+
+import trabajos
+from trabajos import ERROR, GestorTrabajos
+
+
+def _temporales(directorio):
+    return [nombre for nombre in os.listdir(directorio) if nombre.startswith('.trabajo-')]
+
+
+# Un resultado que no es JSON deja el trabajo en error también para los demás procesos
+def test_resultado_no_serializable(tmp_path):
+    gestor = GestorTrabajos(directorio=str(tmp_path))
+    trabajo = gestor.enviar(lambda: object(), clave='prueba')
+    trabajo._futuro.result()
+    assert trabajo.estado == ERROR
+    assert _temporales(tmp_path) == []
+    with open(tmp_path / f'{trabajo.id}.json') as f:
+        estado = json.load(f)
+    assert estado['estado'] == ERROR
+    assert 'JSON' in estado['error']
+    assert GestorTrabajos(directorio=str(tmp_path)).obtener(trabajo.id).estado == ERROR
+
+
+# Si falla el renombre no queda el temporal en la carpeta compartida
+def test_escritura_fallida_no_deja_temporales(tmp_path, monkeypatch):
+    gestor = GestorTrabajos(directorio=str(tmp_path))
+
+    def replace(origen, destino):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(trabajos.os, 'replace', replace)
+    trabajo = gestor.enviar(lambda: 'listo')
+    trabajo._futuro.result()
+    assert trabajo.resultado == 'listo'
+    assert _temporales(tmp_path) == []